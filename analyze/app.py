@@ -0,0 +1,102 @@
+import time
+import logging
+from flask import Blueprint, request, jsonify
+from common.document import document_kind, document_summary, load_document
+from common.jobs import JobFailed
+from common.models import SUMMARY_LENGTHS
+from common.workspace import Workspace
+from jobs.app import submit_job, wants_job
+from analyze.pipeline import TASKS, run_tasks
+from chatbot.app import collection_name
+from ner.engine import NER_DEFAULT_TIER, NER_TIERS
+from translation.app import SUPPORTED_LANGUAGES
+
+analyze_bp = Blueprint('analyze', __name__)
+
+
+def analysis_request():
+    # (tasks, options) from the query string or form fields, or (None, error message)
+    #   tasks=ner,summary,translation,embedding   any combination, at least one
+    #   model=fast|accurate|hybrid                NER tier
+    #   target_language=en|hi|mr                  required for translation
+    #   summary_length=short|long
+    #   collection=<name>                         chatbot collection for embedding (default: the browser's own)
+    tasks = list(dict.fromkeys(task.strip() for value in request.values.getlist('tasks')
+                               for task in value.split(',') if task.strip()))
+    if not tasks:
+        return None, f"Choose tasks: {', '.join(TASKS)}"
+    unknown = [task for task in tasks if task not in TASKS]
+    if unknown:
+        return None, f"Unknown task '{unknown[0]}', expected any of: {', '.join(TASKS)}"
+    options = {
+        'model': request.values.get('model', NER_DEFAULT_TIER),
+        'source_language': 'auto',
+        'target_language': request.values.get('target_language'),
+        'summary_length': request.values.get('summary_length', 'short'),
+    }
+    if 'ner' in tasks and options['model'] not in NER_TIERS:
+        return None, f"Unknown model '{options['model']}', expected one of: {', '.join(NER_TIERS)}"
+    if 'translation' in tasks and options['target_language'] not in SUPPORTED_LANGUAGES:
+        return None, "Please select the target language"
+    if 'summary' in tasks and options['summary_length'] not in SUMMARY_LENGTHS:
+        return None, f"Unknown summary length, expected one of: {', '.join(SUMMARY_LENGTHS)}"
+    if 'embedding' in tasks:
+        options['collection'] = collection_name()
+        if options['collection'] is None:
+            return None, "Invalid collection name"
+    return tasks, options
+
+
+def analyze_file(file_path, name, tasks, options, on_progress=None):
+    # Extracts the document once (or takes it from the cache) and runs the tasks on it
+    report = on_progress or (lambda progress, message: None)
+    report(0.0, "Extracting text")
+    start = time.perf_counter()
+    document = load_document(file_path, name)
+    extraction = round(time.perf_counter() - start, 3)
+    report(0.1, f"Running {', '.join(tasks)}")
+    analysis = run_tasks(document, tasks, options,
+                         lambda progress, message: report(0.1 + 0.9 * progress, message))
+    analysis['timings']['extraction'] = extraction
+    return dict(analysis, document=document_summary(document))
+
+
+@analyze_bp.route('/', methods=['POST'], strict_slashes=False)
+def analyze():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+    if document_kind(file.filename) is None:
+        return jsonify({'error': 'Unsupported file format.'}), 400
+    tasks, options = analysis_request()
+    if tasks is None:
+        return jsonify({'error': options}), 400
+
+    # Each request gets its own directory, so concurrent uploads never touch each other's files
+    workspace = Workspace('analyze-')
+    try:
+        file_path = workspace.save(file)
+    except Exception as e:
+        workspace.cleanup()
+        logging.error(f"Error saving file {file.filename}: {e}")
+        return jsonify({'error': f"Error saving file: {str(e)}"}), 500
+
+    if wants_job():
+        def work(job):
+            body = analyze_file(file_path, file.filename, tasks, options, job.update)
+            if not body['results']:
+                raise JobFailed("; ".join(f"{task}: {error}" for task, error in body['errors'].items()))
+            return body
+        return submit_job('analyze', work, cleanup=workspace.cleanup)
+
+    try:
+        body = analyze_file(file_path, file.filename, tasks, options)
+    except Exception as e:
+        logging.error(f"Error analyzing {file.filename}: {e}")
+        return jsonify({'error': f"Error analyzing file: {str(e)}"}), 500
+    finally:
+        workspace.cleanup()
+    # Partial results are still a success; only a request whose every task failed is an error
+    return jsonify(body), 200 if body['results'] else 500
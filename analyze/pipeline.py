@@ -0,0 +1,100 @@
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from common.cache import cache_key, result_cache
+from common.document import document_key, document_pages, document_text
+from common.models import SUMMARY_LENGTHS, SUMMARY_MODEL
+from chatbot.app import ingest_document
+from ner.app import ner_key
+from ner.engine import page_entities
+from summary.chunker import CHUNK_OVERLAP_TOKENS, MAP_REDUCE_MAX_PAGES, MAX_CHUNK_TOKENS, SUMMARY_BUFFER, clean_text
+from translation.app import deduplicate_text, translation_key
+from translation.engine import translate_document
+from translation.memory import translation_memory
+
+
+# --- Tasks ---
+# Each task takes the shared document and the request's options and returns its module's result. Results go
+# under the same cache keys the modules' own endpoints use, so either route reuses the other's work.
+def run_ner(document, options):
+    tier = options['model']
+    pages = document_pages(document)
+    if not any(text.strip() for _, text in pages):
+        return []
+    return result_cache.get_or_compute(ner_key(document['id'], tier),
+                                       lambda: [entity for _, _, new in page_entities(pages, tier) for entity in new])
+
+
+def run_translation(document, options):
+    src, dest = options['source_language'], options['target_language']
+    text = deduplicate_text(document_text(document))
+    if not text.strip():
+        return {'translatedText': ''}
+    key = translation_key(document['id'], src, dest)
+    translated = result_cache.get(key)
+    if translated is None:
+        # Runs in a worker thread, so the translation gets its own event loop
+        translated = asyncio.run(translate_document(text, src, dest, memory=translation_memory))
+        result_cache.set(key, translated)
+    return {'translatedText': translated}
+
+
+def run_summary(document, options):
+    from summary.summarizer import summarize_map_reduce  # torch and transformers load on first use
+    ratio = SUMMARY_LENGTHS[options['summary_length']]
+    texts = [text for text in (clean_text(page['text']) for page in document['pages'][:MAP_REDUCE_MAX_PAGES]) if text]
+    if not texts:
+        return {'summary': ''}
+    key = cache_key(document['id'], 'summary', SUMMARY_MODEL, document=document_key(document['id']), mode='map_reduce',
+                    ratio=ratio, max_pages=MAP_REDUCE_MAX_PAGES, chunk_size=MAX_CHUNK_TOKENS,
+                    chunk_overlap=CHUNK_OVERLAP_TOKENS)
+    summary = result_cache.get(key)
+    warnings = []
+    if summary is None:
+        summary = summarize_map_reduce(texts, ratio, SUMMARY_BUFFER, max_tokens=MAX_CHUNK_TOKENS,
+                                       overlap_tokens=CHUNK_OVERLAP_TOKENS, on_error=warnings.append)
+        if summary:
+            result_cache.set(key, summary)
+    return {'summary': summary, 'warnings': warnings} if warnings else {'summary': summary}
+
+
+def run_embedding(document, options):
+    # Adds the document to the chatbot collection, embedding it only if the store does not have it yet
+    return ingest_document(document['id'], document['name'], options['collection'], lambda: document)
+
+
+TASKS = {
+    'ner': run_ner,
+    'summary': run_summary,
+    'translation': run_translation,
+    'embedding': run_embedding,
+}
+
+
+# --- Pipeline ---
+def run_tasks(document, tasks, options, on_progress=None):
+    # The tasks do not depend on each other, so each runs in its own thread on the one document. A failing task is
+    # reported under errors and does not stop the others. on_progress(fraction, message) follows finished tasks.
+    report = on_progress or (lambda progress, message: None)
+    results, errors, timings = {}, {}, {}
+
+    def run(task):
+        start = time.perf_counter()
+        try:
+            return TASKS[task](document, options)
+        finally:
+            timings[task] = round(time.perf_counter() - start, 3)
+
+    with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix='analyze') as pool:
+        futures = {pool.submit(run, task): task for task in tasks}
+        for done, future in enumerate(as_completed(futures), 1):
+            task = futures[future]
+            try:
+                results[task] = future.result()
+            except Exception as e:
+                logging.error(f"Analysis task {task} failed for {document['name']}: {e}")
+                errors[task] = str(e)
+            report(done / len(tasks), f"Finished {task} ({done}/{len(tasks)})")
+    return {'results': results, 'errors': errors, 'timings': timings}
@@ -0,0 +1,130 @@
+import argparse
+import hashlib
+import os
+import random
+import re
+import tempfile
+import time
+
+import numpy as np
+
+from chatbot.answers import AnswerCache, StubLLM, answer_question, build_prompt, estimate_tokens
+from chatbot.store import DocumentStore
+
+# Run from the repository root (offline: hashed bag-of-words embeddings and the stub LLM):
+#   python -m benchmarks.chatbot_answers --questions 300 --llm-latency 0.5
+# Replays a FAQ-style workload (a few popular questions asked in several phrasings) against a synthetic document:
+#   baseline - the previous get_answer: top 4 chunks pasted whole into the prompt, an LLM call per question
+#   cached   - answer_question: semantic answer cache, then ranked/deduped context trimmed to the token budget
+# The stub LLM sleeps --llm-latency plus --ms-per-1k-tokens for the prompt, to make prompt size visible.
+
+INTENTS = [
+    ("refund policy", ["What is the refund policy?", "Explain the refund policy", "refund policy details please"]),
+    ("warranty period", ["How long is the warranty period?", "What is the warranty period", "warranty period length"]),
+    ("delivery time", ["What is the usual delivery time?", "delivery time for orders", "How long is delivery time?"]),
+    ("payment methods", ["Which payment methods are accepted?", "accepted payment methods", "list payment methods"]),
+    ("account deletion", ["How do I request account deletion?", "account deletion steps", "steps for account deletion"]),
+    ("data retention", ["What is the data retention period?", "data retention rules", "explain data retention"]),
+    ("support hours", ["What are the support hours?", "support hours on weekends", "when are support hours"]),
+    ("price changes", ["How are price changes announced?", "notice for price changes", "price changes notice period"]),
+]
+FILLER = ("customer order service policy period days account support payment delivery product update notice team "
+          "request process contract terms office region invoice").split()
+
+
+class HashEmbeddings:
+    # Normalized bag of hashed lowercase words: questions sharing their content words land close together
+    dimension = 384
+    stopwords = {'the', 'a', 'is', 'are', 'what', 'how', 'do', 'i', 'for', 'of', 'please', 'on', 'when', 'which'}
+
+    def embed_query(self, text):
+        vector = np.zeros(self.dimension, dtype='float32')
+        for word in re.findall(r"[a-z]+", text.lower()):
+            if word not in self.stopwords:
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimension] += 1
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+class TimedStubLLM(StubLLM):
+    def __init__(self, latency, ms_per_1k_tokens):
+        super().__init__(latency)
+        self.ms_per_1k_tokens = ms_per_1k_tokens
+        self.prompt_tokens = []
+
+    def complete(self, prompt):
+        tokens = estimate_tokens(prompt)
+        self.prompt_tokens.append(tokens)
+        time.sleep(tokens / 1000 * self.ms_per_1k_tokens / 1000)
+        return super().complete(prompt)
+
+
+def synthetic_chunks(rng, count):
+    chunks = []
+    for i in range(count):
+        topic = INTENTS[i % len(INTENTS)][0]
+        sentences = [" ".join(rng.choice(FILLER) for _ in range(14)).capitalize() + "." for _ in range(10)]
+        sentences.insert(rng.randrange(len(sentences)), f"The {topic} is described in section {i}.")
+        chunks.append({'text': " ".join(sentences), 'page': i // 3 + 1})
+    return chunks
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chatbot answer latency with a semantic answer cache and context budget")
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--chunks", type=int, default=400)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=200)
+    parser.add_argument("--threshold", type=float, default=0.92)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    embeddings = HashEmbeddings()
+    weights = [1 / (rank + 1) for rank in range(len(INTENTS))]  # a few questions are asked far more often
+    questions = [rng.choice(rng.choices(INTENTS, weights)[0][1]) for _ in range(args.questions)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = DocumentStore(os.path.join(directory, 'store'))
+        chunks = synthetic_chunks(rng, args.chunks)
+        store.add_document('synthetic', lambda: chunks, embeddings.embed_documents, 'synthetic.pdf')
+        store.add_to_collection('benchmark', 'synthetic')
+
+        baseline_llm = TimedStubLLM(args.llm_latency, args.ms_per_1k_tokens)
+        latencies = []
+        for question in questions:
+            start = time.perf_counter()
+            hits = store.search('benchmark', embeddings.embed_query(question))
+            baseline_llm.complete(build_prompt(question, hits))
+            latencies.append(time.perf_counter() - start)
+        report('baseline', latencies, baseline_llm, len(questions))
+
+        cache = AnswerCache(os.path.join(directory, 'answers.sqlite3'), threshold=args.threshold)
+        cached_llm = TimedStubLLM(args.llm_latency, args.ms_per_1k_tokens)
+        latencies = []
+        for question in questions:
+            start = time.perf_counter()
+            answer_question(question, 'benchmark', store, embeddings, cached_llm, cache)
+            latencies.append(time.perf_counter() - start)
+        report('cached', latencies, cached_llm, len(questions))
+        print(f"answer cache: {cache.stats()}")
+
+
+def report(label, latencies, llm, questions):
+    tokens = llm.prompt_tokens
+    mean_tokens = sum(tokens) / len(tokens) if tokens else 0
+    print(f"{label:9s} {sum(latencies):7.1f}s total  p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms  LLM calls {len(tokens)}/{questions}  "
+          f"prompt ~{mean_tokens:.0f} tokens")
+
+
+if __name__ == "__main__":
+    main()
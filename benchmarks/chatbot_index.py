@@ -0,0 +1,75 @@
+import argparse
+import time
+
+import numpy as np
+
+from chatbot.index import build_index, index_spec
+
+# Run from the repository root (needs faiss-cpu; offline, vectors are synthetic):
+#   python -m benchmarks.chatbot_index --sizes 10000 100000 1000000
+#   python -m benchmarks.chatbot_index --sizes 100000 --configs ivf/none ivf/pq hnsw/sq8 --k 4
+# For each collection size and kind/compression pair (the CHATBOT_INDEX / CHATBOT_INDEX_COMPRESSION settings),
+# builds the index chatbot.index would build and reports build time, index size, single-query latency and
+# recall@k against exact search. Vectors are clustered, low-rank plus noise and normalized, roughly like
+# sentence embeddings; at 1M x 384 the raw vectors alone take 1.5 GB, and HNSW builds on few cores take minutes.
+
+CONFIGS = ['flat/none', 'flat/fp16', 'flat/sq8', 'ivf/none', 'ivf/sq8', 'ivf/pq', 'hnsw/none', 'hnsw/sq8']
+
+
+LATENT_DIMENSION = 24  # embeddings of text vary along far fewer directions than they have dimensions
+
+
+def synthetic_vectors(count, dimension, clusters, rng):
+    centers = 1.5 * rng.normal(size=(clusters, LATENT_DIMENSION)).astype('float32')
+    projection = rng.normal(size=(LATENT_DIMENSION, dimension)).astype('float32')
+    vectors = np.empty((count, dimension), dtype='float32')
+    for start in range(0, count, 100000):
+        end = min(count, start + 100000)
+        latent = centers[rng.integers(0, clusters, end - start)] + rng.normal(size=(end - start, LATENT_DIMENSION))
+        block = latent.astype('float32') @ projection + 0.5 * rng.normal(size=(end - start, dimension)).astype('float32')
+        vectors[start:end] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latency/memory of chatbot index kinds on synthetic vectors")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--configs", nargs="+", default=CONFIGS, help="kind/compression pairs")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import faiss
+    faiss.omp_set_num_threads(1)  # latency of one request on one core
+    rng = np.random.default_rng(args.seed)
+    for size in args.sizes:
+        clusters = max(10, size // 1000)
+        vectors = synthetic_vectors(size + args.queries, args.dimension, clusters, rng)
+        vectors, queries = vectors[:size], vectors[size:]
+        exact = faiss.IndexFlatL2(args.dimension)
+        exact.add(vectors)
+        _, truth = exact.search(queries, args.k)
+        del exact
+        print(f"\n{size} vectors x {args.dimension} dims, {args.queries} queries, recall@{args.k}")
+        for config in args.configs:
+            kind, compression = config.split('/')
+            spec = index_spec(size, args.dimension, kind, compression)
+            start = time.perf_counter()
+            index = build_index(vectors, spec)
+            build_seconds = time.perf_counter() - start
+            megabytes = faiss.serialize_index(index).nbytes / 2 ** 20
+            found = np.empty_like(truth)
+            start = time.perf_counter()
+            for i in range(len(queries)):
+                found[i] = index.search(queries[i:i + 1], args.k)[1][0]
+            latency_ms = (time.perf_counter() - start) / len(queries) * 1000
+            recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+            print(f"{config:10s} {spec:16s} build {build_seconds:7.1f}s  {megabytes:8.1f} MB  "
+                  f"{latency_ms:7.2f} ms/query  recall {recall:.3f}")
+            del index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from chatbot.ingest import EmbeddingCache, chunk_pages, embed_chunks, embedding_window
+from common.models import EMBEDDING_MODEL
+
+# Run from the repository root (needs sentence-transformers and the embedding model):
+#   python -m benchmarks.chatbot_ingest --pages 500 --batch-sizes 16 32 64
+#   python -m benchmarks.chatbot_ingest --model /path/to/local/sentence-transformer
+# Ingests a synthetic text PDF and reports chunks/sec:
+#   pages     - the previous process_pdf: whole pages in one embed_documents call with default settings
+#               (pages over the model's token limit are truncated, counted as "truncated")
+#   chunks    - token-bounded chunks embedded through an empty embedding cache, per batch size
+#   re-upload - the same PDF again through the now warm cache
+#   revised   - a PDF sharing half its pages with the first one
+# Text extraction (PyMuPDF) is timed separately and not included in chunks/sec.
+
+WORDS = ("account agreement annual audit balance board budget capital committee company contract customer data "
+         "department development employee equipment finance growth income investment management market meeting "
+         "operations payment performance policy price product project quarter report revenue review risk sales "
+         "service staff strategy supplier system target team technology training").split()
+
+
+def synthetic_page(rng, words_per_page):
+    sentences, count = [], 0
+    while count < words_per_page:
+        length = rng.randint(8, 30)
+        sentence = " ".join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence.capitalize() + ".")
+        count += length
+    return " ".join(sentences)
+
+
+def write_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_textbox(fitz.Rect(40, 40, 560, 800), text, fontsize=8)
+    doc.save(path)
+
+
+def extract_pages(path):
+    with fitz.open(path) as doc:
+        return [(page.number + 1, page.get_text()) for page in doc]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chatbot ingestion throughput: whole pages vs cached token chunks")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    rng = random.Random(args.seed)
+    pages = [synthetic_page(rng, args.words_per_page) for _ in range(args.pages)]
+    revised = pages[:args.pages // 2] + [synthetic_page(rng, args.words_per_page) for _ in range(args.pages - args.pages // 2)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        first_pdf, revised_pdf = os.path.join(directory, "first.pdf"), os.path.join(directory, "revised.pdf")
+        write_pdf(first_pdf, pages)
+        write_pdf(revised_pdf, revised)
+        start = time.perf_counter()
+        first_pages = extract_pages(first_pdf)
+        print(f"{args.pages} pages, text extraction {time.perf_counter() - start:.2f}s")
+
+        embeddings = HuggingFaceEmbeddings(model_name=args.model)
+        tokenizer, max_tokens = embedding_window(embeddings)
+        texts = [text for _, text in first_pages]
+        start = time.perf_counter()
+        embeddings.embed_documents(texts)
+        elapsed = time.perf_counter() - start
+        truncated = sum(len(ids) > max_tokens for ids in tokenizer(texts)['input_ids'])
+        print(f"{'pages':10s} {'':8s} {len(texts):6d} chunks  {elapsed:7.2f}s  {len(texts) / elapsed:7.1f} chunks/s  "
+              f"truncated {truncated}")
+
+        for batch_size in args.batch_sizes:
+            embeddings = HuggingFaceEmbeddings(model_name=args.model, encode_kwargs={'batch_size': batch_size})
+            cache = EmbeddingCache(os.path.join(directory, f"cache-{batch_size}"))
+            runs = [('chunks', first_pages), ('re-upload', first_pages), ('revised', extract_pages(revised_pdf))]
+            for label, document_pages in runs:
+                start = time.perf_counter()
+                chunks = list(chunk_pages(document_pages, tokenizer, max_tokens))
+                stats = {}
+                embed_chunks([chunk['text'] for chunk in chunks], embeddings, cache, batch_size, stats=stats)
+                elapsed = time.perf_counter() - start
+                print(f"{label:10s} batch={batch_size:<3d} {len(chunks):6d} chunks  {elapsed:7.2f}s  "
+                      f"{len(chunks) / elapsed:7.1f} chunks/s  embedded {stats['embedded']}")
+            cache.close()
+
+
+if __name__ == "__main__":
+    main()
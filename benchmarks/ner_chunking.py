@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+# Run from the repository root (needs the spaCy model installed):
+#   python -m benchmarks.ner_chunking --pages 200 --batch-sizes 4 16 --processes 1 2
+#   python -m benchmarks.ner_chunking --pdf some.pdf --model en_core_web_sm
+# Every configuration runs in its own subprocess so peak RSS is measured per run. The baseline is the previous
+# perform_ner: one nlp(text) call over the whole document with every pipeline component enabled.
+
+SENTENCES = [
+    "Dr. Anita Sharma met officials of the Reserve Bank of India in Mumbai on 12 March 2023.",
+    "The Pune Municipal Corporation approved a budget of Rs. 450 crore for road repairs.",
+    "Microsoft and Infosys signed an agreement covering cloud services across Europe.",
+    "Rahul Deshmukh, a professor at Savitribai Phule Pune University, chaired the review committee.",
+    "The hearing before the Bombay High Court was adjourned until the first week of June.",
+    "Shipments from Chennai to Singapore were delayed by three days because of the cyclone.",
+]
+
+
+def synthetic_text(pages, seed):
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(pages):
+        lines = [" ".join(rng.choice(SENTENCES) for _ in range(3)) for _ in range(10)]
+        paragraphs.append("\n".join(lines))
+    return "\n\n".join(paragraphs)
+
+
+def pdf_text(pdf_path):
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        return "\n".join(page.extract_text() or "" for page in pdf.pages)
+
+
+def run_one(config):
+    # Executed in a child process; prints one JSON line with timing and peak memory
+    import spacy
+    from ner.engine import extract_entities, unique_entities
+    with open(config['text_file'], encoding='utf-8') as f:
+        text = f.read()
+    nlp = spacy.load(config['model'])
+    loaded_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if config['mode'] == 'whole':
+        nlp.max_length = max(nlp.max_length, len(text) + 1)
+        doc = nlp(text)
+        entities = list(set((ent.text.strip(), ent.label_) for ent in doc.ents if ent.text.strip()))
+    else:
+        entities = unique_entities(extract_entities(nlp, text, config['batch_size'], config['processes']))
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux; worker processes are reported through RUSAGE_CHILDREN
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    print(json.dumps({'seconds': elapsed, 'peak_mb': peak / 1024, 'model_mb': loaded_rss / 1024,
+                      'entities': len(entities)}))
+
+
+def run_config(config):
+    proc = subprocess.run([sys.executable, "-m", "benchmarks.ner_chunking", "--child", json.dumps(config)],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whole-document vs chunked nlp.pipe NER")
+    parser.add_argument("--model", default="en_core_web_trf")
+    parser.add_argument("--pdf", default=None, help="Use the text of this PDF instead of synthetic pages")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--skip-whole", action="store_true")
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(json.loads(args.child))
+        return
+
+    import tempfile
+    text = pdf_text(args.pdf) if args.pdf else synthetic_text(args.pages, args.seed)
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', encoding='utf-8', delete=False) as f:
+        f.write(text)
+        text_file = f.name
+    print(f"{len(text):,} characters, model {args.model}")
+
+    configs = [] if args.skip_whole else [('whole document', {'mode': 'whole'})]
+    for processes in args.processes:
+        for batch_size in args.batch_sizes:
+            configs.append((f"pipe b={batch_size} p={processes}",
+                            {'mode': 'pipe', 'batch_size': batch_size, 'processes': processes}))
+    try:
+        for label, config in configs:
+            result = run_config(dict(config, model=args.model, text_file=text_file))
+            if 'error' in result:
+                print(f"{label:18s} failed: {result['error']}")
+                continue
+            print(f"{label:18s} {result['seconds']:8.2f}s  peak {result['peak_mb']:8.1f} MB  "
+                  f"(+{result['peak_mb'] - result['model_mb']:.1f} MB over loaded model)  {result['entities']} entities")
+    finally:
+        os.remove(text_file)
+
+
+if __name__ == "__main__":
+    main()
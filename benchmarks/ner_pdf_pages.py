@@ -0,0 +1,100 @@
+import argparse
+import os
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from common.ocr import OCR_BATCH_PAGES, iter_pdf_pages, ocr_page
+
+# Run from the repository root:
+#   python -m benchmarks.ner_pdf_pages --pages 200 --scanned 0.5
+# Add --ocr to run EasyOCR on the scanned pages (needs the OCR weights); without it a reader that returns no
+# text stands in, so only the per-page overhead of each extraction path is measured.
+# The baseline is the previous ner/app.py extraction: pdfplumber for every page, pdf.pages.index() for each page
+# without text, and a fresh fitz.open() of the whole file per scanned page.
+
+
+class NullReader:
+    def __init__(self):
+        self.calls = 0
+
+    def readtext(self, image, detail=0, **kwargs):
+        self.calls += 1
+        return []
+
+    def readtext_batched(self, images, detail=0, **kwargs):
+        self.calls += 1
+        return [[] for _ in images]
+
+
+def mixed_pdf(path, pages, scanned_fraction):
+    # Every n-th page is replaced by a picture of itself, so it has no text layer
+    every = round(1 / scanned_fraction) if scanned_fraction else 0
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), f"Page {i} of the report. " * 60, fontsize=11)
+    out = fitz.open()
+    for i, page in enumerate(doc):
+        if every and i % every == 0:
+            image = out.new_page(width=page.rect.width, height=page.rect.height)
+            image.insert_image(image.rect, pixmap=page.get_pixmap(dpi=100))
+        else:
+            out.insert_pdf(doc, from_page=i, to_page=i)
+    out.save(path)
+    return sum(1 for i in range(pages) if every and i % every == 0)
+
+
+def previous_extraction(pdf_path, reader):
+    import pdfplumber
+    text = ""
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            extracted_text = page.extract_text()
+            if extracted_text:
+                text += extracted_text + "\n"
+            else:
+                pdf_document = fitz.open(pdf_path)
+                text += ocr_page(reader, pdf_document.load_page(pdf.pages.index(page))) + "\n"
+                pdf_document.close()
+    return text
+
+
+def single_pass(pdf_path, reader, batch_size):
+    return "\n".join(text for _, text in iter_pdf_pages(pdf_path, lambda: reader, batch_size=batch_size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NER PDF text extraction: previous vs single pass")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--scanned", type=float, default=0.5, help="Fraction of image-only pages")
+    parser.add_argument("--batch-size", type=int, default=OCR_BATCH_PAGES)
+    parser.add_argument("--ocr", action="store_true")
+    parser.add_argument("--skip-previous", action="store_true")
+    args = parser.parse_args()
+
+    if args.ocr:
+        from common.models import get_ocr_reader
+        make_reader = get_ocr_reader
+    else:
+        make_reader = NullReader
+
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_path = os.path.join(directory, "mixed.pdf")
+        scanned = mixed_pdf(pdf_path, args.pages, args.scanned)
+        print(f"{args.pages} pages, {scanned} image-only")
+        runs = [("single pass", lambda reader: single_pass(pdf_path, reader, args.batch_size))]
+        if not args.skip_previous:
+            runs.insert(0, ("previous", lambda reader: previous_extraction(pdf_path, reader)))
+        for label, run in runs:
+            reader = make_reader()
+            start = time.perf_counter()
+            text = run(reader)
+            elapsed = time.perf_counter() - start
+            calls = f"  {reader.calls} reader calls" if isinstance(reader, NullReader) else ""
+            print(f"{label:12s} {elapsed:8.2f}s  {args.pages / elapsed:8.1f} pages/s  {len(text):,} chars{calls}")
+
+
+if __name__ == "__main__":
+    main()
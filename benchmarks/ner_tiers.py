@@ -0,0 +1,121 @@
+import argparse
+import glob
+import os
+import random
+import time
+
+from ner.engine import NER_FAST_MODEL, NER_TIERS, add_structured_ruler, load_fast_ner, tier_entities, unique_entities
+from common.models import NER_MODEL
+
+# Run from the repository root (needs the spaCy models installed):
+#   python -m benchmarks.ner_tiers --docs 50
+#   python -m benchmarks.ner_tiers --corpus path/to/txt_dir --reference accurate
+#   python -m benchmarks.ner_tiers --check-rules
+# Reports docs/sec per tier and entity-level agreement with the reference tier, both on exact spans
+# (start, end, label) and on the deduplicated (text, label) pairs the /ner/upload endpoint returns.
+# --check-rules only checks that the structured-field rules find STRUCTURED_CASES (no model needed); it exits
+# non-zero on a miss.
+
+SENTENCES = [
+    "Dr. Anita Sharma met officials of the Reserve Bank of India in Mumbai on 12 March 2023.",
+    "The Pune Municipal Corporation approved a budget of Rs. 450 crore for road repairs.",
+    "Invoice INV-2231 dated 04/11/2022 lists a total of INR 1,20,000.50 payable to Infosys.",
+    "Contact the registrar at registrar@unipune.ac.in or +91 98765 43210 before 2023-06-30.",
+    "Rahul Deshmukh, a professor at Savitribai Phule Pune University, chaired the review committee.",
+    "The applicant's PAN is ABCDE1234F and the bank's IFSC code is SBIN0001234.",
+    "The bank's IFSC code is SBIN0001234 and the applicant's PAN is ABCDE1234F.",
+    "Shipments from Chennai to Singapore were delayed by three days because of the cyclone.",
+    "The hearing before the Bombay High Court was adjourned until the first week of June.",
+]
+
+# (text, entity the structured rules must find)
+STRUCTURED_CASES = [
+    ("The applicant's PAN is ABCDE1234F and", ("ABCDE1234F", "ID")),
+    ("The applicant's PAN is ABCDE1234F.", ("ABCDE1234F", "ID")),
+    ("Registered under GSTIN 22ABCDE1234F1Z5.", ("22ABCDE1234F1Z5", "ID")),
+    ("The bank's IFSC code is SBIN0001234.", ("SBIN0001234", "ID")),
+    ("Aadhaar 1234 5678 9012.", ("1234 5678 9012", "ID")),
+    ("Invoice dated 04/11/2022.", ("04/11/2022", "DATE")),
+    ("Call +91 98765 43210.", ("+91 98765 43210", "PHONE")),
+]
+
+
+def check_rules():
+    import spacy
+    nlp = add_structured_ruler(spacy.blank("en"))
+    misses = [(text, expected) for text, expected in STRUCTURED_CASES
+              if expected not in {(ent.text, ent.label_) for ent in nlp(text).ents}]
+    for text, expected in misses:
+        print(f"missed {expected} in {text!r}")
+    print(f"{len(STRUCTURED_CASES) - len(misses)}/{len(STRUCTURED_CASES)} structured cases found")
+    return not misses
+
+
+def synthetic_corpus(docs, seed):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(5, 20))) for _ in range(docs)]
+
+
+def load_corpus(directory):
+    texts = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read())
+    return texts
+
+
+def agreement(predicted, reference):
+    predicted, reference = set(predicted), set(reference)
+    overlap = len(predicted & reference)
+    precision = overlap / len(predicted) if predicted else 1.0
+    recall = overlap / len(reference) if reference else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NER tiers: throughput and agreement")
+    parser.add_argument("--corpus", default=None, help="Directory of .txt files; synthetic documents otherwise")
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--fast-model", default=NER_FAST_MODEL)
+    parser.add_argument("--accurate-model", default=NER_MODEL)
+    parser.add_argument("--tiers", nargs="+", default=list(NER_TIERS), choices=NER_TIERS)
+    parser.add_argument("--reference", default="accurate", choices=NER_TIERS)
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--check-rules", action="store_true", help="Only check the structured-field rules")
+    args = parser.parse_args()
+    if args.check_rules:
+        raise SystemExit(0 if check_rules() else 1)
+
+    import spacy
+    texts = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.docs, args.seed)
+    print(f"{len(texts)} documents, {sum(len(t) for t in texts):,} characters")
+    fast_nlp = load_fast_ner() if args.fast_model == NER_FAST_MODEL else add_structured_ruler(spacy.load(args.fast_model))
+    accurate_nlp = spacy.load(args.accurate_model)
+
+    results = {}
+    for tier in dict.fromkeys([args.reference] + args.tiers):
+        stats = {}
+        # One untimed document so lazy initialisation is not charged to the first tier
+        tier_entities(texts[0], tier, fast_nlp, accurate_nlp)
+        start = time.perf_counter()
+        results[tier] = [tier_entities(text, tier, fast_nlp, accurate_nlp, stats) for text in texts]
+        elapsed = time.perf_counter() - start
+        escalated = f"  {stats['escalated_chars'] / stats['chars']:.0%} of text escalated" if stats.get('chars') else ""
+        print(f"{tier:9s} {elapsed:8.2f}s  {len(texts) / elapsed:8.1f} docs/s{escalated}")
+
+    reference = results[args.reference]
+    print(f"\nAgreement with {args.reference} (precision / recall / F1)")
+    for tier in args.tiers:
+        if tier == args.reference:
+            continue
+        spans = agreement([(i, s, e, label) for i, ents in enumerate(results[tier]) for _, label, s, e in ents],
+                          [(i, s, e, label) for i, ents in enumerate(reference) for _, label, s, e in ents])
+        pairs = agreement([(i,) + pair for i, ents in enumerate(results[tier]) for pair in unique_entities(ents)],
+                          [(i,) + pair for i, ents in enumerate(reference) for pair in unique_entities(ents)])
+        print(f"{tier:9s} spans {spans[0]:.3f} / {spans[1]:.3f} / {spans[2]:.3f}   "
+              f"unique pairs {pairs[0]:.3f} / {pairs[1]:.3f} / {pairs[2]:.3f}")
+
+
+if __name__ == "__main__":
+    main()
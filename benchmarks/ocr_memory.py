@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+# Run from the repository root:
+#   python -m benchmarks.ocr_memory --pages 100 --max-pages 50 --dpi 200
+# Each mode rasterizes a scanned PDF in its own subprocess and reports peak RSS:
+#   eager     - every page rendered and kept before any is used, then sliced to max_pages (the previous
+#               convert_from_path(file_path)[:MAX_PAGES] pattern, without needing poppler)
+#   pdf2image - the previous code itself, when pdf2image and poppler are installed
+#   lazy      - common.ocr.iter_pdf_pages, the production path: pages rendered a batch at a time (OCR_BATCH_PAGES),
+#               stopping at max_pages
+# Add --ocr to run EasyOCR on every page that is kept (needs the OCR weights); without it the lazy mode renders
+# each page for a reader that returns no text.
+
+
+def scanned_pdf(path, pages):
+    # Image-only pages, as a scanner produces them
+    source = fitz.open()
+    page = source.new_page()
+    page.insert_textbox(fitz.Rect(40, 40, 560, 800), "Scanned page text. " * 200, fontsize=11)
+    picture = page.get_pixmap(dpi=150)
+    doc = fitz.open()
+    for _ in range(pages):
+        doc.new_page().insert_image(fitz.Rect(0, 0, 595, 842), pixmap=picture)
+    doc.save(path)
+
+
+class NoTextReader:
+    # Stands in for EasyOCR when only rendering is measured
+    def readtext(self, image, detail=0, **kwargs):
+        return []
+
+
+def run_mode(mode, pdf_path, max_pages, dpi, ocr):
+    # Executed in a child process
+    import numpy as np
+    from common.ocr import iter_pdf_pages
+    reader = None
+    if ocr:
+        from common.models import get_ocr_reader
+        reader = get_ocr_reader()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == 'lazy':
+        pages = sum(1 for _ in iter_pdf_pages(pdf_path, lambda: reader or NoTextReader(), dpi, max_pages=max_pages))
+    else:
+        if mode == 'eager':
+            with fitz.open(pdf_path) as doc:
+                images = [np.array(page.get_pixmap(dpi=dpi, alpha=False).samples) for page in doc][:max_pages]
+        else:
+            from pdf2image import convert_from_path
+            images = [np.array(image) for image in convert_from_path(pdf_path, dpi=dpi)[:max_pages]]
+        pages = 0
+        for image in images:
+            if reader:
+                reader.readtext(image, detail=0)
+            pages += 1
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'pages': pages, 'seconds': elapsed, 'peak_mb': peak / 1024, 'added_mb': (peak - baseline) / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of eager vs lazy page rendering for OCR")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--max-pages", type=int, default=50)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--modes", nargs="+", default=["eager", "pdf2image", "lazy"])
+    parser.add_argument("--ocr", action="store_true")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(**json.loads(args.child))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_path = os.path.join(directory, "scanned.pdf")
+        scanned_pdf(pdf_path, args.pages)
+        print(f"{args.pages} scanned pages, first {args.max_pages} used, {args.dpi} dpi")
+        for mode in args.modes:
+            config = {'mode': mode, 'pdf_path': pdf_path, 'max_pages': args.max_pages, 'dpi': args.dpi,
+                      'ocr': args.ocr}
+            proc = subprocess.run([sys.executable, "-m", "benchmarks.ocr_memory", "--child", json.dumps(config)],
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{mode:10s} skipped: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed'}")
+                continue
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{mode:10s} {result['seconds']:7.2f}s  {result['pages']} pages  peak {result['peak_mb']:8.1f} MB  "
+                  f"(+{result['added_mb']:.1f} MB while rendering)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import os
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from common.ocr import OCR_DPI, page_to_array
+
+# Run from the repository root:
+#   python -m benchmarks.ocr_rasterize --pages 100 --dpi 72 200
+# Add --ocr to include EasyOCR recognition in both paths (needs the OCR weights).
+
+
+def synthetic_pdf(pages):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), f"Scanned page {i} " * 120, fontsize=11)
+    return doc
+
+
+def decode_png(path):
+    # Stand-in for the OCR reader loading the image back from disk when --ocr is off
+    pixmap = fitz.Pixmap(path)
+    return np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width, pixmap.n)
+
+
+def temp_file_page(page, dpi, reader, directory):
+    # The previous fallback: save a PNG, hand the path to the reader, delete it
+    path = os.path.join(directory, "temp_page.png")
+    page.get_pixmap(dpi=dpi).save(path)
+    if reader:
+        reader.readtext(path, detail=0)
+    else:
+        decode_png(path)
+    os.remove(path)
+
+
+def in_memory_page(page, dpi, reader):
+    image = page_to_array(page, dpi)
+    if reader:
+        reader.readtext(image, detail=0)
+
+
+def run(doc, dpi, in_memory, reader, directory):
+    start = time.perf_counter()
+    for page in doc:
+        if in_memory:
+            in_memory_page(page, dpi, reader)
+        else:
+            temp_file_page(page, dpi, reader, directory)
+    return doc.page_count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pages/sec of temp-file vs in-memory OCR rasterization")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--dpi", type=int, nargs="+", default=[OCR_DPI, 200])
+    parser.add_argument("--ocr", action="store_true")
+    args = parser.parse_args()
+
+    reader = None
+    if args.ocr:
+        import easyocr
+        reader = easyocr.Reader(['en'])
+
+    doc = synthetic_pdf(args.pages)
+    with tempfile.TemporaryDirectory() as directory:
+        for dpi in args.dpi:
+            before = run(doc, dpi, False, reader, directory)
+            after = run(doc, dpi, True, reader, directory)
+            print(f"dpi={dpi:4d}  temp file {before:8.1f} pages/s  in-memory {after:8.1f} pages/s  "
+                  f"({after / before:.1f}x)")
+    doc.close()
+
+
+if __name__ == "__main__":
+    main()
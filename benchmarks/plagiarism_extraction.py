@@ -0,0 +1,79 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+import zipfile
+
+import fitz  # PyMuPDF
+
+from plagarism.extraction import DEFAULT_WORKERS, extract_texts
+
+# Run from the repository root:
+#   python -m benchmarks.plagiarism_extraction --files 64 --pages 20 --workers 1 4 8
+# --scanned-pages adds image-only pages per file so the EasyOCR fallback is exercised (needs the OCR weights).
+
+
+def synthetic_pdf(path, rng, pages, scanned_pages):
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        words = " ".join(rng.choice(["lorem", "ipsum", "dolor", "sit", "amet", "thesis", "result", "method"])
+                         for _ in range(400))
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), words, fontsize=10)
+    for _ in range(scanned_pages):
+        source = fitz.open()
+        text_page = source.new_page()
+        text_page.insert_textbox(fitz.Rect(40, 40, 560, 800), "Scanned assignment page " * 40, fontsize=14)
+        pixmap = text_page.get_pixmap(dpi=100)
+        page = doc.new_page()
+        page.insert_image(page.rect, pixmap=pixmap)
+        source.close()
+    doc.save(path)
+    doc.close()
+
+
+def synthetic_zip(directory, files, pages, scanned_pages, seed):
+    rng = random.Random(seed)
+    zip_path = os.path.join(directory, "batch.zip")
+    with zipfile.ZipFile(zip_path, "w") as zip_ref:
+        for i in range(files):
+            pdf_path = os.path.join(directory, f"submission_{i:03d}.pdf")
+            synthetic_pdf(pdf_path, rng, pages, scanned_pages)
+            zip_ref.write(pdf_path, os.path.basename(pdf_path))
+            os.remove(pdf_path)
+    return zip_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of serial vs process-pool PDF extraction")
+    parser.add_argument("--files", type=int, default=64)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--scanned-pages", type=int, default=0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, DEFAULT_WORKERS])
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        zip_path = synthetic_zip(directory, args.files, args.pages, args.scanned_pages, args.seed)
+        extract_to = os.path.join(directory, "extracted")
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            zip_ref.extractall(extract_to)
+        pdf_paths = sorted(os.path.join(extract_to, f) for f in os.listdir(extract_to))
+        pages = len(pdf_paths) * (args.pages + args.scanned_pages)
+        print(f"{len(pdf_paths)} PDFs, {pages} pages ({args.scanned_pages} scanned per file)")
+
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            texts, errors = extract_texts(pdf_paths, workers=workers)
+            elapsed = time.perf_counter() - start
+            if baseline is None:
+                baseline = texts
+            identical = "identical" if texts == baseline else "MISMATCH"
+            print(f"workers={workers:3d}  {elapsed:7.2f}s  {len(pdf_paths) / elapsed:7.1f} files/s  "
+                  f"{pages / elapsed:8.1f} pages/s  errors={len(errors)}  {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import random
+import time
+
+from plagarism.lsh import SIMILARITY_THRESHOLD, find_similar_pairs
+
+# Run from the repository root:
+#   python -m benchmarks.plagiarism_lsh --docs 300 --words 800
+
+
+def random_document(rng, vocabulary, words):
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def rewrite(rng, text, vocabulary, max_rewrite):
+    # Copy a document and replace one contiguous passage, the way students paraphrase a section
+    words = text.split()
+    span = int(len(words) * rng.uniform(0, max_rewrite))
+    start = rng.randint(0, len(words) - span)
+    words[start:start + span] = [rng.choice(vocabulary) for _ in range(span)]
+    return " ".join(words)
+
+
+def synthetic_corpus(docs, words, copy_rate, max_rewrite, seed):
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9)))
+                  for _ in range(5000)]
+    texts = []
+    for _ in range(docs):
+        if texts and rng.random() < copy_rate:
+            texts.append(rewrite(rng, rng.choice(texts), vocabulary, max_rewrite))
+        else:
+            texts.append(random_document(rng, vocabulary, words))
+    return texts
+
+
+def timed(texts, threshold, method):
+    start = time.perf_counter()
+    results = find_similar_pairs(texts, threshold, method)
+    return time.perf_counter() - start, {(i, j) for i, j, _ in results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare all-pairs and MinHash/LSH plagiarism detection")
+    parser.add_argument("--docs", type=int, default=300)
+    parser.add_argument("--words", type=int, default=800)
+    parser.add_argument("--copy-rate", type=float, default=0.2)
+    parser.add_argument("--max-rewrite", type=float, default=0.3, help="Largest fraction of a copied document that is rewritten")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--skip-exact", action="store_true", help="Only time the LSH path")
+    args = parser.parse_args()
+
+    texts = synthetic_corpus(args.docs, args.words, args.copy_rate, args.max_rewrite, args.seed)
+    print(f"{len(texts)} documents, {args.words} words each, threshold {args.threshold}")
+
+    lsh_time, lsh_pairs = timed(texts, args.threshold, "lsh")
+    print(f"lsh:   {lsh_time:8.2f}s  {len(lsh_pairs)} pairs")
+    if args.skip_exact:
+        return
+
+    exact_time, exact_pairs = timed(texts, args.threshold, "exact")
+    print(f"exact: {exact_time:8.2f}s  {len(exact_pairs)} pairs")
+    recall = len(lsh_pairs & exact_pairs) / len(exact_pairs) if exact_pairs else 1.0
+    print(f"recall {recall:.3f}, speedup {exact_time / lsh_time if lsh_time else float('inf'):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+# Run from the repository root:
+#   python -m benchmarks.startup_time --top 15 --max-seconds 3
+# Imports main.py under `python -X importtime` in lazy startup mode and fails when the import exceeds the budget,
+# so a blueprint that starts importing torch/spaCy/langchain at module level shows up as a regression.
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure(module, runs):
+    env = dict(os.environ, STARTUP_MODE='lazy')
+    walls, stderr = [], ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              capture_output=True, text=True, env=env)
+        walls.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            sys.exit(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+        stderr = proc.stderr
+    return min(walls), stderr
+
+
+def direct_imports(stderr):
+    # Cumulative time of each module imported directly by the measured module, in microseconds.
+    # importtime indents nested imports by two spaces per level, so those sit at depth 1.
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 3:
+            imports.append((int(match.group(2)), match.group(4)))
+    return sorted(imports, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of the Flask app")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-seconds", type=float, default=None, help="Exit non-zero above this wall time")
+    args = parser.parse_args()
+
+    wall, stderr = measure(args.module, args.runs)
+    imports = direct_imports(stderr)
+    print(f"import {args.module}: {wall:.2f}s wall (best of {args.runs}), "
+          f"{sum(us for us, _ in imports) / 1e6:.2f}s in its direct imports")
+    for us, name in imports[:args.top]:
+        print(f"  {us / 1e6:8.3f}s  {name}")
+
+    if args.max_seconds is not None and wall > args.max_seconds:
+        sys.exit(f"Startup regression: {wall:.2f}s > {args.max_seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
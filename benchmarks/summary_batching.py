@@ -0,0 +1,77 @@
+import argparse
+import random
+import textwrap
+import time
+
+from common.models import get_summarizer
+from summary.summarizer import SUMMARY_BUFFER, summarize_chunks, summary_lengths
+
+# Run from the repository root (downloads facebook/bart-large-cnn on first use):
+#   python -m benchmarks.summary_batching --pages 50 --batch-sizes 1 4 8
+# The sequential baseline is the previous summarize_texts loop: one pipeline call per textwrap chunk,
+# each chunk encoded once to measure it and again by the pipeline.
+
+SENTENCES = [
+    "The committee reviewed the quarterly budget and approved the revised allocation for infrastructure.",
+    "Students must submit the signed declaration form before the end of the examination period.",
+    "The circular clarifies the eligibility criteria for the scholarship and the documents required.",
+    "Delays in the procurement process were attributed to incomplete vendor documentation.",
+    "The report recommends periodic audits to ensure compliance with the updated safety guidelines.",
+    "Regional offices are requested to share attendance records with the central administration.",
+]
+
+
+def synthetic_pages(pages, seed):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(SENTENCES) for _ in range(30)) for _ in range(pages)]
+
+
+def sequential(chunks, summary_ratio):
+    from transformers import pipeline
+    tokenizer, model = get_summarizer()
+    summarizer = pipeline("summarization", model=model, tokenizer=tokenizer, truncation=True)
+    summaries, input_tokens = [], 0
+    for chunk in chunks:
+        input_len = len(tokenizer.encode(chunk, truncation=True))
+        if input_len < 30:
+            continue
+        input_tokens += input_len
+        min_len, max_len = summary_lengths(input_len, summary_ratio, SUMMARY_BUFFER)
+        summaries.append(summarizer(chunk, max_length=max_len, min_length=min_len)[0]['summary_text'])
+    return summaries, input_tokens
+
+
+def report(label, elapsed, input_tokens, summaries, tokenizer):
+    output_tokens = sum(len(tokenizer.encode(s)) for s in summaries if s)
+    print(f"{label:14s} {elapsed:8.2f}s  {input_tokens / elapsed:8.1f} input tok/s  "
+          f"{output_tokens / elapsed:7.1f} output tok/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential vs batched BART summarization")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--ratio", type=float, default=0.4)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--skip-sequential", action="store_true")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.pages, args.seed)
+    chunks = [chunk for page in pages for chunk in textwrap.wrap(page, width=1000, break_long_words=False)]
+    tokenizer, _ = get_summarizer()
+    print(f"{args.pages} pages, {len(chunks)} chunks")
+
+    if not args.skip_sequential:
+        start = time.perf_counter()
+        summaries, input_tokens = sequential(chunks, args.ratio)
+        report("sequential", time.perf_counter() - start, input_tokens, summaries, tokenizer)
+
+    for batch_size in args.batch_sizes:
+        stats = {}
+        start = time.perf_counter()
+        summaries = summarize_chunks(chunks, args.ratio, batch_size=batch_size, stats=stats)
+        report(f"batch={batch_size}", time.perf_counter() - start, stats.get('input_tokens', 0), summaries, tokenizer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import random
+import time
+
+from translation.engine import BACKENDS, MAX_BATCH_CHARS, TokenBucket, translate_document
+
+# Run from the repository root:
+#   python -m benchmarks.translation_batching --pages 100 --concurrency 1 4 8 --rate 10
+#   python -m benchmarks.translation_batching --backend google --pages 5   (real requests to Google)
+#   python -m benchmarks.translation_batching --memory   (second document sharing boilerplate, with a translation memory)
+# The default backend simulates a remote service: a fixed round trip plus time per character, and a share of
+# requests failing as if rate limited, so batching, concurrency and retries can be compared offline.
+
+SENTENCES = [
+    "The committee reviewed the quarterly budget and approved the revised allocation for infrastructure.",
+    "Students must submit the signed declaration form before the end of the examination period.",
+    "The circular clarifies the eligibility criteria for the scholarship and the documents required.",
+    "Regional offices are requested to share attendance records with the central administration.",
+]
+
+
+class SimulatedBackend:
+    name = 'simulated'
+
+    def __init__(self, round_trip=0.3, per_char=0.00002, failure_rate=0.05, seed=0):
+        self.round_trip = round_trip
+        self.per_char = per_char
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+
+    async def translate(self, text, src, dest):
+        self.requests += 1
+        await asyncio.sleep(self.round_trip + len(text) * self.per_char)
+        if self.rng.random() < self.failure_rate:
+            raise RuntimeError("429 Too Many Requests")
+        return text
+
+
+def synthetic_text(pages, seed):
+    # Numbered so that almost every sentence is distinct and has to be sent
+    rng = random.Random(seed)
+    return "\n".join(" ".join(f"{rng.choice(SENTENCES)[:-1]} (item {rng.randint(1, 10 ** 6)})." for _ in range(4))
+                     for _ in range(pages * 8))
+
+
+def run(text, backend, concurrency, rate, max_chars, memory=None):
+    stats = {}
+    start = time.perf_counter()
+    result = asyncio.run(translate_document(text, 'en', 'hi', backend=backend, max_chars=max_chars,
+                                            concurrency=concurrency, limiter=TokenBucket(rate, max(1, int(rate))),
+                                            memory=memory, stats=stats))
+    return time.perf_counter() - start, stats, result
+
+
+def make_backend(args):
+    if args.backend == "simulated":
+        return SimulatedBackend(failure_rate=args.failure_rate, seed=args.seed)
+    return BACKENDS[args.backend]()
+
+
+def memory_runs(args):
+    # Two documents of the same kind: the second repeats half of the first's lines, as recurring forms do
+    import os
+    import tempfile
+    from translation.memory import TranslationMemory
+    first = synthetic_text(args.pages, args.seed)
+    fresh = synthetic_text(args.pages, args.seed + 1).splitlines()
+    second = "\n".join(line if i % 2 else fresh[i] for i, line in enumerate(first.splitlines()))
+    concurrency = max(args.concurrency)
+    with tempfile.TemporaryDirectory() as directory:
+        memory = TranslationMemory(os.path.join(directory, "memory.sqlite3"))
+        for label, text in (("first document", first), ("second document", second)):
+            elapsed, stats, _ = run(text, make_backend(args), concurrency, args.rate, args.max_chars, memory)
+            print(f"{label:16s} {elapsed:7.2f}s  {stats['sent']} of {stats['segments']} unique sentences sent")
+        print(f"memory: {memory.stats()}")
+        memory.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunked concurrent translation")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--backend", default="simulated", choices=["simulated"] + list(BACKENDS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--rate", type=float, default=10, help="Requests per second, 0 for unlimited")
+    parser.add_argument("--max-chars", type=int, default=MAX_BATCH_CHARS)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--memory", action="store_true")
+    parser.add_argument("--seed", type=int, default=9)
+    args = parser.parse_args()
+
+    text = synthetic_text(args.pages, args.seed)
+    print(f"{len(text):,} characters, batches of up to {args.max_chars} characters")
+    for concurrency in args.concurrency:
+        elapsed, stats, result = run(text, make_backend(args), concurrency, args.rate, args.max_chars)
+        intact = "in order" if args.backend not in ("simulated", "echo") or result == text else "MISMATCH"
+        print(f"concurrency {concurrency:2d}  {elapsed:7.2f}s  {len(text) / elapsed:10.0f} chars/s  "
+              f"{stats.get('batches', 0)} batches  {stats.get('retries', 0)} retries  {intact}")
+    if args.memory:
+        memory_runs(args)
+
+
+if __name__ == "__main__":
+    main()
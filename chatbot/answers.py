@@ -0,0 +1,299 @@
+import os
+import re
+import time
+import hashlib
+import sqlite3
+import threading
+
+from common.models import EMBEDDING_MODEL, registry
+from summary.chunker import split_sentences
+
+# --- Constants ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHATBOT_LLM = os.environ.get('CHATBOT_LLM', 'gemini')  # a key of BACKENDS
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('CHATBOT_CONTEXT_TOKENS', 1000))
+CONTEXT_CANDIDATES = 8  # chunks retrieved before ranking, dedupe and trimming to the budget
+CHARS_PER_TOKEN = 4  # rough size of an LLM token in English text
+ANSWER_CACHE_DB = os.environ.get('ANSWER_CACHE_DB', os.path.join(ROOT_DIR, '.cache', 'answer_cache.sqlite3'))
+ANSWER_CACHE_THRESHOLD = float(os.environ.get('ANSWER_CACHE_THRESHOLD', 0.92))  # cosine similarity of the questions
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get('ANSWER_CACHE_MAX_ENTRIES', 20000))
+PRUNE_EVERY = 100  # stored answers between size checks
+NO_DOCUMENTS_ANSWER = "No answer available. Please upload a PDF first."
+PROMPT = ("Use the following pieces of context to answer the question. "
+          "If you don't know the answer, just say you don't know.")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    scope TEXT NOT NULL,
+    query TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    answer TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_scope ON answers (scope);
+CREATE INDEX IF NOT EXISTS answers_used_at ON answers (used_at);
+"""
+
+
+# --- LLM backends ---
+# A backend answers one prompt: `backend.complete(prompt)` -> text, and `backend.stream(prompt)` yields the answer
+# in pieces as they are generated. Closing the stream early abandons the generation.
+def load_gemini():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash",
+        api_key="Your-API-key"
+    )
+
+
+registry.register("gemini", load_gemini)
+
+
+class GeminiLLM:
+    name = 'gemini'
+
+    def __init__(self):
+        self.client = registry.get("gemini")
+
+    def complete(self, prompt):
+        return self.client.invoke(prompt).content
+
+    def stream(self, prompt):
+        for chunk in self.client.stream(prompt):
+            if chunk.content:
+                yield chunk.content
+
+
+class StubLLM:
+    # Offline stand-in for tests and benchmarks: quotes the start of the context, after an optional simulated
+    # latency before the first token and between tokens
+    name = 'stub'
+
+    def __init__(self, latency=float(os.environ.get('CHATBOT_STUB_LATENCY', 0)),
+                 token_latency=float(os.environ.get('CHATBOT_STUB_TOKEN_LATENCY', 0))):
+        self.latency = latency
+        self.token_latency = token_latency
+
+    def complete(self, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+        context = prompt.split("Context: ", 1)[-1].split("\nUser Question:", 1)[0]
+        return f"From the documents: {context[:200]}"
+
+    def stream(self, prompt):
+        words = self.complete(prompt).split(" ")
+        for i, word in enumerate(words):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            yield word if i == len(words) - 1 else word + " "
+
+
+BACKENDS = {
+    'gemini': GeminiLLM,
+    'stub': StubLLM,
+}
+
+
+def register_backend(name, factory):
+    BACKENDS[name] = factory
+
+
+def get_llm(name=None):
+    return BACKENDS[name or CHATBOT_LLM]()
+
+
+# --- Context ---
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def normalize_sentence(sentence):
+    return re.sub(r"\s+", " ", sentence).strip().lower()
+
+
+def build_context(hits, budget=CONTEXT_TOKEN_BUDGET):
+    # hits come closest first. Sentences already taken from a better chunk (chunk overlap, repeated boilerplate,
+    # the same page in two documents) are dropped, and chunks are added until the token budget is spent; the chunk
+    # that crosses it keeps only its leading sentences that fit.
+    chosen, used, seen = [], 0, set()
+    for hit in hits:
+        sentences = [s for s in split_sentences(hit['text']) if normalize_sentence(s) not in seen]
+        kept = []
+        for sentence in sentences:
+            cost = estimate_tokens(sentence)
+            if used + cost > budget:
+                break
+            kept.append(sentence)
+            used += cost
+        if kept:
+            seen.update(normalize_sentence(s) for s in kept)
+            chosen.append(dict(hit, text=" ".join(kept)))
+        if len(kept) < len(sentences):
+            break
+    return chosen, used
+
+
+def build_prompt(query, context):
+    relevant_search = "\n".join(chunk['text'] for chunk in context)
+    return f"{PROMPT}\nContext: {relevant_search}\nUser Question: {query}"
+
+
+# --- Semantic answer cache ---
+def answer_scope(digests, llm_name, embedding_model=EMBEDDING_MODEL):
+    # Answers are reused only for the same set of documents, the same LLM and the same embedding model, whose
+    # vectors both retrieved the context and matched the question
+    scope = f"{llm_name}|{embedding_model}|{','.join(sorted(digests))}"
+    return hashlib.sha256(scope.encode('utf-8')).hexdigest()
+
+
+# Persistent question -> answer cache. A question whose embedding is within ANSWER_CACHE_THRESHOLD cosine
+# similarity of an earlier question on the same documents gets that question's answer without an LLM call.
+# Once it holds more than max_entries the least recently used answers are dropped.
+class AnswerCache:
+    def __init__(self, path=ANSWER_CACHE_DB, threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.metrics = {'lookups': 0, 'hits': 0, 'stores': 0, 'evictions': 0}
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _unit(vector):
+        import numpy as np
+        vector = np.asarray(vector, dtype='float32')
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, scope, vector):
+        # (answer, similarity) of the closest earlier question above the threshold, or None
+        import numpy as np
+        query = self._unit(vector)
+        with self._lock:
+            self.metrics['lookups'] += 1
+            rows = self.conn.execute("SELECT id, vector, answer FROM answers WHERE scope = ?", (scope,)).fetchall()
+            if not rows:
+                return None
+            similarities = np.stack([np.frombuffer(blob, dtype='float32') for _, blob, _ in rows]) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE answers SET hits = hits + 1, used_at = ? WHERE id = ?",
+                                  (time.time(), rows[best][0]))
+            self.metrics['hits'] += 1
+            return rows[best][2], float(similarities[best])
+
+    def store(self, scope, query, vector, answer):
+        if not answer:
+            return
+        with self._lock:
+            with self.conn:
+                self.conn.execute("INSERT INTO answers (scope, query, vector, answer, used_at) VALUES (?, ?, ?, ?, ?)",
+                                  (scope, query, self._unit(vector).tobytes(), answer, time.time()))
+            self.metrics['stores'] += 1
+            self._writes += 1
+            if self._writes >= PRUNE_EVERY:
+                self._writes = 0
+                self._prune()
+
+    def _prune(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            with self.conn:
+                self.conn.execute("DELETE FROM answers WHERE id IN "
+                                  "(SELECT id FROM answers ORDER BY used_at LIMIT ?)", (excess,))
+            self.metrics['evictions'] += excess
+
+    def stats(self):
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            hit_rate = round(self.metrics['hits'] / self.metrics['lookups'], 3) if self.metrics['lookups'] else None
+            return dict(self.metrics, hit_rate=hit_rate, entries=entries)
+
+
+answer_cache = AnswerCache()
+
+
+# Answers whose stream was closed before the LLM finished, e.g. because the client went away
+stream_metrics = {'streams': 0, 'completed': 0, 'cancelled': 0}
+
+
+def prepare_answer(query, collection, store, embeddings, llm, cache):
+    # Everything before the LLM call. The question is embedded once, for the cache lookup and for retrieval.
+    # None when the collection is empty.
+    documents = store.documents(collection)
+    if not documents:
+        return None
+    vector = embeddings.embed_query(query)
+    prepared = {'vector': vector, 'scope': answer_scope([document['id'] for document in documents], llm.name)}
+    cached = cache.lookup(prepared['scope'], vector) if cache is not None else None
+    if cached:
+        prepared['cached'] = cached
+        return prepared
+    context, context_tokens = build_context(store.search(collection, vector, CONTEXT_CANDIDATES))
+    prepared.update(cached=None, context=context, context_tokens=context_tokens,
+                    sources=[{'document': chunk['document'], 'page': chunk['page']} for chunk in context])
+    return prepared
+
+
+def answer_question(query, collection, store, embeddings, llm=None, cache=answer_cache):
+    # None when the collection is empty
+    llm = llm or get_llm()
+    prepared = prepare_answer(query, collection, store, embeddings, llm, cache)
+    if prepared is None:
+        return None
+    if prepared['cached']:
+        answer, similarity = prepared['cached']
+        return {'answer': answer, 'cached': True, 'similarity': round(similarity, 3)}
+    answer = llm.complete(build_prompt(query, prepared['context']))
+    if cache is not None:
+        cache.store(prepared['scope'], query, prepared['vector'], answer)
+    return {'answer': answer, 'cached': False, 'context_tokens': prepared['context_tokens'],
+            'sources': prepared['sources']}
+
+
+def stream_answer(query, collection, store, embeddings, llm=None, cache=answer_cache):
+    # Yields ('sources', ...) as soon as retrieval is done, then ('token', {'text': ...}) pieces as the LLM
+    # generates them, then ('done', {'answer': ...}); a cached answer comes whole with done. Closing the generator
+    # stops the LLM stream; only complete answers are cached.
+    llm = llm or get_llm()
+    prepared = prepare_answer(query, collection, store, embeddings, llm, cache)
+    if prepared is None:
+        yield 'done', {'answer': NO_DOCUMENTS_ANSWER}
+        return
+    if prepared['cached']:
+        answer, similarity = prepared['cached']
+        # Sent whole with done rather than as a token, so cache hits stay out of the time to first token
+        yield 'sources', {'sources': [], 'cached': True, 'similarity': round(similarity, 3)}
+        yield 'done', {'answer': answer, 'cached': True}
+        return
+    yield 'sources', {'sources': prepared['sources'], 'cached': False, 'context_tokens': prepared['context_tokens']}
+    prompt = build_prompt(query, prepared['context'])
+    pieces = llm.stream(prompt) if hasattr(llm, 'stream') else iter([llm.complete(prompt)])
+    stream_metrics['streams'] += 1
+    answer = []
+    try:
+        for piece in pieces:
+            answer.append(piece)
+            yield 'token', {'text': piece}
+    except GeneratorExit:
+        stream_metrics['cancelled'] += 1
+        raise
+    finally:
+        if hasattr(pieces, 'close'):
+            pieces.close()
+    stream_metrics['completed'] += 1
+    answer = "".join(answer)
+    if cache is not None:
+        cache.store(prepared['scope'], query, prepared['vector'], answer)
+    yield 'done', {'answer': answer, 'cached': False}
@@ -1,36 +1,76 @@
-import os
-import shutil
-from flask import Blueprint, render_template, request, jsonify, current_app
-from werkzeug.utils import secure_filename
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.vectorstores import FAISS
+import re
+import uuid
+import logging
+from flask import Blueprint, render_template, request, jsonify, after_this_request
+from common.cache import file_digest
+from common.document import document_pages, load_document
+from common.models import get_embeddings, registry
+from common.streaming import first_token_metrics, stream_events, wants_stream
+from common.workspace import Workspace
+from chatbot.answers import NO_DOCUMENTS_ANSWER, answer_question, get_llm, stream_answer
+from chatbot.ingest import chunk_pages, embed_chunks, embedding_cache, embedding_window
+from chatbot.store import document_store
+from jobs.app import submit_job, wants_job
 
 # Define Blueprint
 chatbot_bp = Blueprint('chatbot', __name__, template_folder='templates', static_folder='static', static_url_path='/chatbot/static')
 
-# Use dedicated folder for chatbot uploads
-UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads', 'chatbot')
 ALLOWED_EXTENSIONS = {'pdf'}
+SESSION_COOKIE = 'chatbot_session'
+COLLECTION_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")
 
 # Helper to check allowed extensions
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# Process the uploaded PDF
-def process_pdf(file_path):
-    loader = PyPDFLoader(file_path)
-    pages = loader.load_and_split()
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    db = FAISS.from_documents(pages, embeddings)
-    return db
+# Documents are searched per collection: a name passed as ?collection= (or a form field) is shared by everyone
+# using it, otherwise each browser gets its own collection through a cookie. None means the name is invalid.
+def collection_name():
+    name = request.values.get('collection')
+    if name is not None:
+        return name if COLLECTION_NAME.fullmatch(name) else None
+    name = request.cookies.get(SESSION_COOKIE)
+    if name and COLLECTION_NAME.fullmatch(name):
+        return name
+    name = uuid.uuid4().hex
 
-# Gemini LLM setup
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    api_key="Your-API-key"
-)
+    @after_this_request
+    def remember(response):
+        response.set_cookie(SESSION_COOKIE, name, httponly=True, samesite='Lax')
+        return response
+    return name
+
+# Split the document's pages into chunks that fit the embedding model's input
+def chunk_document(document):
+    with registry.use("embeddings") as embeddings:
+        return list(chunk_pages(document_pages(document), *embedding_window(embeddings)))
+
+# Embed the document unless it is already stored, then add it to the collection. load() returns the shared
+# document and is only called when the document is new. Chunks seen in any earlier document come from the
+# embedding cache; on_progress(done, total) follows the chunks still to embed.
+def ingest_document(digest, name, collection, load, on_progress=None):
+    def embed(texts):
+        with registry.use("embeddings") as embeddings:
+            return embed_chunks(texts, embeddings, embedding_cache, on_progress=on_progress)
+    embedded = document_store.add_document(digest, lambda: chunk_document(load()), embed, name)
+    document_store.add_to_collection(collection, digest)
+    return {"status": "success", "document": digest, "embedded": embedded, "collection": collection,
+            "documents": document_store.documents(collection)}
+
+def ingest_pdf(file_path, name, collection, on_progress=None):
+    digest = file_digest(file_path)
+    return ingest_document(digest, name, collection, lambda: load_document(file_path, name, digest), on_progress)
+
+# The embedding model stays checked out until the last answer event is sent
+def answer_events(query, collection):
+    with registry.use("embeddings") as embeddings:
+        yield from stream_answer(query, collection, document_store, embeddings)
+
+def warm_up():
+    # Heavy imports and models are deferred to first use; this loads them ahead of traffic
+    import faiss
+    get_embeddings()
+    get_llm()
 
 # Routes
 @chatbot_bp.route('/')
@@ -46,40 +86,72 @@ def upload_pdf():
     if file.filename == '':
         return jsonify({"status": "error", "message": "No selected file"})
     
+    collection = collection_name()
+    if collection is None:
+        return jsonify({"status": "error", "message": "Invalid collection name"}), 400
+
     if file and allowed_file(file.filename):
-        # ✅ Clean and recreate upload folder
-        if os.path.exists(UPLOAD_FOLDER):
-            shutil.rmtree(UPLOAD_FOLDER)
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-        # ✅ Save file
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-
-        # ✅ Process and delete after use
-        db = process_pdf(file_path)
-        current_app.config['chatbot_db'] = db
-        shutil.rmtree(UPLOAD_FOLDER)  # ✅ Delete uploaded file(s) after processing
-
-        return jsonify({"status": "success"})
+        # ✅ Save into a private per-request directory, deleted once the PDF is indexed
+        workspace = Workspace('chatbot-')
+        try:
+            file_path = workspace.save(file)
+        except Exception as e:
+            workspace.cleanup()
+            logging.error(f"Error saving file {file.filename}: {e}")
+            return jsonify({"status": "error", "message": f"Error saving file: {str(e)}"}), 500
+        if wants_job():
+            def work(job):
+                job.update(message="Indexing PDF")
+                return ingest_pdf(file_path, file.filename, collection,
+                                  lambda done, total: job.update(done / total, f"Embedded {done}/{total} chunks"))
+            return submit_job('chatbot', work, cleanup=workspace.cleanup)
+
+        try:
+            result = ingest_pdf(file_path, file.filename, collection)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)})
+        finally:
+            workspace.cleanup()
+
+        return jsonify(result)
     
     return jsonify({"status": "error", "message": "Invalid file format"})
 
+@chatbot_bp.route('/documents', methods=['GET'])
+def list_documents():
+    collection = collection_name()
+    if collection is None:
+        return jsonify({"status": "error", "message": "Invalid collection name"}), 400
+    return jsonify({"collection": collection, "documents": document_store.documents(collection)})
+
+@chatbot_bp.route('/documents/<digest>', methods=['DELETE'])
+def remove_document(digest):
+    # Removes the document from this collection only; its index stays stored for other collections and re-uploads
+    collection = collection_name()
+    if collection is None:
+        return jsonify({"status": "error", "message": "Invalid collection name"}), 400
+    if not document_store.remove_from_collection(collection, digest):
+        return jsonify({"status": "error", "message": "Document not in this collection"}), 404
+    return jsonify({"status": "success", "documents": document_store.documents(collection)})
+
 @chatbot_bp.route('/get_answer', methods=['GET'])
 def get_answer():
     query = request.args.get('query')
-    db = current_app.config.get('chatbot_db')
-
-    if db is not None and query:
-        docs = db.similarity_search(query)
-        relevant_search = "\n".join([x.page_content for x in docs])
-        gemini_prompt = (
-            "Use the following pieces of context to answer the question. "
-            "If you don't know the answer, just say you don't know."
-        )
-        input_prompt = f"{gemini_prompt}\nContext: {relevant_search}\nUser Question: {query}"
-        result = llm.invoke(input_prompt)
-        return jsonify({"answer": result.content})
-    
-    return jsonify({"answer": "No answer available. Please upload a PDF first."})
+    collection = collection_name()
+
+    # An empty collection is answered before the embedding model is loaded
+    if not (collection and query and document_store.documents(collection)):
+        if wants_stream():
+            return stream_events('chatbot', iter([('done', {'answer': NO_DOCUMENTS_ANSWER})]))
+        return jsonify({"answer": NO_DOCUMENTS_ANSWER})
+
+    if wants_stream():
+        # Sources first, then the answer token by token; time to the first token is recorded
+        events = answer_events(query, collection)
+        return stream_events('chatbot', events, first_event='token', metrics=first_token_metrics)
+
+    with registry.use("embeddings") as embeddings:
+        result = answer_question(query, collection, document_store, embeddings)
+    if result is not None:
+        return jsonify(result)
+    return jsonify({"answer": NO_DOCUMENTS_ANSWER})
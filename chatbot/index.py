@@ -0,0 +1,84 @@
+import os
+import math
+
+# --- Constants ---
+INDEX_KINDS = ('auto', 'flat', 'ivf', 'hnsw')
+INDEX_COMPRESSIONS = ('none', 'fp16', 'sq8', 'pq')
+INDEX_KIND = os.environ.get('CHATBOT_INDEX', 'auto')
+INDEX_COMPRESSION = os.environ.get('CHATBOT_INDEX_COMPRESSION', 'none')
+APPROXIMATE_MIN = int(os.environ.get('CHATBOT_APPROXIMATE_MIN', 100000))  # 'auto' switches from flat to IVF here
+IVF_NPROBE = int(os.environ.get('CHATBOT_IVF_NPROBE', 16))  # inverted lists visited per query
+HNSW_M = 32  # graph neighbours per vector
+HNSW_EF_SEARCH = int(os.environ.get('CHATBOT_HNSW_EF_SEARCH', 64))
+PQ_DIMS_PER_SUBQUANTIZER = 4  # 4-bit fast-scan PQ: 384 dims -> 96 subquantizers, 48 bytes per vector
+TRAIN_POINTS_PER_CENTROID = 64  # k-means sample: faiss wants 39-256 points per centroid
+PQ_MIN_TRAIN = 16 * 39  # 4-bit PQ trains 16 centroids per subquantizer
+MAX_TRAIN_POINTS = 200000
+
+
+def ivf_lists(count):
+    # Rule of thumb of 4 * sqrt(n) inverted lists, with enough vectors per list to train the centroids
+    return max(1, min(int(4 * math.sqrt(count)), count // TRAIN_POINTS_PER_CENTROID, 65536))
+
+
+def pq_subquantizers(dimension):
+    # Largest divisor of the dimension not above the target subquantizer count
+    target = max(1, dimension // PQ_DIMS_PER_SUBQUANTIZER)
+    return max(m for m in range(1, target + 1) if dimension % m == 0)
+
+
+def index_spec(count, dimension, kind=INDEX_KIND, compression=INDEX_COMPRESSION):
+    # faiss.index_factory description for count vectors. 'auto' stays exact (flat) below APPROXIMATE_MIN and uses
+    # IVF above it. Compression stores vectors as float16 (2x smaller), 8-bit scalars (4x) or 4-bit PQ codes (32x,
+    # with a clear loss of recall); PQ falls back to float32 when there are too few vectors to train its codebooks.
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind {kind!r}, expected one of {', '.join(INDEX_KINDS)}")
+    if compression not in INDEX_COMPRESSIONS:
+        raise ValueError(f"Unknown index compression {compression!r}, expected one of {', '.join(INDEX_COMPRESSIONS)}")
+    if kind == 'auto':
+        kind = 'flat' if count < APPROXIMATE_MIN else 'ivf'
+    if kind == 'hnsw' and compression == 'pq':
+        raise ValueError("HNSW indexes support none, fp16 or sq8 compression")
+    if compression == 'pq' and count < PQ_MIN_TRAIN:
+        compression = 'none'
+    codes = {'none': 'Flat', 'fp16': 'SQfp16', 'sq8': 'SQ8', 'pq': f"PQ{pq_subquantizers(dimension)}x4fs"}[compression]
+    if kind == 'ivf' and count >= 2 * TRAIN_POINTS_PER_CENTROID:
+        return f"IVF{ivf_lists(count)},{codes}"
+    if kind == 'hnsw':
+        return f"HNSW{HNSW_M},{codes}"
+    return codes
+
+
+def index_kind(spec):
+    return 'ivf' if spec.startswith('IVF') else 'hnsw' if spec.startswith('HNSW') else 'flat'
+
+
+def tune(index, spec):
+    # Query-time accuracy/speed settings; they are not saved with the index, so they are applied after loading
+    import faiss
+    kind = index_kind(spec)
+    if kind == 'ivf':
+        faiss.ParameterSpace().set_index_parameter(index, 'nprobe', IVF_NPROBE)
+    elif kind == 'hnsw':
+        faiss.ParameterSpace().set_index_parameter(index, 'efSearch', HNSW_EF_SEARCH)
+    return index
+
+
+def build_index(vectors, spec):
+    # L2 index over float32 vectors (n x d), trained on a random sample when the spec needs it
+    import faiss
+    import numpy as np
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    index = faiss.index_factory(vectors.shape[1], spec, faiss.METRIC_L2)
+    if not index.is_trained:
+        sample = vectors
+        if len(vectors) > MAX_TRAIN_POINTS:
+            sample = vectors[np.random.default_rng(0).choice(len(vectors), MAX_TRAIN_POINTS, replace=False)]
+        index.train(sample)
+    index.add(vectors)
+    return tune(index, spec)
+
+
+def index_layout(spec):
+    # What a rebuild would change, ignoring the IVF list count that grows with the collection
+    return index_kind(spec), spec.split(',')[-1]
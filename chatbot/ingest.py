@@ -0,0 +1,192 @@
+import os
+import hashlib
+import sqlite3
+import threading
+
+from common.models import EMBEDDING_BATCH_SIZE, EMBEDDING_MODEL
+from common.workspace import safe_filename
+from summary.chunker import split_sentences
+
+# --- Constants ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMBEDDING_CACHE_DIR = os.environ.get('EMBEDDING_CACHE_DIR', os.path.join(ROOT_DIR, '.cache', 'embeddings'))
+EMBEDDING_MAX_TOKENS = 256  # all-MiniLM-L6-v2's max_seq_length, used when the model does not report one
+CHUNK_OVERLAP_TOKENS = 32
+EMBED_GROUP_BATCHES = 8  # batches per embed_documents call; the model length-sorts within a call
+LOOKUP_CHUNK = 500  # keys per SELECT, below SQLite's bound-parameter limit
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    key TEXT PRIMARY KEY,
+    row INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+# --- Chunking ---
+def embedding_window(embeddings):
+    # Tokenizer and input limit of the sentence-transformers model behind HuggingFaceEmbeddings
+    client = embeddings.client
+    return client.tokenizer, client.max_seq_length or EMBEDDING_MAX_TOKENS
+
+
+def sentence_pieces(tokenizer, sentences, budget):
+    # (text, token count) per sentence; a sentence longer than the budget is cut at token boundaries
+    encoded = tokenizer(sentences, add_special_tokens=False, return_offsets_mapping=True)
+    for sentence, offsets in zip(sentences, encoded['offset_mapping']):
+        for i in range(0, len(offsets), budget):
+            piece = offsets[i:i + budget]
+            yield sentence[piece[0][0]:piece[-1][1]], len(piece)
+
+
+def chunk_pages(pages, tokenizer, max_tokens=EMBEDDING_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    # Packs whole sentences of each (page_no, text) into chunks that fit the embedding model's input, so nothing
+    # is silently truncated. Chunks never span pages, which keeps the page number exact and makes a page shared
+    # by two documents produce the same chunks (and embedding cache hits). Consecutive chunks share up to
+    # overlap_tokens of trailing sentences.
+    budget = max_tokens - tokenizer.num_special_tokens_to_add()
+    for page_no, text in pages:
+        sentences = [" ".join(sentence.split()) for sentence in split_sentences(text or "")]
+        sentences = [sentence for sentence in sentences if sentence]
+        if not sentences:
+            continue
+        current, current_len = [], 0
+        for piece, length in sentence_pieces(tokenizer, sentences, budget):
+            if current and current_len + length > budget:
+                yield {'text': " ".join(text for text, _ in current), 'page': page_no}
+                carried, carried_len = [], 0
+                for previous in reversed(current):
+                    if carried_len + previous[1] > overlap_tokens or carried_len + previous[1] + length > budget:
+                        break
+                    carried.insert(0, previous)
+                    carried_len += previous[1]
+                current, current_len = carried, carried_len
+            current.append((piece, length))
+            current_len += length
+        if current:
+            yield {'text': " ".join(text for text, _ in current), 'page': page_no}
+
+
+# --- Embedding cache ---
+def chunk_key(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+# Persistent chunk text -> embedding cache for one model: vectors are appended to a float32 matrix file that is
+# read through a memory map, and SQLite maps each chunk's content hash to its row. Appends happen inside a
+# SQLite write transaction, so several worker processes can share the cache.
+class EmbeddingCache:
+    def __init__(self, directory=os.path.join(EMBEDDING_CACHE_DIR, safe_filename(EMBEDDING_MODEL))):
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, 'vectors.f32')
+        self.conn = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), check_same_thread=False,
+                                    isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.metrics = {'lookups': 0, 'hits': 0, 'stores': 0}
+
+    def close(self):
+        self.conn.close()
+
+    def _dimension(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'dimension'").fetchone()
+        return row[0] if row else None
+
+    def _rows(self, rows, dimension):
+        # Reopens the memory map when rows were appended since it was opened
+        import numpy as np
+        if self._matrix is None or max(rows) >= self._matrix.shape[0]:
+            count = os.path.getsize(self.vectors_path) // (4 * dimension)
+            self._matrix = np.memmap(self.vectors_path, dtype='float32', mode='r', shape=(count, dimension))
+        return np.array(self._matrix[rows])
+
+    def get_many(self, keys):
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            self.metrics['lookups'] += len(keys)
+            dimension = self._dimension()
+            if dimension is None or not keys:
+                return found
+            for i in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[i:i + LOOKUP_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                found.update(self.conn.execute(f"SELECT key, row FROM chunks WHERE key IN ({placeholders})", chunk))
+            if found:
+                vectors = self._rows(list(found.values()), dimension)
+                found = dict(zip(found, vectors))
+            self.metrics['hits'] += len(found)
+        return found
+
+    def put_many(self, vectors):
+        # vectors: {key: vector}
+        import numpy as np
+        if not vectors:
+            return
+        keys = list(vectors)
+        matrix = np.asarray([vectors[key] for key in keys], dtype='float32')
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                dimension = self._dimension()
+                if dimension is None:
+                    dimension = matrix.shape[1]
+                    self.conn.execute("INSERT INTO meta (name, value) VALUES ('dimension', ?)", (dimension,))
+                elif dimension != matrix.shape[1]:
+                    raise ValueError(f"Embedding cache holds {dimension}-dimensional vectors, got {matrix.shape[1]}")
+                # A partial row left by a writer that died mid-write is overwritten
+                with open(self.vectors_path, 'r+b' if os.path.exists(self.vectors_path) else 'wb') as f:
+                    f.seek(0, os.SEEK_END)
+                    start = f.tell() // (4 * dimension)
+                    f.seek(start * 4 * dimension)
+                    f.write(matrix.tobytes())
+                self.conn.executemany("INSERT OR REPLACE INTO chunks (key, row) VALUES (?, ?)",
+                                      [(key, start + i) for i, key in enumerate(keys)])
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.metrics['stores'] += len(keys)
+
+    def stats(self):
+        with self._lock:
+            chunks = self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        hit_rate = round(self.metrics['hits'] / self.metrics['lookups'], 3) if self.metrics['lookups'] else None
+        return dict(self.metrics, hit_rate=hit_rate, chunks=chunks, megabytes=round(size / 2 ** 20, 1))
+
+
+embedding_cache = EmbeddingCache()
+
+
+def embed_chunks(texts, embeddings, cache=embedding_cache, batch_size=EMBEDDING_BATCH_SIZE, on_progress=None,
+                 stats=None):
+    # Embeddings for texts, in order. Cached chunks are read back; the rest are embedded once per distinct text,
+    # EMBED_GROUP_BATCHES batches per model call, and stored after each call. on_progress(done, total) follows
+    # the texts still to embed.
+    import numpy as np
+    keys = [chunk_key(text) for text in texts]
+    vectors = cache.get_many(set(keys)) if cache is not None else {}
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors:
+            missing.setdefault(key, text)
+    missing = list(missing.items())
+    group = batch_size * EMBED_GROUP_BATCHES
+    for i in range(0, len(missing), group):
+        items = missing[i:i + group]
+        embedded = dict(zip((key for key, _ in items), embeddings.embed_documents([text for _, text in items])))
+        if cache is not None:
+            cache.put_many(embedded)
+        vectors.update(embedded)
+        if on_progress:
+            on_progress(i + len(items), len(missing))
+    if stats is not None:
+        stats.update(chunks=len(texts), embedded=len(missing), reused=len(texts) - len(missing))
+    return np.asarray([vectors[key] for key in keys], dtype='float32')
@@ -8,6 +8,12 @@ document.addEventListener("DOMContentLoaded", function() {
     const processingDiv = document.getElementById("processing");
     const uploadStatus = document.getElementById("upload-status");
     const loadingSpinner = document.getElementById("loading");
+    const documentList = document.getElementById("document-list");
+
+    // Documents uploaded earlier in this chat are kept on the server
+    fetch("/chatbot/documents")
+        .then(response => response.json())
+        .then(data => showDocuments(data.documents || []));
 
     // Handle the PDF upload form
     uploadForm.addEventListener("submit", function(e) {
@@ -30,6 +36,7 @@ document.addEventListener("DOMContentLoaded", function() {
             if (data.status === "success") {
                 processingDiv.classList.add("hidden");  // Hide processing spinner after success
                 uploadStatus.classList.remove("hidden"); // Show success message
+                showDocuments(data.documents);
             } else {
                 uploadStatus.classList.add("hidden");
                 alert("Error processing PDF.");
@@ -42,7 +49,9 @@ document.addEventListener("DOMContentLoaded", function() {
         });
     });
 
-    // Handle the query submission
+    // Handle the query submission: the answer streams in token by token; asking a new question abandons the
+    // previous answer, which also stops its generation on the server
+    let currentAnswer = null;
     getAnswerButton.addEventListener("click", function() {
         const query = queryInput.value.trim();
         if (query) {
@@ -52,19 +61,52 @@ document.addEventListener("DOMContentLoaded", function() {
             // Show loading spinner
             loadingSpinner.style.display = "block";
 
-            fetch(`/chatbot/get_answer?query=${encodeURIComponent(query)}`)
-                .then(response => response.json())
-                .then(data => {
-                    if (data.answer) {
+            if (currentAnswer) currentAnswer.abort();
+            const controller = new AbortController();
+            currentAnswer = controller;
+            let messageDiv = null;
+
+            fetch(`/chatbot/get_answer?stream=1&query=${encodeURIComponent(query)}`, { signal: controller.signal })
+                .then(response => readEvents(response, (event, data) => {
+                    if (event === "token") {
+                        loadingSpinner.style.display = "none";
+                        if (!messageDiv) messageDiv = addChatMessage("ai", "");
+                        messageDiv.textContent += data.text;
+                        chatContainer.scrollTop = chatContainer.scrollHeight;
+                    } else if (event === "done" && !messageDiv) {
                         addChatMessage("ai", data.answer);
+                    } else if (event === "error") {
+                        addChatMessage("ai", "Error: " + data.error);
                     }
+                }))
+                .catch(error => {
+                    if (error.name !== "AbortError") console.error("Error getting answer:", error);
                 })
                 .finally(() => {
-                    loadingSpinner.style.display = "none"; // Hide loading spinner once the answer is fetched
+                    loadingSpinner.style.display = "none"; // Hide loading spinner once the answer is complete
+                    if (currentAnswer === controller) currentAnswer = null;
                 });
         }
     });
 
+    // List the documents questions are answered from, each with a button to remove it from this chat
+    function showDocuments(documents) {
+        documentList.innerHTML = "";
+        documents.forEach(doc => {
+            const item = document.createElement("li");
+            item.textContent = `${doc.name || doc.id.slice(0, 12)} (${doc.chunks} chunks) `;
+            const removeButton = document.createElement("button");
+            removeButton.textContent = "✕";
+            removeButton.addEventListener("click", function() {
+                fetch(`/chatbot/documents/${doc.id}`, { method: "DELETE" })
+                    .then(response => response.json())
+                    .then(data => showDocuments(data.documents || []));
+            });
+            item.appendChild(removeButton);
+            documentList.appendChild(item);
+        });
+    }
+
     // Add chat message to the chat container
     function addChatMessage(type, message) {
         const messageDiv = document.createElement("div");
@@ -72,5 +114,6 @@ document.addEventListener("DOMContentLoaded", function() {
         messageDiv.textContent = type === "user" ? "🧑 Question: " + message : "🤖 AI: " + message;
         chatContainer.appendChild(messageDiv);
         chatContainer.scrollTop = chatContainer.scrollHeight;
+        return messageDiv;
     }
 });
@@ -0,0 +1,334 @@
+import os
+import json
+import math
+import time
+import bisect
+import shutil
+import hashlib
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+from chatbot.index import build_index, index_layout, index_spec, tune
+from common.models import EMBEDDING_MODEL
+from common.workspace import safe_filename
+
+# --- Constants ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.environ.get('CHATBOT_STORE_DIR', os.path.join(ROOT_DIR, '.cache', 'chatbot_store'))
+# Each embedding model gets its own store, so vectors of one model are never searched with another's queries. The
+# name's hash tells apart local model paths that end in the same directory name.
+MODEL_STORE_DIR = os.path.join(STORE_DIR, f"{safe_filename(EMBEDDING_MODEL)}-"
+                                          f"{hashlib.sha256(EMBEDDING_MODEL.encode('utf-8')).hexdigest()[:8]}")
+LOADED_INDEXES = int(os.environ.get('CHATBOT_LOADED_INDEXES', 32))  # per-document indexes kept open per process
+LOADED_COLLECTIONS = 4  # combined collection indexes kept open per process
+SEARCH_K = 4  # chunks returned per question, as FAISS.similarity_search did
+# Chunks at which a collection gets one combined index (flat, IVF or HNSW, see chatbot/index.py) instead of
+# being searched document by document
+COLLECTION_INDEX_MIN = int(os.environ.get('CHATBOT_COLLECTION_INDEX_MIN', 20000))
+REBUILD_FRACTION = 0.25  # rebuild once chunks added or removed since the last build exceed this share of it
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    digest TEXT PRIMARY KEY,
+    name TEXT,
+    chunks INTEGER NOT NULL,
+    dimension INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS collection_documents (
+    collection TEXT NOT NULL,
+    digest TEXT NOT NULL REFERENCES documents (digest),
+    added_at REAL NOT NULL,
+    PRIMARY KEY (collection, digest)
+);
+"""
+
+
+# Persistent chatbot document store. Every PDF is embedded once and saved as its own FAISS index plus chunk
+# texts under STORE_DIR/<embedding model>/<content hash>/; collections (one per chat session, or a shared named
+# one) are lists of document hashes in SQLite. Re-uploading a known PDF only adds it to the collection, and since everything lives
+# on disk, restarts and other worker processes see the same documents. Indexes are memory-mapped when opened.
+# Large collections also get a combined index, rebuilt in the background as the collection grows; until a build is
+# in place, search uses the previous one and searches documents added since it on their own.
+class DocumentStore:
+    def __init__(self, directory=MODEL_STORE_DIR, loaded_indexes=LOADED_INDEXES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.loaded_indexes = loaded_indexes
+        self.conn = sqlite3.connect(os.path.join(directory, 'store.sqlite3'), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._document_locks = {}
+        self._collection_locks = {}
+        self._refreshing = {}  # collection -> whether it changed again during the running refresh
+        self._loaded = OrderedDict()
+        self._collections = OrderedDict()
+        self.metrics = {'documents_embedded': 0, 'documents_reused': 0, 'chunks_embedded': 0, 'searches': 0,
+                        'index_builds': 0}
+
+    def close(self):
+        self.conn.close()
+
+    def _document_dir(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _collection_dir(self, collection):
+        return os.path.join(self.directory, 'collections', hashlib.sha256(collection.encode('utf-8')).hexdigest()[:32])
+
+    # --- Documents ---
+    def has_document(self, digest):
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM documents WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def add_document(self, digest, load_chunks, embed, name=None):
+        # load_chunks() -> [{'text': ..., 'page': ...}], embed(texts) -> vectors; both only run for unknown documents.
+        # Returns True when the document was embedded, False when it was already stored.
+        with self._lock:
+            lock = self._document_locks.setdefault(digest, threading.Lock())
+        with lock:
+            if self.has_document(digest):
+                self.metrics['documents_reused'] += 1
+                return False
+            import faiss
+            import numpy as np
+            chunks = [chunk for chunk in load_chunks() if chunk['text'].strip()]
+            if not chunks:
+                raise ValueError("No text found in the document")
+            vectors = np.asarray(embed([chunk['text'] for chunk in chunks]), dtype='float32')
+            index = faiss.IndexFlatL2(vectors.shape[1])
+            index.add(vectors)
+            # Written to a temporary directory and renamed, so a half-written document is never visible
+            final_dir = self._document_dir(digest)
+            temp_dir = f"{final_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+            os.makedirs(temp_dir, exist_ok=True)
+            try:
+                faiss.write_index(index, os.path.join(temp_dir, 'index.faiss'))
+                with open(os.path.join(temp_dir, 'chunks.json'), 'w', encoding='utf-8') as f:
+                    json.dump(chunks, f)
+                try:
+                    os.rename(temp_dir, final_dir)
+                except OSError:
+                    pass  # another process stored the same document first
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            with self._lock:
+                with self.conn:
+                    self.conn.execute("INSERT OR IGNORE INTO documents (digest, name, chunks, dimension, created_at) "
+                                      "VALUES (?, ?, ?, ?, ?)", (digest, name, len(chunks), vectors.shape[1], time.time()))
+                self.metrics['documents_embedded'] += 1
+                self.metrics['chunks_embedded'] += len(chunks)
+            return True
+
+    def _open(self, digest):
+        # (index, chunks) of one document, memory-mapped and kept in a small per-process LRU
+        with self._lock:
+            if digest in self._loaded:
+                self._loaded.move_to_end(digest)
+                return self._loaded[digest]
+        import faiss
+        document_dir = self._document_dir(digest)
+        index = faiss.read_index(os.path.join(document_dir, 'index.faiss'),
+                                 getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP))
+        with open(os.path.join(document_dir, 'chunks.json'), 'r', encoding='utf-8') as f:
+            chunks = json.load(f)
+        with self._lock:
+            self._loaded[digest] = (index, chunks)
+            while len(self._loaded) > self.loaded_indexes:
+                self._loaded.popitem(last=False)
+        return index, chunks
+
+    # --- Collections ---
+    def add_to_collection(self, collection, digest):
+        with self._lock:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO collection_documents (collection, digest, added_at) "
+                                  "VALUES (?, ?, ?)", (collection, digest, time.time()))
+        self.refresh_in_background(collection)
+
+    def remove_from_collection(self, collection, digest):
+        with self._lock:
+            with self.conn:
+                cursor = self.conn.execute("DELETE FROM collection_documents WHERE collection = ? AND digest = ?",
+                                           (collection, digest))
+        if cursor.rowcount > 0:
+            self.refresh_in_background(collection)
+        return cursor.rowcount > 0
+
+    def documents(self, collection):
+        with self._lock:
+            rows = self.conn.execute("SELECT d.digest, d.name, d.chunks FROM collection_documents c "
+                                     "JOIN documents d ON d.digest = c.digest WHERE c.collection = ? "
+                                     "ORDER BY c.added_at", (collection,)).fetchall()
+        return [{'id': digest, 'name': name, 'chunks': chunks} for digest, name, chunks in rows]
+
+    # --- Combined collection indexes ---
+    def _manifest(self, collection):
+        try:
+            with open(os.path.join(self._collection_dir(collection), 'manifest.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def refresh_collection(self, collection):
+        # Builds the collection's combined index once it reaches COLLECTION_INDEX_MIN chunks, and rebuilds it when
+        # the index kind or compression for its size changes or enough of it was added or removed since the last
+        # build. Returns the index spec in use, or None while documents are searched one by one.
+        documents = self.documents(collection)
+        total = sum(document['chunks'] for document in documents)
+        collection_dir = self._collection_dir(collection)
+        with self._lock:
+            lock = self._collection_locks.setdefault(collection, threading.Lock())
+        with lock:
+            if total < COLLECTION_INDEX_MIN:
+                shutil.rmtree(collection_dir, ignore_errors=True)
+                with self._lock:
+                    self._collections.pop(collection, None)
+                return None
+            spec = index_spec(total, self._open(documents[0]['id'])[0].d)
+            manifest = self._manifest(collection)
+            if manifest and os.path.exists(os.path.join(collection_dir, manifest['index'])):
+                built = dict(manifest['documents'])
+                current = {document['id']: document['chunks'] for document in documents}
+                changed = (sum(n for digest, n in current.items() if digest not in built)
+                           + sum(n for digest, n in built.items() if digest not in current))
+                if index_layout(manifest['spec']) == index_layout(spec) and changed <= REBUILD_FRACTION * manifest['count']:
+                    return manifest['spec']
+            self._build_collection_index(collection, documents, spec)
+            return spec
+
+    def refresh_in_background(self, collection):
+        # Runs refresh_collection off the request in a thread of its own. One refresh runs per collection at a time;
+        # changes made while it runs get one more refresh after it.
+        with self._lock:
+            if collection in self._refreshing:
+                self._refreshing[collection] = True
+                return
+            self._refreshing[collection] = False
+
+        def run():
+            while True:
+                try:
+                    self.refresh_collection(collection)
+                except Exception as e:
+                    logging.error(f"Could not refresh the combined index of collection {collection}: {e}")
+                with self._lock:
+                    if not self._refreshing[collection]:
+                        del self._refreshing[collection]
+                        return
+                    self._refreshing[collection] = False
+
+        threading.Thread(target=run, name="collection-refresh", daemon=True).start()
+
+    def _build_collection_index(self, collection, documents, spec):
+        import faiss
+        import numpy as np
+        start = time.perf_counter()
+        vectors = []
+        for document in documents:
+            index, _ = self._open(document['id'])
+            vectors.append(index.reconstruct_n(0, index.ntotal))
+        index = build_index(np.concatenate(vectors), spec)
+        collection_dir = self._collection_dir(collection)
+        os.makedirs(collection_dir, exist_ok=True)
+        # Each build gets a new file, and the manifest is swapped atomically, so readers see one build or the other
+        index_name = f"index-{time.time_ns()}-{os.getpid()}.faiss"
+        faiss.write_index(index, os.path.join(collection_dir, index_name))
+        manifest = {'spec': spec, 'count': index.ntotal, 'index': index_name, 'built_at': time.time(),
+                    'documents': [[document['id'], document['chunks']] for document in documents]}
+        manifest_path = os.path.join(collection_dir, 'manifest.json')
+        with open(f"{manifest_path}.{os.getpid()}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(f"{manifest_path}.{os.getpid()}.tmp", manifest_path)
+        current = (self._manifest(collection) or manifest)['index']
+        for name in os.listdir(collection_dir):
+            if name.startswith('index-') and name != current:
+                try:
+                    os.remove(os.path.join(collection_dir, name))
+                except OSError:
+                    pass
+        self.metrics['index_builds'] += 1
+        logging.info(f"Built {spec} index of {index.ntotal} chunks for a collection in {time.perf_counter() - start:.1f}s")
+
+    def _open_collection(self, collection):
+        # (manifest, index, first row of each document) of the current build, or None
+        manifest = self._manifest(collection)
+        if manifest is None:
+            return None
+        with self._lock:
+            loaded = self._collections.get(collection)
+            if loaded and loaded[0]['index'] == manifest['index']:
+                self._collections.move_to_end(collection)
+                return loaded
+        import faiss
+        index = tune(faiss.read_index(os.path.join(self._collection_dir(collection), manifest['index'])),
+                     manifest['spec'])
+        offsets = [0]
+        for _, chunks in manifest['documents']:
+            offsets.append(offsets[-1] + chunks)
+        with self._lock:
+            self._collections[collection] = (manifest, index, offsets)
+            while len(self._collections) > LOADED_COLLECTIONS:
+                self._collections.popitem(last=False)
+        return manifest, index, offsets
+
+    # --- Search ---
+    def search(self, collection, query_vector, k=SEARCH_K):
+        # Nearest chunks across every document of the collection, closest first
+        import numpy as np
+        query = np.asarray([query_vector], dtype='float32')
+        documents = self.documents(collection)
+        current = {document['id'] for document in documents}
+        hits, covered = [], set()
+        try:
+            combined = self._open_collection(collection) if documents else None
+        except Exception as e:
+            logging.error(f"Could not open the combined index of collection {collection}: {e}")
+            combined = None
+        if combined:
+            manifest, index, offsets = combined
+            digests = [digest for digest, _ in manifest['documents']]
+            covered = current.intersection(digests)
+            # Neighbours from documents removed since the build are dropped, so enough extra are fetched to leave k
+            # on average, and the search is repeated with twice as many if fewer are left
+            removed = sum(n for digest, n in manifest['documents'] if digest not in current)
+            fetch = math.ceil(k * index.ntotal / max(1, index.ntotal - removed))
+            while True:
+                distances, ids = index.search(query, min(fetch, index.ntotal))
+                found = []
+                for distance, row in zip(distances[0], ids[0]):
+                    if row < 0:
+                        continue
+                    slot = bisect.bisect_right(offsets, row) - 1
+                    if digests[slot] in current:
+                        found.append((float(distance), digests[slot], int(row - offsets[slot])))
+                if len(found) >= k or fetch >= index.ntotal:
+                    break
+                fetch *= 2
+            hits.extend(found)
+        for document in documents:
+            if document['id'] in covered:
+                continue
+            try:
+                index, _ = self._open(document['id'])
+            except Exception as e:
+                logging.error(f"Could not open chatbot index {document['id']}: {e}")
+                continue
+            distances, positions = index.search(query, min(k, index.ntotal))
+            hits.extend((float(distance), document['id'], int(position))
+                        for distance, position in zip(distances[0], positions[0]) if position >= 0)
+        self.metrics['searches'] += 1
+        return [dict(self._open(digest)[1][position], document=digest, score=distance)
+                for distance, digest, position in sorted(hits)[:k]]
+
+    def stats(self):
+        with self._lock:
+            documents, chunks = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(chunks), 0) FROM documents").fetchone()
+            collections = self.conn.execute("SELECT COUNT(DISTINCT collection) FROM collection_documents").fetchone()[0]
+            return dict(self.metrics, documents=documents, chunks=chunks, collections=collections,
+                        loaded_indexes=len(self._loaded), loaded_collection_indexes=len(self._collections))
+
+
+document_store = DocumentStore()
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+# --- Constants ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', os.path.join(ROOT_DIR, '.cache', 'results'))
+CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_MB', 512)) * 1024 * 1024
+CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 7 * 24 * 3600))  # seconds
+MEMORY_ENTRIES = int(os.environ.get('RESULT_CACHE_MEMORY_ENTRIES', 256))
+PRUNE_EVERY = 32  # disk writes between size checks
+
+
+# --- Keys ---
+def bytes_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(digest, module, model, **params):
+    # Same file bytes + same module, model and parameters = same result
+    payload = json.dumps({'digest': digest, 'module': module, 'model': model, 'params': params}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# Two-tier cache of JSON-serializable results: an in-process LRU in front of a size-bounded directory
+# of JSON files whose entries expire after a TTL.
+class ResultCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL, memory_entries=MEMORY_ENTRIES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.metrics = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'expired': 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry['stored_at'] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.metrics['memory_hits'] += 1
+                return entry['value']
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        if entry is None or now - entry['stored_at'] > self.ttl:
+            if entry is not None:
+                self._remove(path)
+                self.metrics['expired'] += 1
+            self.metrics['misses'] += 1
+            return None
+        os.utime(path)  # mark as recently used for size-based eviction
+        self._remember(key, entry)
+        self.metrics['disk_hits'] += 1
+        return entry['value']
+
+    def set(self, key, value):
+        entry = {'stored_at': time.time(), 'value': value}
+        self._remember(key, entry)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning(f"Could not write cache entry {key}: {e}")
+            self._remove(temp_path)
+            return
+        self.metrics['stores'] += 1
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self.prune()
+
+    def get_or_compute(self, key, compute, should_cache=lambda value: True):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None and should_cache(value):
+                self.set(key, value)
+        return value
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def prune(self):
+        # Drop expired files, then least recently used ones until the directory fits max_bytes
+        now = time.time()
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.ttl:
+                    self._remove(path)
+                    self.metrics['expired'] += 1
+                else:
+                    files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            self.metrics['evictions'] += 1
+
+    def stats(self):
+        hits = self.metrics['memory_hits'] + self.metrics['disk_hits']
+        lookups = hits + self.metrics['misses']
+        return dict(self.metrics, hit_rate=round(hits / lookups, 3) if lookups else None,
+                    memory_entries=len(self._memory))
+
+
+result_cache = ResultCache()
@@ -0,0 +1,165 @@
+import os
+import re
+import logging
+import threading
+import unicodedata
+
+from common.cache import cache_key, file_digest, result_cache
+from common.models import get_ocr_reader, ocr_reader_model, registry
+from common.ocr import iter_pdf_pages
+
+# --- Constants ---
+# One extraction serves every module, so it uses the widest OCR settings any of them needs: Translation's languages
+# and the 200 dpi the Translation and Summary OCR were tuned with
+DOCUMENT_OCR_LANGUAGES = tuple(os.environ.get('DOCUMENT_OCR_LANGUAGES', 'en,hi,mr').split(','))
+DOCUMENT_OCR_DPI = int(os.environ.get('DOCUMENT_OCR_DPI', 200))
+DOCUMENT_VERSION = 1  # bump when extraction or normalization changes, so cached documents are rebuilt
+DOCUMENT_KINDS = {'.pdf': 'pdf', '.png': 'image', '.jpg': 'image', '.jpeg': 'image', '.docx': 'docx', '.txt': 'text'}
+SPACES = re.compile(r"[^\S\n]+")
+INVISIBLE = dict.fromkeys(map(ord, '\u00ad\u200b\ufeff\x00'))  # soft hyphen, zero-width space, BOM, NUL
+
+
+# --- Normalization ---
+def normalize_text(text):
+    # NFC, one kind of line break, runs of spaces collapsed, blank lines and invisible characters dropped
+    text = unicodedata.normalize('NFC', text).translate(INVISIBLE).replace('\r\n', '\n').replace('\r', '\n')
+    lines = (SPACES.sub(' ', line).strip() for line in text.split('\n'))
+    return "\n".join(line for line in lines if line)
+
+
+def document_kind(file_path):
+    # None for formats no module can read
+    return DOCUMENT_KINDS.get(os.path.splitext(file_path)[1].lower())
+
+
+# --- Extraction ---
+def ocr_reader():
+    return get_ocr_reader(DOCUMENT_OCR_LANGUAGES)
+
+
+def extract_pages(file_path, max_pages=None, on_error=None):
+    # Yields (page, text) with 1-based page numbers, text normalized, for up to max_pages pages. PDF pages with a
+    # text layer are read directly and image-only pages are OCR'd; an image or a Word file is a single page. PDF
+    # pages whose OCR failed come back empty and are passed to on_error(page_nos, error). The OCR reader is checked
+    # out of the registry once a page needs it and held until the last page.
+    kind = document_kind(file_path)
+    if kind not in ('pdf', 'image'):
+        yield from extract_text_pages(file_path, kind)
+        return
+    with registry.use_lazily(ocr_reader_model(DOCUMENT_OCR_LANGUAGES)) as reader:
+        if kind == 'pdf':
+            for page_no, text in iter_pdf_pages(file_path, reader, DOCUMENT_OCR_DPI, max_pages=max_pages,
+                                                on_error=on_error):
+                yield page_no + 1, normalize_text(text)
+        else:
+            yield 1, normalize_text(" ".join(reader().readtext(file_path, detail=0)))
+
+
+def extract_text_pages(file_path, kind):
+    if kind == 'docx':
+        from docx import Document
+        yield 1, normalize_text("\n".join(paragraph.text for paragraph in Document(file_path).paragraphs))
+    elif kind == 'text':
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            yield 1, normalize_text(f.read())
+    else:
+        raise ValueError("Unsupported file format.")
+
+
+def document_key(digest, max_pages=None):
+    # With max_pages, the key of the document's first max_pages pages, stored when a reader stopped there
+    limit = {'max_pages': max_pages} if max_pages is not None else {}
+    return cache_key(digest, 'document', 'pymupdf+easyocr', languages=DOCUMENT_OCR_LANGUAGES, dpi=DOCUMENT_OCR_DPI,
+                     version=DOCUMENT_VERSION, **limit)
+
+
+def new_document(digest, name, kind, pages):
+    return {'id': digest, 'name': name, 'kind': kind, 'pages': [{'page': page, 'text': text} for page, text in pages]}
+
+
+# --- Documents ---
+# A document is the file's text extracted once and shared by every module (NER, translation, summary, chatbot):
+#   {'id': content digest, 'name': ..., 'kind': 'pdf'|'image'|'docx'|'text', 'pages': [{'page': 1, 'text': ...}]}
+# It is stored in the result cache under the file's content hash, so the same bytes are never parsed or OCR'd twice,
+# whichever module sees them first. Concurrent requests for the same new file wait for one extraction. A reader
+# limited to max_pages stores the pages it read under that limit, so the next reader with the same limit reuses them.
+_extracting = {}
+_extracting_lock = threading.Lock()
+
+
+def _extraction_lock(key):
+    with _extracting_lock:
+        return _extracting.setdefault(key, threading.Lock())
+
+
+def _cached_document(digest, max_pages=None):
+    # The whole document, or else its first max_pages pages, from the cache
+    document = result_cache.get(document_key(digest))
+    if document is None and max_pages is not None:
+        document = result_cache.get(document_key(digest, max_pages))
+    return document
+
+
+def _read_pages(file_path, name, digest, max_pages=None):
+    # Yields (page, text) for up to max_pages pages, extracting them while holding the file's extraction lock, so a
+    # second reader of the same new file waits and then reads the first one's document from the cache. Pages past
+    # max_pages are never rendered. The pages read are stored once the reader has taken all of them and every OCR
+    # call succeeded: under the document's key when that was the whole file, under the max_pages key otherwise. A
+    # reader that stops early, or met an OCR error, stores nothing, so the next one tries again.
+    key = document_key(digest)
+    try:
+        with _extraction_lock(key):
+            document = _cached_document(digest, max_pages)
+            if document is not None:
+                yield from document_pages(document)[:max_pages]
+                return
+            kind = document_kind(file_path)
+            pages, failed = [], []
+            for page, text in extract_pages(file_path, max_pages, lambda page_nos, e: failed.extend(page_nos)):
+                pages.append((page, text))
+                yield page, text
+            if failed:
+                logging.warning(f"Not caching {name}: OCR failed for {len(failed)} of its {len(pages)} pages")
+                return
+            # A file of exactly max_pages pages is stored as a partial one; only readers with the same limit see it
+            whole = max_pages is None or len(pages) < max_pages
+            result_cache.set(key if whole else document_key(digest, max_pages), new_document(digest, name, kind, pages))
+            logging.info(f"Extracted {len(pages)} pages of {name}")
+    finally:
+        with _extracting_lock:
+            _extracting.pop(key, None)
+
+
+def load_document(file_path, name=None, digest=None, max_pages=None):
+    # Raises ValueError for unsupported formats. A document not in the cache yet is read only as far as max_pages;
+    # a cached one is returned whole.
+    digest = digest or file_digest(file_path)
+    document = _cached_document(digest, max_pages)
+    if document is not None:
+        return document
+    name = name or os.path.basename(file_path)
+    return new_document(digest, name, document_kind(file_path), _read_pages(file_path, name, digest, max_pages))
+
+
+def iter_document_pages(file_path, name=None, max_pages=None):
+    # Streaming form of load_document: yields (page, text) as each page is read, or straight from the cache
+    digest = file_digest(file_path)
+    document = _cached_document(digest, max_pages)
+    if document is not None:
+        yield from document_pages(document)[:max_pages]
+        return
+    yield from _read_pages(file_path, name or os.path.basename(file_path), digest, max_pages)
+
+
+def document_pages(document):
+    return [(page['page'], page['text']) for page in document['pages']]
+
+
+def document_text(document):
+    return "\n".join(page['text'] for page in document['pages'] if page['text'])
+
+
+def document_summary(document):
+    # The document without its text, for API responses
+    return {'id': document['id'], 'name': document['name'], 'kind': document['kind'],
+            'pages': len(document['pages']), 'characters': sum(len(page['text']) for page in document['pages'])}
@@ -0,0 +1,198 @@
+import os
+import time
+import uuid
+import logging
+import threading
+
+# --- Constants ---
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+# Most jobs of one kind allowed to run at once, e.g. "ner=2,translation=2,chatbot=1"; unlisted kinds use all workers
+DEFAULT_JOB_LIMITS = 'ner=2,translation=2,chatbot=1,analyze=1'
+JOB_LIMITS = {kind: int(limit) for kind, _, limit in
+              (item.partition('=') for item in os.environ.get('JOB_LIMITS', DEFAULT_JOB_LIMITS).split(','))
+              if limit}
+JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', 3600))  # seconds a finished job stays available
+JOB_BACKEND = os.environ.get('JOB_BACKEND', 'inprocess')  # a key of BACKENDS
+DEFAULT_PRIORITY = 5  # lower runs first
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobFailed(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind, work, priority=DEFAULT_PRIORITY, cleanup=None, on_update=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.work = work
+        self.cleanup = cleanup
+        self.priority = priority
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._on_update = on_update
+
+    def update(self, progress=None, message=None):
+        # Called by the work function to report how far it got
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+        if self._on_update:
+            self._on_update(self)
+
+    def to_dict(self):
+        body = {
+            'id': self.id,
+            'kind': self.kind,
+            'state': self.state,
+            'priority': self.priority,
+            'progress': round(self.progress, 3),
+            'message': self.message,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if self.state == DONE:
+            body['result'] = self.result
+        elif self.state == FAILED:
+            body['error'] = self.error
+        return body
+
+
+# Thread pool inside the web process: no broker to run, but jobs are lost on restart and are only visible to
+# the process that accepted them (run one web worker, or put a shared backend behind the same interface).
+# Workers take the queued job with the lowest priority value whose kind is below its concurrency limit.
+class InProcessBackend:
+    def __init__(self, workers=JOB_WORKERS, limits=None, result_ttl=JOB_RESULT_TTL):
+        self.workers = workers
+        self.limits = dict(JOB_LIMITS if limits is None else limits)
+        self.result_ttl = result_ttl
+        self._jobs = {}
+        self._queued = []
+        self._running = {}
+        self._listeners = []
+        self._threads = []
+        self._cond = threading.Condition()
+
+    # --- Public interface (shared by every backend) ---
+    def submit(self, kind, work, priority=DEFAULT_PRIORITY, cleanup=None):
+        # work(job) runs on a worker thread; its return value becomes the job's JSON-serializable result.
+        # cleanup() runs once the job has finished or was cancelled, e.g. to delete its upload workspace.
+        job = Job(kind, work, priority, cleanup, on_update=self._notify)
+        with self._cond:
+            self._purge()
+            self._jobs[job.id] = job
+            self._queued.append(job)
+            self._start_workers()
+            self._cond.notify_all()
+        self._notify(job)
+        return job
+
+    def get(self, job_id):
+        with self._cond:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        # Only queued jobs can be cancelled; running work is not interrupted
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.state != QUEUED:
+                return False
+            self._queued.remove(job)
+            job.state, job.finished_at = CANCELLED, time.time()
+        self._release(job)
+        self._notify(job)
+        return True
+
+    def subscribe(self, listener):
+        # listener(job_dict) is called on every state or progress change
+        self._listeners.append(listener)
+
+    def stats(self):
+        with self._cond:
+            states = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            return {'backend': 'inprocess', 'workers': self.workers, 'limits': self.limits, 'jobs': states,
+                    'running': {kind: n for kind, n in self._running.items() if n}}
+
+    # --- Internals ---
+    def _notify(self, job):
+        body = job.to_dict()
+        for listener in self._listeners:
+            try:
+                listener(body)
+            except Exception as e:
+                logging.warning(f"Job listener failed: {e}")
+
+    def _purge(self):
+        now = time.time()
+        for job_id in [j.id for j in self._jobs.values() if j.state in FINISHED and now - j.finished_at > self.result_ttl]:
+            del self._jobs[job_id]
+
+    def _release(self, job):
+        # Drop the closures (uploaded file, request data) once the job is over
+        cleanup, job.work, job.cleanup = job.cleanup, None, None
+        if cleanup:
+            try:
+                cleanup()
+            except Exception as e:
+                logging.warning(f"Cleanup of job {job.id} failed: {e}")
+
+    def _start_workers(self):
+        # Threads start with the first job, so importing the app (or forking gunicorn workers) stays cheap
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_job(self):
+        for job in sorted(self._queued, key=lambda j: (j.priority, j.created_at)):
+            if self._running.get(job.kind, 0) < self.limits.get(job.kind, self.workers):
+                return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                self._queued.remove(job)
+                self._running[job.kind] = self._running.get(job.kind, 0) + 1
+                job.state, job.started_at = RUNNING, time.time()
+            self._notify(job)
+            try:
+                result, state, error = job.work(job), DONE, None
+            except Exception as e:
+                if not isinstance(e, JobFailed):
+                    logging.exception(f"Job {job.id} ({job.kind}) failed")
+                result, state, error = None, FAILED, str(e)
+            self._release(job)
+            with self._cond:
+                job.result, job.error, job.finished_at = result, error, time.time()
+                if state == DONE:
+                    job.progress = 1.0
+                job.state = state
+                self._running[job.kind] -= 1
+                self._cond.notify_all()
+            self._notify(job)
+
+
+BACKENDS = {
+    'inprocess': InProcessBackend,
+}
+
+
+job_queue = BACKENDS[JOB_BACKEND]()
@@ -0,0 +1,190 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+
+# --- Constants ---
+# 0 means no budget: models stay loaded until evicted explicitly
+MODEL_MEMORY_BUDGET_MB = int(os.environ.get('MODEL_MEMORY_BUDGET_MB', 0))
+
+EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', "all-MiniLM-L6-v2")  # sentence-transformers name or local path
+EMBEDDING_BATCH_SIZE = int(os.environ.get('EMBEDDING_BATCH_SIZE', 64))
+SUMMARY_MODEL = "facebook/bart-large-cnn"
+SUMMARY_LENGTHS = {'short': 0.4, 'long': 0.6}  # summary length as a share of the model input
+NER_MODEL = "en_core_web_trf"
+
+
+class ModelSpec:
+    def __init__(self, loader, size_mb=0, warmup=None):
+        self.loader = loader
+        self.size_mb = size_mb
+        self.warmup = warmup
+        self.lock = threading.Lock()
+
+
+# Process-wide registry of heavy models. Models load on first use, are shared by every blueprint and request,
+# and when a memory budget is set the least recently used idle models are evicted to make room. Code that runs a
+# model checks it out with use() (or use_lazily()) for as long as it holds it, so it is never evicted mid-request;
+# get() alone is for warm-ups and benchmarks.
+class ModelRegistry:
+    def __init__(self, memory_budget_mb=MODEL_MEMORY_BUDGET_MB):
+        self.memory_budget_mb = memory_budget_mb
+        self._specs = {}
+        self._models = OrderedDict()
+        self._in_use = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, loader, size_mb=0, warmup=None):
+        with self._lock:
+            self._specs[name] = ModelSpec(loader, size_mb, warmup)
+
+    def register_default(self, name, loader, size_mb=0, warmup=None):
+        # Registers the loader unless the name already has one; the check and the registration are atomic, so
+        # threads racing to register the same model never replace a spec (and its load lock) mid-load
+        with self._lock:
+            if name not in self._specs:
+                self._specs[name] = ModelSpec(loader, size_mb, warmup)
+
+    def is_registered(self, name):
+        return name in self._specs
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def loaded(self):
+        return list(self._models)
+
+    def get(self, name):
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                return self._models[name]
+        if name not in self._specs:
+            raise KeyError(f"No model registered as {name!r}")
+        spec = self._specs[name]
+        # Per-model lock: concurrent first requests wait for a single load instead of each loading a copy
+        with spec.lock:
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    return self._models[name]
+            self._make_room(spec.size_mb)
+            start = time.perf_counter()
+            model = spec.loader()
+            if spec.warmup:
+                spec.warmup(model)
+            logging.info(f"Loaded model {name} in {time.perf_counter() - start:.1f}s")
+            with self._lock:
+                self._models[name] = model
+            return model
+
+    @contextmanager
+    def use(self, name):
+        # Models checked out with use() are never evicted while the block runs
+        with self._lock:
+            self._in_use[name] = self._in_use.get(name, 0) + 1
+        try:
+            yield self.get(name)
+        finally:
+            with self._lock:
+                self._in_use[name] -= 1
+
+    @contextmanager
+    def use_lazily(self, name):
+        # Like use(), but yields a function that loads and checks out the model on its first call, for code that
+        # may not need the model at all (OCR for a PDF whose pages all have text)
+        with ExitStack() as stack:
+            model = []
+
+            def get():
+                if not model:
+                    model.append(stack.enter_context(self.use(name)))
+                return model[0]
+            yield get
+
+    def evict(self, name):
+        with self._lock:
+            if self._models.pop(name, None) is not None:
+                logging.info(f"Evicted model {name}")
+
+    def _loaded_mb(self):
+        return sum(self._specs[name].size_mb for name in self._models)
+
+    def _make_room(self, size_mb):
+        if not self.memory_budget_mb:
+            return
+        with self._lock:
+            for name in list(self._models):
+                if self._loaded_mb() + size_mb <= self.memory_budget_mb:
+                    break
+                if not self._in_use.get(name):
+                    self.evict(name)
+
+
+registry = ModelRegistry()
+
+
+# --- Loaders ---
+def ocr_model_name(languages):
+    return "easyocr:" + "+".join(languages)
+
+
+def ocr_reader_loader(languages):
+    def load():
+        import easyocr
+        return easyocr.Reader(list(languages))
+    return load
+
+
+def register_ocr_reader(languages):
+    registry.register(ocr_model_name(languages), ocr_reader_loader(languages), size_mb=150 * len(languages))
+
+
+def ocr_reader_model(languages=('en',)):
+    # The registry name of the reader for these languages, registered on first use
+    name = ocr_model_name(languages)
+    registry.register_default(name, ocr_reader_loader(languages), size_mb=150 * len(languages))
+    return name
+
+
+def get_ocr_reader(languages=('en',)):
+    return registry.get(ocr_reader_model(languages))
+
+
+def load_spacy():
+    import spacy
+    return spacy.load(NER_MODEL)
+
+
+def load_embeddings():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL, encode_kwargs={'batch_size': EMBEDDING_BATCH_SIZE})
+
+
+def load_summarizer():
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+    tokenizer = AutoTokenizer.from_pretrained(SUMMARY_MODEL)
+    model = AutoModelForSeq2SeqLM.from_pretrained(SUMMARY_MODEL, device_map="auto", torch_dtype=torch.float32)
+    return tokenizer, model
+
+
+register_ocr_reader(('en',))
+register_ocr_reader(('en', 'hi', 'mr'))
+registry.register("spacy", load_spacy, size_mb=1200, warmup=lambda nlp: nlp("Warm up the pipeline."))
+registry.register("embeddings", load_embeddings, size_mb=400, warmup=lambda emb: emb.embed_query("warm up"))
+registry.register("summarizer", load_summarizer, size_mb=1700)
+
+
+def get_spacy():
+    return registry.get("spacy")
+
+
+def get_embeddings():
+    return registry.get("embeddings")
+
+
+def get_summarizer():
+    return registry.get("summarizer")
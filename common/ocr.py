@@ -0,0 +1,88 @@
+import os
+import logging
+
+import fitz  # PyMuPDF
+import numpy as np
+
+# --- Constants ---
+# 72 dpi is PyMuPDF's native get_pixmap() resolution; set OCR_DPI to trade speed for OCR accuracy
+OCR_DPI = int(os.environ.get('OCR_DPI', 72))
+# Consecutive image-only pages recognised in one reader call
+OCR_BATCH_PAGES = int(os.environ.get('OCR_BATCH_PAGES', 4))
+
+
+# --- Rasterization ---
+class PixmapArray(np.ndarray):
+    # An ndarray view over a pixmap's sample buffer; it holds the pixmap so the buffer outlives the page loop
+    pixmap = None
+
+    def __array_finalize__(self, obj):
+        self.pixmap = getattr(obj, 'pixmap', None)
+
+
+def pixmap_to_array(pixmap):
+    # samples_mv exposes the pixels without copying them; older PyMuPDF only offers the samples bytes
+    samples = pixmap.samples_mv if hasattr(pixmap, 'samples_mv') else pixmap.samples
+    array = np.frombuffer(samples, dtype=np.uint8).reshape(pixmap.height, pixmap.stride)
+    array = array[:, :pixmap.width * pixmap.n].reshape(pixmap.height, pixmap.width, pixmap.n).view(PixmapArray)
+    array.pixmap = pixmap
+    return array
+
+
+def page_to_array(page, dpi=None):
+    pixmap = page.get_pixmap(dpi=dpi or OCR_DPI, alpha=False)
+    return pixmap_to_array(pixmap)
+
+
+# --- OCR ---
+def ocr_page(reader, page, dpi=None, **readtext_kwargs):
+    result = reader.readtext(page_to_array(page, dpi), detail=0, **readtext_kwargs)
+    return ' '.join(result)
+
+
+def ocr_images(reader, images, **readtext_kwargs):
+    # One text per image. Same-sized images (a scanned document's pages usually are) go through EasyOCR's batched
+    # recognizer in a single call; anything else is read one image at a time.
+    if len(images) > 1 and hasattr(reader, 'readtext_batched') and len({image.shape for image in images}) == 1:
+        results = reader.readtext_batched(list(images), detail=0, **readtext_kwargs)
+    else:
+        results = [reader.readtext(image, detail=0, **readtext_kwargs) for image in images]
+    return [' '.join(result) for result in results]
+
+
+# --- Pages ---
+def iter_pdf_pages(pdf_path, get_reader, dpi=None, batch_size=OCR_BATCH_PAGES, max_pages=None, on_error=None,
+                   **readtext_kwargs):
+    # Opens the PDF once and yields (page_no, text) in page order for up to max_pages pages, never rendering a page
+    # past them. Pages with a text layer are read directly;
+    # image-only pages are rasterized and OCR'd in batches of consecutive pages. get_reader is only called once
+    # the first image page shows up, so text-only PDFs never load the OCR model. Pages whose OCR failed come back
+    # empty, and on_error(page_nos, error) is told which they were.
+    pending = []
+
+    def flush():
+        try:
+            texts = ocr_images(get_reader(), [image for _, image in pending], **readtext_kwargs)
+        except Exception as e:
+            logging.error(f"OCR failed for pages {[n for n, _ in pending]} of {pdf_path}: {e}")
+            if on_error:
+                on_error([n for n, _ in pending], e)
+            texts = [""] * len(pending)
+        done = [(page_no, text) for (page_no, _), text in zip(pending, texts)]
+        pending.clear()
+        return done
+
+    with fitz.open(pdf_path) as doc:
+        for page_no in range(min(len(doc), max_pages) if max_pages is not None else len(doc)):
+            page = doc.load_page(page_no)
+            text = page.get_text()
+            if text.strip():
+                if pending:
+                    yield from flush()
+                yield page_no, text
+                continue
+            pending.append((page_no, page_to_array(page, dpi)))
+            if len(pending) >= batch_size:
+                yield from flush()
+        if pending:
+            yield from flush()
@@ -0,0 +1,77 @@
+import json
+import time
+import threading
+from collections import deque
+
+from flask import Response, request, stream_with_context
+
+# --- Constants ---
+METRIC_WINDOW = 500  # most recent requests each module's percentiles are computed over
+
+
+def wants_stream():
+    # ?stream=1 on an upload endpoint streams per-page results as Server-Sent Events
+    return request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# Time from the start of a streaming request to its first result event, per module
+class FirstResultMetrics:
+    def __init__(self, window=METRIC_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, module, seconds):
+        with self._lock:
+            self._samples.setdefault(module, deque(maxlen=self.window)).append(seconds)
+
+    def stats(self):
+        with self._lock:
+            result = {}
+            for module, samples in self._samples.items():
+                ordered = sorted(samples)
+                result[module] = {
+                    'count': len(ordered),
+                    'mean': round(sum(ordered) / len(ordered), 3),
+                    'p50': round(ordered[len(ordered) // 2], 3),
+                    'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+                }
+            return result
+
+
+first_result_metrics = FirstResultMetrics()
+first_token_metrics = FirstResultMetrics()
+
+
+def stream_events(module, events, cleanup=None, first_event='page', metrics=first_result_metrics):
+    # Streams (event, data) pairs as Server-Sent Events. The first first_event's delay since the request started
+    # is recorded in metrics as the module's time to first result; cleanup runs once the response is closed,
+    # whether the stream finished or the client went away. A client going away also closes the events
+    # generator, so the work behind it stops at its next step.
+    started = time.perf_counter()
+
+    def generate():
+        first = True
+        try:
+            for event, data in events:
+                if first and event == first_event:
+                    first = False
+                    elapsed = time.perf_counter() - started
+                    metrics.record(module, elapsed)
+                    data = dict(data, first_result_seconds=round(elapsed, 3))
+                yield sse_event(event, data)
+        except Exception as e:
+            yield sse_event('error', {'error': str(e)})
+        finally:
+            if hasattr(events, 'close'):
+                events.close()
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+    if cleanup:
+        response.call_on_close(cleanup)
+    return response
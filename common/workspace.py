@@ -0,0 +1,50 @@
+import os
+import re
+import shutil
+import tempfile
+
+# --- Constants ---
+# Parent of the per-request directories; the system temp dir unless set
+WORKSPACE_ROOT = os.environ.get('UPLOAD_WORKSPACE_DIR') or None
+UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def safe_filename(name, default='upload'):
+    # Basename with anything but ASCII letters, digits, '-' and '_' replaced; the extension is kept
+    root, ext = os.path.splitext(os.path.basename(name.replace('\\', '/')))
+    root = UNSAFE_CHARS.sub('_', root).strip('_') or default
+    ext = UNSAFE_CHARS.sub('', ext.lower())
+    return f"{root}.{ext}" if ext else root
+
+
+# A private temporary directory for one request. Uploads are saved into it under sanitized names, and the
+# whole directory is removed when the request is done, so concurrent requests never see each other's files.
+class Workspace:
+    def __init__(self, prefix='upload-', root=WORKSPACE_ROOT):
+        if root:
+            os.makedirs(root, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix=prefix, dir=root)
+
+    def file_path(self, name):
+        return os.path.join(self.path, safe_filename(name))
+
+    def save(self, upload, name=None):
+        # Accepts a Flask/Werkzeug FileStorage, a Streamlit UploadedFile or raw bytes
+        path = self.file_path(name or getattr(upload, 'filename', None) or getattr(upload, 'name', None) or 'upload')
+        if hasattr(upload, 'save'):
+            upload.save(path)
+        else:
+            data = upload.getbuffer() if hasattr(upload, 'getbuffer') else upload
+            with open(path, 'wb') as f:
+                f.write(data)
+        return path
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
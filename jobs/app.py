@@ -0,0 +1,37 @@
+from flask import Blueprint, request, jsonify, url_for
+from common.jobs import DEFAULT_PRIORITY, job_queue
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def wants_job():
+    # ?async=1 on an upload endpoint queues the work and answers 202 with a job id instead of waiting for it
+    return request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+
+def submit_job(kind, work, cleanup=None):
+    try:
+        priority = int(request.args.get('priority', DEFAULT_PRIORITY))
+    except ValueError:
+        priority = DEFAULT_PRIORITY
+    job = job_queue.submit(kind, work, priority, cleanup)
+    status_url = url_for('jobs.job_status', job_id=job.id)
+    return jsonify({'job_id': job.id, 'state': job.state, 'status_url': status_url}), 202, {'Location': status_url}
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job.to_dict())
+
+
+@jobs_bp.route('/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    if job_queue.cancel(job_id):
+        return jsonify({'id': job_id, 'state': 'cancelled'})
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify({'error': f"Job is {job.state} and can no longer be cancelled"}), 409
@@ -1,17 +1,117 @@
-from flask import Flask, render_template
-from translation.app import translation_bp
-from ner.app import ner_bp
-from chatbot.app import chatbot_bp
+import os
+import time
+import logging
+import threading
+from flask import Flask, render_template, jsonify
+from translation.app import translation_bp, warm_up as warm_up_translation
+from ner.app import ner_bp, warm_up as warm_up_ner
+from chatbot.app import chatbot_bp, warm_up as warm_up_chatbot
+from jobs.app import jobs_bp
+from analyze.app import analyze_bp
+from common.models import registry
+from common.cache import result_cache
+from common.jobs import job_queue
+from common.streaming import first_result_metrics, first_token_metrics
+from translation.memory import translation_memory
+from chatbot.store import document_store
+from chatbot.ingest import embedding_cache
+from chatbot.answers import answer_cache, stream_metrics
+
+# Blueprints only import light modules; heavy libraries and models load on first use.
+#   lazy       - load nothing ahead of time, ready immediately (default: every worker only holds what it serves)
+#   background - warm up the WARM_UP modules in a thread after start, /readyz turns 200 when done
+#   eager      - warm up the WARM_UP modules before serving
+STARTUP_MODE = os.environ.get('STARTUP_MODE', 'lazy')
+
+WARMUPS = {
+    'translation': warm_up_translation,
+    'ner': warm_up_ner,
+    'chatbot': warm_up_chatbot,
+}
+# Modules warmed up by the background and eager modes, e.g. "ner,chatbot"
+WARM_UP = [name.strip() for name in os.environ.get('WARM_UP', ','.join(WARMUPS)).split(',') if name.strip()]
 
 app = Flask(__name__)
 
 app.register_blueprint(translation_bp, url_prefix='/translation')
 app.register_blueprint(ner_bp, url_prefix='/ner')
 app.register_blueprint(chatbot_bp, url_prefix='/chatbot')
+app.register_blueprint(jobs_bp, url_prefix='/jobs')
+app.register_blueprint(analyze_bp, url_prefix='/analyze')
+
+# Job progress is pushed to Socket.IO clients that joined the job's room ('watch_job' with {'job_id': ...});
+# without flask-socketio installed, clients poll /jobs/<id> instead
+try:
+    from flask_socketio import SocketIO, join_room
+except ImportError:
+    socketio = None
+else:
+    socketio = SocketIO(app, async_mode='threading')
+
+    @socketio.on('watch_job')
+    def watch_job(data):
+        join_room(data.get('job_id'))
+
+    job_queue.subscribe(lambda job: socketio.emit('job_update', job, to=job['id']))
+
+startup = {'started_at': time.time(), 'ready': STARTUP_MODE == 'lazy', 'warmed': [], 'failed': {}}
+
+
+def warm_up():
+    for name in WARM_UP:
+        try:
+            WARMUPS[name]()
+            startup['warmed'].append(name)
+        except Exception as e:
+            logging.error(f"Warm-up of {name} failed: {e}")
+            startup['failed'][name] = str(e)
+    startup['ready'] = True
+    logging.info(f"Warm-up finished in {time.time() - startup['started_at']:.1f}s")
+
+
+def start_warm_up():
+    if STARTUP_MODE == 'eager':
+        warm_up()
+    elif STARTUP_MODE == 'background':
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
 
 @app.route('/')
 def main_index():
     return render_template('main/index.html')
 
+@app.route('/healthz')
+def healthz():
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    body = {
+        'ready': startup['ready'],
+        'mode': STARTUP_MODE,
+        'warmed': startup['warmed'],
+        'failed': startup['failed'],
+        'models': registry.loaded(),
+        'uptime': round(time.time() - startup['started_at'], 1),
+    }
+    return jsonify(body), 200 if startup['ready'] else 503
+
+@app.route('/metrics')
+def metrics():
+    return jsonify({'result_cache': result_cache.stats(), 'translation_memory': translation_memory.stats(),
+                    'chatbot_store': document_store.stats(),
+                    'embedding_cache': embedding_cache.stats(), 'answer_cache': answer_cache.stats(),
+                    'jobs': job_queue.stats(), 'time_to_first_result': first_result_metrics.stats(),
+                    'time_to_first_token': first_token_metrics.stats(), 'chatbot_streams': stream_metrics,
+                    'models': registry.loaded()})
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # With the debug reloader only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warm_up()
+    if socketio:
+        socketio.run(app, debug=True, host='0.0.0.0', port=5000, allow_unsafe_werkzeug=True)
+    else:
+        app.run(debug=True, host='0.0.0.0', port=5000)
+else:
+    start_warm_up()
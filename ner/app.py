@@ -1,88 +1,91 @@
 from flask import Blueprint, render_template, request, jsonify, send_file, current_app
-import spacy
-import pandas as pd
-import os
-import pdfplumber
-import easyocr
-import fitz  # PyMuPDF
-from werkzeug.utils import secure_filename
+import io
 import logging
+from common.document import document_key, document_kind, document_pages, iter_document_pages, load_document, ocr_reader
+from common.models import get_spacy
+from common.cache import cache_key, file_digest, result_cache
+from common.workspace import Workspace
+from common.jobs import JobFailed
+from jobs.app import submit_job, wants_job
+from common.streaming import stream_events, wants_stream
+from ner.engine import NER_TIERS, NER_DEFAULT_TIER, get_fast_ner, page_entities, tier_models
 
 ner_bp = Blueprint('ner', __name__, template_folder='templates', static_folder='static')
 
-nlp = spacy.load('en_core_web_trf')
-reader = easyocr.Reader(['en'])
-
-UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
 logging.basicConfig(level=logging.INFO)
 
 
-def extract_text_from_pdf(pdf_path):
-    text = ""
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                extracted_text = page.extract_text()
-                if extracted_text:
-                    text += extracted_text + "\n"
-                else:
-                    text += extract_text_from_scanned_pdf(pdf_path, pdf.pages.index(page)) + "\n"
-    except Exception as e:
-        logging.error(f"Error extracting text from PDF {pdf_path}: {e}")
-        return None
-    return text
-
-
-def extract_text_from_scanned_pdf(pdf_path, page_number):
-    try:
-        pdf_document = fitz.open(pdf_path)
-        page = pdf_document.load_page(page_number)
-        image = page.get_pixmap()
-        image_path = f"{pdf_path}_page_{page_number}.png"
-        image.save(image_path)
-        result = reader.readtext(image_path, detail=0)
-        os.remove(image_path)  # Remove temporary image
-        pdf_document.close()
-        return ' '.join(result)
-    except Exception as e:
-        logging.error(f"Error extracting text from scanned PDF page {page_number} of {pdf_path}: {e}")
-        return ""
+def ner_key(digest, tier):
+    # Keyed by the extracted document too, so a change in extraction is not answered from old results
+    return cache_key(digest, 'ner', tier_models(tier), document=document_key(digest), tier=tier)
 
 
-def extract_text_from_image(image_path):
+def perform_ner(file_path, tier=NER_DEFAULT_TIER):
+    if document_kind(file_path) not in ('pdf', 'image'):
+        return {"error": "Unsupported file format."}
     try:
-        result = reader.readtext(image_path, detail=0)
-        return ' '.join(result)
+        # The shared document: text pages read as is, image-only pages OCR'd, extracted once per file content
+        pages = document_pages(load_document(file_path))
     except Exception as e:
-        logging.error(f"Error extracting text from image {image_path}: {e}")
-        return ""
-
-
-def perform_ner(file_path):
-    text = ""
+        logging.error(f"Error extracting text from {file_path}: {e}")
+        return {"error": "Error during text extraction."}
     try:
-        if file_path.lower().endswith('.pdf'):
-            text = extract_text_from_pdf(file_path)
-            if text is None:
-                return {"error": "Error during PDF text extraction."}
-        elif file_path.lower().endswith(('.png', '.jpg', '.jpeg')):
-            text = extract_text_from_image(file_path)
-        else:
-            return {"error": "Unsupported file format."}
-
-        if not text.strip():
+        if not any(text.strip() for _, text in pages):
             return {"message": "No text extracted."}
 
-        doc = nlp(text)
-        unique_entities = list(set((ent.text.strip(), ent.label_) for ent in doc.ents if ent.text.strip()))
-        return unique_entities
+        # The same page grouping as the stream, so both give the same entities for the same cache key. The whole
+        # document goes through one segment-wise nlp.pipe call, which keeps transformer memory flat and never hits
+        # max_length.
+        return [entity for _, _, new in page_entities(pages, tier) for entity in new]
     except Exception as e:
         logging.error(f"Error during NER processing for {file_path}: {e}")
         return {"error": f"Error during NER processing: {str(e)}"}
 
 
+def warm_up():
+    # Heavy imports and models are deferred to first use; this loads them ahead of traffic
+    import pandas
+    ocr_reader()
+    get_fast_ner()
+    get_spacy()
+
+
+def ner_page_events(file_path, tier):
+    # Yields ('page', ...) with each page's entities as soon as that page is read and recognized, then ('done', ...)
+    # with the document's deduplicated entities, which are stored under the upload endpoint's cache key, and how
+    # many pages were read and had text. A document already in the result cache is answered at once; only documents
+    # with text are cached.
+    key = ner_key(file_digest(file_path), tier)
+    cached = result_cache.get(key)
+    if isinstance(cached, list):
+        yield 'done', {'entities': cached, 'cached': True}
+        return
+    if document_kind(file_path) not in ('pdf', 'image'):
+        yield 'error', {'error': "Unsupported file format."}
+        return
+    counts = {'pages': 0, 'text_pages': 0}
+
+    def pages():
+        for page_no, text in iter_document_pages(file_path):
+            counts['pages'] += 1
+            counts['text_pages'] += bool(text.strip())
+            yield page_no, text
+    found = []
+    for page_no, entities, new in page_entities(pages(), tier):
+        found.extend(new)
+        yield 'page', {'page': page_no, 'entities': entities, 'new': new}
+    # A document without text is answered with a message by the upload endpoint, and not cached there either
+    if counts['text_pages']:
+        result_cache.set(key, found)
+    yield 'done', dict(counts, entities=found)
+
+
+def recognize_file(file_path, tier):
+    # Identical uploads reuse the stored entities; errors are never cached
+    return result_cache.get_or_compute(ner_key(file_digest(file_path), tier), lambda: perform_ner(file_path, tier),
+                                       should_cache=lambda result: isinstance(result, list))
+
+
 @ner_bp.route('/')
 def index():
     return render_template('ner/index.html')
@@ -95,35 +98,57 @@ def upload_file():
     file = request.files['file']
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
+    tier = request.args.get('model', NER_DEFAULT_TIER)
+    if tier not in NER_TIERS:
+        return jsonify({'error': f"Unknown model '{tier}', expected one of: {', '.join(NER_TIERS)}"}), 400
 
-    filename = secure_filename(file.filename)
-    file_path = os.path.join(UPLOAD_FOLDER, filename)
+    filename = file.filename
+    # Each request gets its own directory, so concurrent uploads never touch each other's files
+    workspace = Workspace('ner-')
     try:
-        file.save(file_path)
-        entities = perform_ner(file_path)
+        file_path = workspace.save(file)
+    except Exception as e:
+        workspace.cleanup()
+        logging.error(f"Error saving file {filename}: {e}")
+        return jsonify({'error': f"Error saving or processing file: {str(e)}"}), 500
+
+    if wants_stream():
+        return stream_events('ner', ner_page_events(file_path, tier), cleanup=workspace.cleanup)
+
+    if wants_job():
+        def work(job):
+            job.update(message="Extracting entities")
+            entities = recognize_file(file_path, tier)
+            if isinstance(entities, dict) and 'error' in entities:
+                raise JobFailed(entities['error'])
+            return entities
+        return submit_job('ner', work, cleanup=workspace.cleanup)
+
+    try:
+        entities = recognize_file(file_path, tier)
     except Exception as e:
         logging.error(f"Error saving or processing file {filename}: {e}")
         return jsonify({'error': f"Error saving or processing file: {str(e)}"}), 500
     finally:
-        if os.path.exists(file_path):
-            os.remove(file_path)  # Clean up uploaded file after processing
+        workspace.cleanup()
 
     return jsonify(entities)
 
 
 @ner_bp.route('/download_excel', methods=['POST'])
 def download_excel():
+    import pandas as pd
     data = request.get_json()
     entities = data.get('entities', [])
 
     df = pd.DataFrame(entities, columns=['Entity', 'Label'])
-    excel_path = os.path.join(UPLOAD_FOLDER, 'entities.xlsx')
     try:
-        df.to_excel(excel_path, index=False)
-        return send_file(excel_path, as_attachment=True)
+        # Built in memory: no shared file name for concurrent downloads to overwrite
+        buffer = io.BytesIO()
+        df.to_excel(buffer, index=False)
+        buffer.seek(0)
+        return send_file(buffer, as_attachment=True, download_name='entities.xlsx',
+                         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     except Exception as e:
         logging.error(f"Error creating or sending Excel file: {e}")
-        return jsonify({'error': f"Error creating or sending Excel file: {str(e)}"}), 500
-    finally:
-        if os.path.exists(excel_path):
-            os.remove(excel_path)
\ No newline at end of file
+        return jsonify({'error': f"Error creating or sending Excel file: {str(e)}"}), 500
\ No newline at end of file
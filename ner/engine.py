@@ -0,0 +1,301 @@
+import os
+import re
+import logging
+import importlib.util
+from contextlib import ExitStack
+
+from common.models import NER_MODEL, registry
+
+# --- Constants ---
+NER_BATCH_SIZE = int(os.environ.get('NER_BATCH_SIZE', 16))
+NER_PROCESSES = int(os.environ.get('NER_PROCESSES', 1))
+SEGMENT_CHARS = int(os.environ.get('NER_SEGMENT_CHARS', 2000))
+# Components entity recognition needs; everything else (tagger, parser, lemmatizer, ...) is skipped
+NER_COMPONENTS = {'transformer', 'tok2vec', 'ner', 'entity_ruler', 'structured_ruler'}
+BREAK_AFTER = re.compile(r"[.!?:;]\s*$")
+
+# fast     - small spaCy model plus rules for structured fields
+# accurate - the transformer pipeline
+# hybrid   - fast everywhere, the transformer only around ambiguous spans
+NER_TIERS = ('fast', 'accurate', 'hybrid')
+NER_DEFAULT_TIER = os.environ.get('NER_DEFAULT_TIER', 'accurate')
+NER_FAST_MODEL = os.environ.get('NER_FAST_MODEL', 'en_core_web_sm')
+# Labels the small model often gets wrong or misses; these spans are re-checked by the transformer in hybrid mode
+AMBIGUOUS_LABELS = {'PERSON', 'ORG', 'GPE', 'LOC', 'NORP', 'FAC', 'PRODUCT', 'EVENT', 'WORK_OF_ART', 'LAW'}
+CONTEXT_CHARS = 300  # context on each side of an ambiguous span sent to the transformer
+SENTENCE_BREAKS = '.!?\n'
+
+# Token patterns for fields with a fixed shape; they run before the statistical NER, which keeps their spans
+STRUCTURED_ID = 'structured'
+MONTHS = ["jan", "january", "feb", "february", "mar", "march", "apr", "april", "may", "jun", "june", "jul", "july",
+          "aug", "august", "sep", "sept", "september", "oct", "october", "nov", "november", "dec", "december"]
+STRUCTURED_PATTERNS = [
+    # 12/03/2023, 12.03.23
+    {'label': 'DATE', 'pattern': [{'TEXT': {'REGEX': r"^\d{1,2}[/.]\d{1,2}[/.]\d{2,4}$"}}]},
+    # 2023-03-12, 12-03-2023 (the tokenizer splits on the hyphens)
+    {'label': 'DATE', 'pattern': [{'TEXT': {'REGEX': r"^\d{4}$"}}, {'ORTH': '-'}, {'TEXT': {'REGEX': r"^\d{1,2}$"}},
+                                  {'ORTH': '-'}, {'TEXT': {'REGEX': r"^\d{1,2}$"}}]},
+    {'label': 'DATE', 'pattern': [{'TEXT': {'REGEX': r"^\d{1,2}$"}}, {'ORTH': '-'}, {'TEXT': {'REGEX': r"^\d{1,2}$"}},
+                                  {'ORTH': '-'}, {'TEXT': {'REGEX': r"^\d{4}$"}}]},
+    # 12 March 2023, 12th Mar, 2023
+    {'label': 'DATE', 'pattern': [{'TEXT': {'REGEX': r"^\d{1,2}(st|nd|rd|th)?$"}}, {'LOWER': {'IN': MONTHS}},
+                                  {'IS_PUNCT': True, 'OP': '?'}, {'TEXT': {'REGEX': r"^\d{4}$"}, 'OP': '?'}]},
+    # March 12, 2023
+    {'label': 'DATE', 'pattern': [{'LOWER': {'IN': MONTHS}}, {'TEXT': {'REGEX': r"^\d{1,2}(st|nd|rd|th)?$"}},
+                                  {'IS_PUNCT': True, 'OP': '?'}, {'TEXT': {'REGEX': r"^\d{4}$"}, 'OP': '?'}]},
+    # Rs. 450, INR 1,20,000.50, ₹450, $12.5 crore
+    {'label': 'MONEY', 'pattern': [{'LOWER': {'IN': ['rs', 'rs.', 'inr', '₹', '$', 'usd', '€', 'eur', '£']}},
+                                   {'IS_PUNCT': True, 'OP': '?'}, {'TEXT': {'REGEX': r"^\d[\d,]*(\.\d+)?$"}},
+                                   {'LOWER': {'IN': ['lakh', 'lakhs', 'crore', 'crores', 'million', 'billion']}, 'OP': '?'}]},
+    # PAN (ABCDE1234F), GSTIN (22ABCDE1234F1Z5), IFSC (SBIN0001234)
+    {'label': 'ID', 'pattern': [{'TEXT': {'REGEX': r"^([A-Z]{5}\d{4}[A-Z]|\d{2}[A-Z]{5}\d{4}[A-Z][A-Z\d]Z[A-Z\d]|[A-Z]{4}0[A-Z\d]{6})$"}}]},
+    # Aadhaar: 1234 5678 9012
+    {'label': 'ID', 'pattern': [{'TEXT': {'REGEX': r"^\d{4}$"}}, {'TEXT': {'REGEX': r"^\d{4}$"}},
+                                {'TEXT': {'REGEX': r"^\d{4}$"}}]},
+    {'label': 'EMAIL', 'pattern': [{'LIKE_EMAIL': True}]},
+    {'label': 'URL', 'pattern': [{'LIKE_URL': True}]},
+    # +91 98765 43210, 020-2567-1234, 9876543210
+    {'label': 'PHONE', 'pattern': [{'TEXT': {'REGEX': r"^(\+\d{1,3}|0\d{1,4})$"}}, {'ORTH': '-', 'OP': '?'},
+                                   {'TEXT': {'REGEX': r"^\d{3,5}$"}}, {'ORTH': '-', 'OP': '?'},
+                                   {'TEXT': {'REGEX': r"^\d{4,5}$"}}]},
+    {'label': 'PHONE', 'pattern': [{'TEXT': {'REGEX': r"^(\+91)?[6-9]\d{9}$"}}]},
+]
+# The tokenizer keeps a sentence-final period on a PAN ("ABCDE1234F."); this suffix splits it off so the ID
+# pattern matches
+ID_SUFFIXES = [r"(?<=[A-Z]{5}\d{4}[A-Z])\."]
+
+
+def segment_text(text, target=SEGMENT_CHARS):
+    # Splits text into (offset, segment) pairs of about `target` characters, cutting at line ends that close a
+    # sentence or paragraph, so entities are not split and each segment stays far below spaCy's max_length.
+    # No segment is longer than 2 * target: a longer line is cut at its last whitespace before the limit.
+    segments = []
+    start = 0
+    position = 0
+    limit = 2 * target
+    for line in text.splitlines(keepends=True):
+        position += len(line)
+        while position - start > limit:
+            window = text[start:start + limit]
+            cut = max(window.rfind(' '), window.rfind('\t'))
+            cut = start + cut + 1 if cut > 0 else start + limit  # no whitespace at all: cut mid-word
+            segments.append((start, text[start:cut]))
+            start = cut
+        size = position - start
+        if size >= target and (not line.strip() or BREAK_AFTER.search(line)) or size >= limit:
+            segments.append((start, text[start:position]))
+            start = position
+    if start < len(text):
+        segments.append((start, text[start:]))
+    return [(offset, segment) for offset, segment in segments if segment.strip()]
+
+
+def disabled_components(nlp):
+    return [name for name in nlp.pipe_names if name not in NER_COMPONENTS]
+
+
+def pipe_segmented(nlp, pages, batch_size=NER_BATCH_SIZE, n_process=NER_PROCESSES):
+    # Takes (page, text, [(offset, segment)]) and yields (page, text, [(doc, offset)]) for every page in order. All
+    # segments of all pages go through one nlp.pipe call, so batches span page boundaries and worker processes
+    # start once per document. nlp.pipe reads its input as it goes, so a page is yielded as soon as the pipe has
+    # moved past it, before later pages are read.
+    texts, order = {}, []
+
+    def tagged():
+        for page, text, segments in pages:
+            texts[page] = text
+            order.append(page)
+            for offset, segment in segments:
+                yield segment, (page, offset)
+
+    docs, done = [], 0
+    for doc, (page, offset) in nlp.pipe(tagged(), as_tuples=True, batch_size=batch_size, n_process=n_process,
+                                        disable=disabled_components(nlp)):
+        while order[done] != page:
+            yield order[done], texts.pop(order[done]), docs
+            docs, done = [], done + 1
+        docs.append((doc, offset))
+    for page in order[done:]:
+        yield page, texts.pop(page), docs
+        docs = []
+
+
+def doc_entities(docs):
+    # (text, label, start, end) tuples whose offsets point into the page
+    return [(ent.text, ent.label_, offset + ent.start_char, offset + ent.end_char) for doc, offset in docs
+            for ent in doc.ents]
+
+
+def extract_page_entities(nlp, pages, batch_size=NER_BATCH_SIZE, n_process=NER_PROCESSES):
+    # Yields (page, entities) for each (page, text), running NER segment by segment over the whole document
+    segmented = ((page, text, segment_text(text)) for page, text in pages)
+    for page, _, docs in pipe_segmented(nlp, segmented, batch_size, n_process):
+        yield page, doc_entities(docs)
+
+
+def extract_entities(nlp, text, batch_size=NER_BATCH_SIZE, n_process=NER_PROCESSES):
+    # Runs NER over the text segment by segment with nlp.pipe and returns (text, label, start, end) tuples
+    # whose offsets point into the whole text
+    return next(extract_page_entities(nlp, [(1, text)], batch_size, n_process))[1]
+
+
+def unique_entities(entities):
+    return sorted(set((text.strip(), label) for text, label, _, _ in entities if text.strip()))
+
+
+def page_entities(pages, tier=NER_DEFAULT_TIER):
+    # Yields (page, entities, new) for each (page, text): the page's unique entities and those no earlier page
+    # had. The document's entities are the `new` lists in page order, whether the pages are streamed or not.
+    seen = set()
+    for page, entities in tier_page_entities(pages, tier):
+        entities = unique_entities(entities)
+        new = [entity for entity in entities if entity not in seen]
+        seen.update(new)
+        yield page, entities, new
+
+
+# --- Tiers ---
+def add_structured_ruler(nlp):
+    from spacy.util import compile_suffix_regex
+    nlp.tokenizer.suffix_search = compile_suffix_regex(list(nlp.Defaults.suffixes) + ID_SUFFIXES).search
+    before = {'before': 'ner'} if 'ner' in nlp.pipe_names else {}
+    ruler = nlp.add_pipe('entity_ruler', name='structured_ruler', **before)
+    ruler.add_patterns([dict(pattern, id=STRUCTURED_ID) for pattern in STRUCTURED_PATTERNS])
+    return nlp
+
+
+# What the fast tier actually loaded: NER_FAST_MODEL, or RULES_ONLY when that model could not be loaded
+RULES_ONLY = 'rules'
+fast_pipeline = {}
+
+
+def load_fast_ner():
+    import spacy
+    try:
+        nlp = spacy.load(NER_FAST_MODEL, exclude=['parser', 'lemmatizer'])
+        fast_pipeline['model'] = NER_FAST_MODEL
+    except OSError:
+        # Without the small model the fast tier still finds the structured fields
+        logging.warning(f"spaCy model {NER_FAST_MODEL} is not installed; the fast NER tier is rule-based only")
+        nlp = spacy.blank('en')
+        fast_pipeline['model'] = RULES_ONLY
+    return add_structured_ruler(nlp)
+
+
+def model_installed(name):
+    # A spaCy model is a directory or an installed package; checked without importing spaCy
+    if os.path.isdir(name):
+        return True
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def fast_model_name():
+    # The pipeline behind the fast tier: what was loaded, or before the first load, what would be
+    if 'model' in fast_pipeline:
+        return fast_pipeline['model']
+    return NER_FAST_MODEL if model_installed(NER_FAST_MODEL) else RULES_ONLY
+
+
+registry.register("spacy:fast", load_fast_ner, size_mb=60, warmup=lambda nlp: nlp("Warm up the pipeline."))
+
+
+def get_fast_ner():
+    return registry.get("spacy:fast")
+
+
+def tier_models(tier):
+    # Model names a tier's results depend on, for cache keys. Rule-only fast results are keyed apart from the
+    # small model's, so installing the model later does not keep serving them.
+    fast = fast_model_name() if tier in ('fast', 'hybrid') else None
+    return {'fast': [fast], 'accurate': [NER_MODEL], 'hybrid': [fast, NER_MODEL]}[tier]
+
+
+def context_window(text, start, end, radius=CONTEXT_CHARS):
+    # The sentence around text[start:end], at most `radius` characters to each side
+    left, right = max(0, start - radius), min(len(text), end + radius)
+    cut = max(text.rfind(c, left, start) for c in SENTENCE_BREAKS)
+    if cut >= 0:
+        left = cut + 1
+    cuts = [i for i in (text.find(c, end, right) for c in SENTENCE_BREAKS) if i >= 0]
+    if cuts:
+        right = min(cuts) + 1
+    return left, right
+
+
+def merge_windows(windows):
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def hybrid_page_entities(fast_nlp, accurate_nlp, pages, batch_size=NER_BATCH_SIZE, n_process=NER_PROCESSES,
+                         stats=None):
+    # The fast model reads every page; the sentences around its ambiguous spans go to the transformer, whose
+    # entities replace the fast model's there. Structured fields found by the rules are always kept. Each model
+    # sees the whole document in one nlp.pipe call. Yields (page, entities) for each (page, text).
+    found = {}
+
+    def escalations():
+        segmented = ((page, text, segment_text(text)) for page, text in pages)
+        for page, text, docs in pipe_segmented(fast_nlp, segmented, batch_size, n_process):
+            kept, structured, windows = [], [], []
+            for doc, offset in docs:
+                for ent in doc.ents:
+                    entity = (ent.text, ent.label_, offset + ent.start_char, offset + ent.end_char)
+                    if ent.ent_id_ == STRUCTURED_ID:
+                        structured.append(entity)
+                    elif ent.label_ in AMBIGUOUS_LABELS:
+                        windows.append(context_window(text, entity[2], entity[3]))
+                    else:
+                        kept.append(entity)
+            windows = merge_windows(windows)
+            # Fast entities inside an escalated window are superseded by the transformer's
+            kept = [e for e in kept if not any(start <= e[2] and e[3] <= end for start, end in windows)]
+            found[page] = structured, kept
+            if stats is not None:
+                stats['escalated_chars'] = stats.get('escalated_chars', 0) + sum(end - start for start, end in windows)
+                stats['chars'] = stats.get('chars', 0) + len(text)
+            yield page, text, [(start, text[start:end]) for start, end in windows]
+
+    for page, _, docs in pipe_segmented(accurate_nlp, escalations(), batch_size, n_process):
+        structured, kept = found.pop(page)
+        escalated = [entity for entity in doc_entities(docs)
+                     if not any(entity[2] < e[3] and e[2] < entity[3] for e in structured)]
+        yield page, sorted(structured + kept + escalated, key=lambda e: e[2])
+
+
+def hybrid_entities(fast_nlp, accurate_nlp, text, batch_size=NER_BATCH_SIZE, n_process=NER_PROCESSES, stats=None):
+    return next(hybrid_page_entities(fast_nlp, accurate_nlp, [(1, text)], batch_size, n_process, stats))[1]
+
+
+def tier_page_entities(pages, tier=NER_DEFAULT_TIER, fast_nlp=None, accurate_nlp=None, stats=None):
+    # Yields (page, entities) for each (page, text), the whole document going through each model in one pipe
+    if tier not in NER_TIERS:
+        raise ValueError(f"Unknown NER tier {tier!r}, expected one of {', '.join(NER_TIERS)}")
+    return _tier_page_entities(pages, tier, fast_nlp, accurate_nlp, stats)
+
+
+def _tier_page_entities(pages, tier, fast_nlp, accurate_nlp, stats):
+    # Models not passed in are checked out of the registry until the last page, so eviction cannot drop them
+    with ExitStack() as stack:
+        if tier != 'accurate' and fast_nlp is None:
+            fast_nlp = stack.enter_context(registry.use("spacy:fast"))
+        if tier != 'fast' and accurate_nlp is None:
+            accurate_nlp = stack.enter_context(registry.use("spacy"))
+        if tier == 'fast':
+            yield from extract_page_entities(fast_nlp, pages)
+        elif tier == 'accurate':
+            yield from extract_page_entities(accurate_nlp, pages)
+        else:
+            yield from hybrid_page_entities(fast_nlp, accurate_nlp, pages, stats=stats)
+
+
+def tier_entities(text, tier=NER_DEFAULT_TIER, fast_nlp=None, accurate_nlp=None, stats=None):
+    return next(tier_page_entities([(1, text)], tier, fast_nlp, accurate_nlp, stats))[1]
@@ -30,21 +30,32 @@ document.getElementById('upload-form').addEventListener('submit', async function
   formData.append('file', document.getElementById('file').files[0]);
 
   try {
-      const response = await fetch('/ner/upload', {
+      const model = document.getElementById('nerModel').value;
+      // Entities arrive page by page as Server-Sent Events, so the table fills in while later pages are processed
+      const response = await fetch(`/ner/upload?model=${encodeURIComponent(model)}&stream=1`, {
           method: 'POST',
           body: formData,
       });
 
       if (response.ok) {
-          const data = await response.json();
-          if (data.error) {
-              alert('Error: ' + data.error);
-          } else if (data.message) {
-              alert(data.message);
-              displayEntities([]); // Display empty table if no text extracted
-          } else {
-              displayEntities(data);
-          }
+          const found = [];
+          await readEvents(response, (event, data) => {
+              if (event === 'page') {
+                  found.push(...data.new);
+                  displayEntities(found);
+                  loader.classList.add('hidden');
+              } else if (event === 'done') {
+                  // Cached results are only kept for documents with text
+                  if (!data.cached && data.text_pages === 0) {
+                      alert('No text extracted.');
+                  } else if (data.entities.length === 0) {
+                      alert('No entities found.');
+                  }
+                  displayEntities(data.entities);
+              } else if (event === 'error') {
+                  alert('Error: ' + data.error);
+              }
+          });
       } else {
           const errorData = await response.json();
           alert('Failed to extract entities. Please try again.\n' + (errorData.error || ''));
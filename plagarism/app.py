@@ -1,10 +1,14 @@
 import streamlit as st
 import os
+import sys
+import time
 import zipfile
-import fitz
-import difflib
 import shutil
-import easyocr
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from plagarism.lsh import MIN_SIMILARITY_THRESHOLD, SIMILARITY_THRESHOLD, find_similar_pairs
+from plagarism.fingerprints import CORPUS_DB, FingerprintStore, check_against_corpus, content_hash
+from plagarism.extraction import DEFAULT_WORKERS, FILE_TIMEOUT, extract_texts
 
 # --- Constants ---
 BACKEND_URL = "https://legendary-xylophone-x5x4jqv59w5q2wrg-5000.app.github.dev/"
@@ -17,39 +21,23 @@ def extract_zip(file_path, extract_to=UPLOAD_DIR):
     with zipfile.ZipFile(file_path, 'r') as zip_ref:
         zip_ref.extractall(extract_to)
 
-def extract_text_from_pdf(pdf_path, reader, progress_bar, progress_text, current, total):
-    text = ""
-    try:
-        doc = fitz.open(pdf_path)
-        for page in doc:
-            page_text = page.get_text()
-            if page_text.strip():
-                text += page_text.strip() + '\n'
-            else:
-                image = page.get_pixmap()
-                image.save('temp_page.png')
-                result = reader.readtext('temp_page.png', detail=0)
-                text += ' '.join(result) + '\n'
-                os.remove('temp_page.png')
-        doc.close()
-    except Exception as e:
-        st.error(f"❗ Error processing {os.path.basename(pdf_path)}: {e}")
-    progress_bar.progress(min(current / total, 1.0))
-    progress_text.text(f"📄 Processing {current}/{total} - {os.path.basename(pdf_path)}")
-    return text
-
-def detect_plagiarism(texts, file_names):
-    plagiarism_results = []
-    no_plagiarism_files = []
-    n = len(texts)
-    for i in range(n):
-        for j in range(i + 1, n):
-            similarity = difflib.SequenceMatcher(None, texts[i], texts[j]).ratio()
-            if similarity > 0.7:
-                plagiarism_results.append((file_names[i], file_names[j], similarity))
-            else:
-                no_plagiarism_files.extend([file_names[i], file_names[j]])
-    no_plagiarism_files = list(set(no_plagiarism_files) - set([x[0] for x in plagiarism_results]) - set([x[1] for x in plagiarism_results]))
+def extract_texts_with_progress(pdf_paths, progress_bar, progress_text, offset, total, workers):
+    # Progress events arrive on this thread as each worker finishes a file, so the widgets update in place
+    def on_progress(done, _, pdf_path, error):
+        if error:
+            st.error(f"❗ Error processing {os.path.basename(pdf_path)}: {error}")
+        progress_bar.progress(min((offset + done) / total, 1.0))
+        progress_text.text(f"📄 Processing {offset + done}/{total} - {os.path.basename(pdf_path)}")
+
+    return extract_texts(pdf_paths, workers, FILE_TIMEOUT, on_progress)
+
+def detect_plagiarism(texts, file_names, threshold=SIMILARITY_THRESHOLD, method="lsh", signatures=None):
+    plagiarism_results = [(file_names[i], file_names[j], similarity)
+                          for i, j, similarity in find_similar_pairs(texts, threshold, method, signatures)]
+    flagged = set([x[0] for x in plagiarism_results]) | set([x[1] for x in plagiarism_results])
+    # Only pairs proposed by the LSH index are scored, so every file that was compared to at least
+    # one other file and never flagged counts as clean
+    no_plagiarism_files = [f for f in file_names if f not in flagged] if len(file_names) > 1 else []
     return plagiarism_results, no_plagiarism_files
 
 # --- Main App ---
@@ -74,6 +62,15 @@ def main():
     st.subheader("📂 Upload Your ZIP File")
     uploaded_file = st.file_uploader("Upload a ZIP file containing PDF documents", type=["zip"], help="Ensure the ZIP contains only PDF files.")
 
+    threshold = st.slider("Similarity threshold", min_value=MIN_SIMILARITY_THRESHOLD, max_value=0.99, value=SIMILARITY_THRESHOLD, step=0.01,
+                          help="Pairs of files above this similarity are reported as plagiarized.")
+
+    use_corpus = st.checkbox("Compare with previous submissions", value=True,
+                             help="Keep extracted texts in a local corpus and check new uploads against every earlier batch.")
+
+    workers = st.number_input("Extraction workers", min_value=1, max_value=os.cpu_count() or 1, value=DEFAULT_WORKERS,
+                              help="PDFs are extracted in parallel processes; 1 processes them one at a time.")
+
     if uploaded_file:
         zip_path = "uploaded.zip"
         with open(zip_path, "wb") as f:
@@ -89,20 +86,43 @@ def main():
                 return
 
             st.info(f"📁 **Total PDF files detected:** {len(pdf_files)}")
-            reader = easyocr.Reader(['en'])
-
-            progress_bar = st.progress(0)
-            progress_text = st.empty()
-
-            texts = []
-            for i, pdf in enumerate(pdf_files):
-                pdf_path = os.path.join(UPLOAD_DIR, pdf)
-                extracted = extract_text_from_pdf(pdf_path, reader, progress_bar, progress_text, i + 1, len(pdf_files))
-                texts.append(extracted)
-
-            st.success("✅ All files processed successfully!")
-
-            results, no_plagiarism_files = detect_plagiarism(texts, pdf_files)
+            store = FingerprintStore(CORPUS_DB) if use_corpus else None
+            try:
+                progress_bar = st.progress(0)
+                progress_text = st.empty()
+
+                pdf_paths = [os.path.join(UPLOAD_DIR, pdf) for pdf in pdf_files]
+                digests = [content_hash(pdf_path) for pdf_path in pdf_paths]
+                # Files already in the corpus reuse their stored text; only new ones are extracted
+                texts = [store.get_text(digest) if store else None for digest in digests]
+                new = [i for i, text in enumerate(texts) if text is None]
+                reused = len(pdf_files) - len(new)
+                if reused:
+                    progress_bar.progress(reused / len(pdf_files))
+                    progress_text.text(f"📄 Reused stored text for {reused}/{len(pdf_files)} files")
+                extracted, errors = extract_texts_with_progress([pdf_paths[i] for i in new], progress_bar,
+                                                                progress_text, reused, len(pdf_files), int(workers))
+                for i, text in zip(new, extracted):
+                    texts[i] = text
+
+                # Failed files are still compared with what text they have, but are not stored in the corpus
+                failed = {digests[pdf_paths.index(pdf_path)] for pdf_path in errors}
+                if errors:
+                    st.warning(f"⚠ {len(errors)} of {len(pdf_files)} files could not be fully processed and were "
+                               f"not added to the corpus: " + ", ".join(os.path.basename(p) for p in errors))
+                else:
+                    st.success("✅ All files processed successfully!")
+
+                corpus_results, signatures = [], None
+                if store:
+                    batch = f"{uploaded_file.name} {time.strftime('%Y-%m-%d %H:%M')}"
+                    corpus_results, signatures = check_against_corpus(store, pdf_files, digests, texts, batch,
+                                                                      threshold, failed)
+            finally:
+                if store:
+                    store.close()
+
+            results, no_plagiarism_files = detect_plagiarism(texts, pdf_files, threshold, signatures=signatures)
 
             if results:
                 st.subheader("🚩 Detected Plagiarized Files:")
@@ -114,6 +134,16 @@ def main():
             else:
                 st.success("🎉 No plagiarism detected among the uploaded files.")
 
+            if corpus_results:
+                st.subheader("📚 Matches Against Previous Submissions:")
+                for file1, file2, sim in corpus_results:
+                    st.markdown(
+                        f"<p style='font-size:18px;'><strong>{file1}</strong> & <strong>{file2}</strong> - Similarity: <strong>{sim*100:.2f}%</strong></p>",
+                        unsafe_allow_html=True
+                    )
+                flagged = set(x[0] for x in corpus_results)
+                no_plagiarism_files = [f for f in no_plagiarism_files if f not in flagged]
+
             if no_plagiarism_files:
                 st.subheader("✅ Files with No Plagiarism Detected:")
                 for file in no_plagiarism_files:
@@ -0,0 +1,132 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz  # PyMuPDF
+
+from common.ocr import ocr_page
+from common.models import ocr_reader_model, registry
+
+# --- Constants ---
+DEFAULT_WORKERS = max(1, min(8, os.cpu_count() or 1))
+FILE_TIMEOUT = 600  # seconds per PDF; 0 disables the limit
+POLL_INTERVAL = 0.5
+OCR_LANGUAGES = ('en',)
+
+
+def init_worker():
+    # Each worker already owns a core, so keep torch from spawning a thread per core on top of it
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+
+def extract_pdf(pdf_path, reader=None, dpi=None):
+    # The registry is per process, so each worker creates one reader the first time a page needs OCR
+    text = ""
+    try:
+        with registry.use_lazily(ocr_reader_model(OCR_LANGUAGES)) as get_reader:
+            doc = fitz.open(pdf_path)
+            for page in doc:
+                page_text = page.get_text()
+                if page_text.strip():
+                    text += page_text.strip() + '\n'
+                else:
+                    text += ocr_page(reader or get_reader(), page, dpi) + '\n'
+            doc.close()
+    except Exception as e:
+        return text, str(e)
+    return text, None
+
+
+def _terminate(executor):
+    # Futures cannot interrupt a running task, so a stuck file means killing its pool
+    for process in list(getattr(executor, '_processes', {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_texts(pdf_paths, workers=DEFAULT_WORKERS, timeout=FILE_TIMEOUT, on_progress=None, reader=None):
+    # Returns (texts, errors) in input order; on_progress(done, total, pdf_path, error) fires as each file finishes.
+    # Every mode runs extract_pdf, so parallel output is identical to serial output. A running file can only be
+    # stopped by killing its process, so with a timeout even one worker runs in a pool; only timeout=0 extracts
+    # in this process (with `reader`, if given).
+    total = len(pdf_paths)
+    texts = [""] * total
+    errors = {}
+    done = 0
+
+    def finish(i, text, error):
+        nonlocal done
+        texts[i] = text
+        if error:
+            errors[pdf_paths[i]] = error
+        done += 1
+        if on_progress:
+            on_progress(done, total, pdf_paths[i], error)
+
+    if not timeout and (workers <= 1 or total <= 1):
+        for i, pdf_path in enumerate(pdf_paths):
+            text, error = extract_pdf(pdf_path, reader)
+            finish(i, text, error)
+        return texts, errors
+
+    workers = max(1, min(workers, total))
+    queue = list(range(total))
+    queue.reverse()
+    # Files that were running when a worker died. Any of them may have killed it, so each is retried alone:
+    # a file that still kills its worker with nothing else running is the one that fails.
+    suspects = set()
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+    pending = {}
+    try:
+        while queue or pending:
+            # Keep at most one file in flight per worker so submission time is start time for the timeout
+            while queue and len(pending) < workers:
+                running_suspect = any(i in suspects for i, _ in pending.values())
+                if pending and (running_suspect or queue[-1] in suspects):
+                    break
+                i = queue.pop()
+                pending[executor.submit(extract_pdf, pdf_paths[i])] = (i, time.monotonic())
+
+            completed, _ = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            lost = []
+            for future in completed:
+                i, _ = pending.pop(future)
+                try:
+                    text, error = future.result()
+                except BrokenProcessPool:
+                    lost.append(i)
+                    continue
+                except Exception as e:
+                    text, error = "", str(e)
+                finish(i, text, error)
+
+            if lost:
+                # A dead worker breaks the whole pool: every file still in it is lost, not just the culprit
+                lost.extend(i for i, _ in pending.values())
+                pending.clear()
+                if len(lost) == 1:
+                    finish(lost[0], "", "worker process died")
+                else:
+                    suspects.update(lost)
+                    queue.extend(lost)
+
+            now = time.monotonic()
+            expired = [f for f, (_, started) in pending.items() if timeout and now - started > timeout]
+            for future in expired:
+                i, _ = pending.pop(future)
+                finish(i, "", f"timed out after {timeout}s")
+
+            if expired or lost:
+                # Requeue the files that were still running and start over with a fresh pool
+                queue.extend(i for i, _ in pending.values())
+                pending.clear()
+                _terminate(executor)
+                executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return texts, errors
@@ -0,0 +1,143 @@
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+
+import numpy as np
+
+from plagarism.lsh import (MIN_SIMILARITY_THRESHOLD, SIMILARITY_THRESHOLD, NUM_PERM, SHINGLE_SIZE, SEED, MinHasher,
+                           choose_bands, ratio_to_jaccard, similarity_above)
+
+# --- Constants ---
+CORPUS_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fingerprints.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT UNIQUE NOT NULL,
+    file_name TEXT NOT NULL,
+    batch TEXT NOT NULL,
+    added_at REAL NOT NULL,
+    text BLOB NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    bucket BLOB NOT NULL,
+    doc_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, bucket);
+"""
+
+
+def content_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# On-disk corpus of extracted texts and MinHash signatures, keyed by the SHA-256 of the PDF bytes.
+# Every lookup is a handful of indexed (band, bucket) queries no matter how many past batches the corpus holds.
+# The LSH band layout is fixed and sized for MIN_SIMILARITY_THRESHOLD, so it finds candidates for any threshold the
+# apps offer and sessions with different thresholds share one layout; the threshold only applies when candidates
+# are scored exactly. A corpus stored with an older layout is re-bucketed once when opened.
+class FingerprintStore:
+    def __init__(self, path=CORPUS_DB):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        if not meta:
+            meta = {'num_perm': NUM_PERM, 'shingle_size': SHINGLE_SIZE, 'seed': SEED}
+            with self.conn:
+                self.conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [(k, str(v)) for k, v in meta.items()])
+        self.hasher = MinHasher(int(meta['num_perm']), int(meta['shingle_size']), int(meta['seed']))
+        self.bands, self.rows = choose_bands(int(meta['num_perm']), ratio_to_jaccard(MIN_SIMILARITY_THRESHOLD))
+        if (meta.get('bands'), meta.get('rows')) != (str(self.bands), str(self.rows)):
+            self._rebucket()
+
+    def _rebucket(self):
+        # Rebuild the band index of every stored signature for the current layout, in one transaction
+        with self.conn:
+            self.conn.execute("DELETE FROM bands")
+            for doc_id, blob in self.conn.execute("SELECT id, signature FROM documents").fetchall():
+                signature = np.frombuffer(blob, dtype=np.uint32)
+                self.conn.executemany("INSERT INTO bands (band, bucket, doc_id) VALUES (?, ?, ?)",
+                                      [(band, key, doc_id) for band, key in self.band_keys(signature)])
+            self.conn.execute("DELETE FROM meta WHERE key = 'threshold'")
+            self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                  [('bands', str(self.bands)), ('rows', str(self.rows))])
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def signature(self, text):
+        return self.hasher.signature(text)
+
+    def band_keys(self, signature):
+        return [(i, signature[i * self.rows:(i + 1) * self.rows].tobytes()) for i in range(self.bands)]
+
+    def get_text(self, digest):
+        row = self.conn.execute("SELECT text FROM documents WHERE content_hash = ?", (digest,)).fetchone()
+        return zlib.decompress(row[0]).decode('utf-8') if row else None
+
+    def add(self, digest, file_name, text, signature, batch):
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO documents (content_hash, file_name, batch, added_at, text, signature) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, file_name, batch, time.time(), zlib.compress(text.encode('utf-8')), signature.tobytes()))
+            if cursor.rowcount:
+                self.conn.executemany("INSERT INTO bands (band, bucket, doc_id) VALUES (?, ?, ?)",
+                                      [(band, key, cursor.lastrowid) for band, key in self.band_keys(signature)])
+
+    def candidates(self, signature, exclude=()):
+        doc_ids = set()
+        for band, key in self.band_keys(signature):
+            doc_ids.update(row[0] for row in self.conn.execute(
+                "SELECT doc_id FROM bands WHERE band = ? AND bucket = ?", (band, key)))
+        if not doc_ids:
+            return []
+        placeholders = ','.join('?' * len(doc_ids))
+        rows = self.conn.execute(
+            f"SELECT content_hash, file_name, batch, text FROM documents WHERE id IN ({placeholders}) ORDER BY id",
+            list(doc_ids))
+        return [(digest, file_name, batch, zlib.decompress(text).decode('utf-8'))
+                for digest, file_name, batch, text in rows if digest not in exclude]
+
+
+
+def check_against_corpus(store, file_names, digests, texts, batch, threshold=SIMILARITY_THRESHOLD, failed=()):
+    # Compare a batch with every earlier batch, then index the batch's new documents.
+    # Pairs inside the batch are scored by detect_plagiarism, so other files of this batch are skipped here,
+    # as is a file's own earlier copy under the same name (the same submission checked again).
+    # Files whose digest is in `failed` (extraction errors or timeouts) are compared with what text they have but
+    # not stored, so their next upload is extracted again instead of reusing an empty or partial text.
+    signatures = [store.signature(text) for text in texts]
+    batch_digests = set(digests)
+    corpus_results = []
+    for file_name, digest, text, signature in zip(file_names, digests, texts, signatures):
+        for past_digest, past_file, past_batch, past_text in store.candidates(signature, batch_digests - {digest}):
+            if past_digest == digest and past_file == file_name:
+                continue
+            similarity = similarity_above(text, past_text, threshold)
+            if similarity is not None:
+                corpus_results.append((file_name, f"{past_file} ({past_batch})", similarity))
+    for file_name, digest, text, signature in zip(file_names, digests, texts, signatures):
+        if digest not in failed:
+            store.add(digest, file_name, text, signature, batch)
+    return corpus_results, signatures
@@ -0,0 +1,141 @@
+import re
+import zlib
+import difflib
+from collections import defaultdict
+
+import numpy as np
+
+# --- Constants ---
+SIMILARITY_THRESHOLD = 0.7
+MIN_SIMILARITY_THRESHOLD = 0.1  # lowest threshold the apps offer
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+SEED = 1
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+HASH_BLOCK = 4096
+
+
+# --- Shingling ---
+def normalize_text(text):
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+
+def shingle_hashes(text, k=SHINGLE_SIZE):
+    text = normalize_text(text)
+    if not text:
+        return np.empty(0, dtype=np.uint64)
+    if len(text) <= k:
+        grams = {text}
+    else:
+        grams = {text[i:i + k] for i in range(len(text) - k + 1)}
+    return np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+# --- MinHash ---
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=SEED):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64) % MERSENNE_PRIME
+        self.b = rng.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64) % MERSENNE_PRIME
+
+    def signature(self, text):
+        hashes = shingle_hashes(text, self.shingle_size)
+        signature = np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        # Hash in blocks so a long document never materializes a (shingles x num_perm) matrix at once
+        for start in range(0, len(hashes), HASH_BLOCK):
+            block = hashes[start:start + HASH_BLOCK]
+            permuted = (np.outer(block, self.a) + self.b) % MERSENNE_PRIME & MAX_HASH
+            np.minimum(signature, permuted.min(axis=0), out=signature)
+        return signature.astype(np.uint32)
+
+
+def estimate_jaccard(sig1, sig2):
+    return float(np.mean(sig1 == sig2))
+
+
+# --- LSH banding ---
+def ratio_to_jaccard(ratio):
+    # Two texts sharing a fraction f of their content have a SequenceMatcher ratio of about f
+    # and a shingle Jaccard of about f / (2 - f)
+    return ratio / (2.0 - ratio)
+
+
+def choose_bands(num_perm, jaccard_threshold):
+    # Pick the (bands, rows) split whose S-curve midpoint sits at or just below the threshold,
+    # trading a few extra candidates for recall
+    best = (num_perm, 1)
+    best_point = 0.0
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        point = (1.0 / bands) ** (1.0 / rows)
+        if best_point < point <= jaccard_threshold:
+            best, best_point = (bands, rows), point
+    return best
+
+
+class LSHIndex:
+    def __init__(self, num_perm=NUM_PERM, threshold=SIMILARITY_THRESHOLD):
+        self.num_perm = num_perm
+        self.bands, self.rows = choose_bands(num_perm, ratio_to_jaccard(threshold))
+        self.buckets = [defaultdict(list) for _ in range(self.bands)]
+
+    def band_keys(self, signature):
+        signature = np.asarray(signature, dtype=np.uint32)
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def query(self, signature):
+        found = set()
+        for bucket, key in zip(self.buckets, self.band_keys(signature)):
+            found.update(bucket.get(key, ()))
+        return found
+
+    def insert(self, key, signature):
+        for bucket, band_key in zip(self.buckets, self.band_keys(signature)):
+            bucket[band_key].append(key)
+
+
+# --- Exact scoring ---
+def similarity_above(text1, text2, threshold=SIMILARITY_THRESHOLD):
+    matcher = difflib.SequenceMatcher(None, text1, text2)
+    # Both quick ratios are upper bounds of ratio(), so rejecting on them never changes the result
+    if matcher.real_quick_ratio() <= threshold or matcher.quick_ratio() <= threshold:
+        return None
+    similarity = matcher.ratio()
+    return similarity if similarity > threshold else None
+
+
+def all_pairs(n):
+    return [(i, j) for i in range(n) for j in range(i + 1, n)]
+
+
+def candidate_pairs(texts, threshold=SIMILARITY_THRESHOLD, hasher=None, signatures=None):
+    hasher = hasher or MinHasher()
+    if signatures is None:
+        signatures = [hasher.signature(text) for text in texts]
+    index = LSHIndex(hasher.num_perm, threshold)
+    pairs = set()
+    for j, signature in enumerate(signatures):
+        pairs.update((i, j) for i in index.query(signature))
+        index.insert(j, signature)
+    return sorted(pairs)
+
+
+def find_similar_pairs(texts, threshold=SIMILARITY_THRESHOLD, method="lsh", signatures=None):
+    if method == "exact":
+        pairs = all_pairs(len(texts))
+    elif method == "lsh":
+        pairs = candidate_pairs(texts, threshold, signatures=signatures)
+    else:
+        raise ValueError(f"Unknown detection method: {method}")
+
+    results = []
+    for i, j in pairs:
+        similarity = similarity_above(texts[i], texts[j], threshold)
+        if similarity is not None:
+            results.append((i, j, similarity))
+    return results
@@ -1,9 +1,14 @@
 import os
+import sys
+import time
 import zipfile
-import fitz  # PyMuPDF
-import difflib
 import shutil
-import easyocr
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from plagarism.lsh import SIMILARITY_THRESHOLD, find_similar_pairs
+from plagarism.fingerprints import CORPUS_DB, FingerprintStore, check_against_corpus, content_hash
+from plagarism.extraction import DEFAULT_WORKERS, FILE_TIMEOUT, extract_pdf, extract_texts
 
 def extract_zip(file_path, extract_to='test'):
     if not os.path.exists(extract_to):
@@ -13,36 +18,23 @@ def extract_zip(file_path, extract_to='test'):
         zip_ref.extractall(extract_to)
     print(f"Extracted to {extract_to}")
 
-def extract_text_from_pdf(pdf_path, reader):
-    text = ""
-    try:
-        doc = fitz.open(pdf_path)
-        for page in doc:
-            page_text = page.get_text()
-            if page_text.strip():
-                text += page_text.strip() + '\n'
-            else:
-                image = page.get_pixmap()
-                image.save('temp_page.png')
-                result = reader.readtext('temp_page.png', detail=0)
-                text += ' '.join(result) + '\n'
-                os.remove('temp_page.png')
-        doc.close()
-    except Exception as e:
-        print(f"Error processing {pdf_path}: {e}")
+def extract_text_from_pdf(pdf_path, reader=None):
+    text, error = extract_pdf(pdf_path, reader)
+    if error:
+        print(f"Error processing {pdf_path}: {error}")
     return text
 
-def detect_plagiarism(texts, file_names):
-    plagiarism_results = []
-    n = len(texts)
-    for i in range(n):
-        for j in range(i + 1, n):
-            similarity = difflib.SequenceMatcher(None, texts[i], texts[j]).ratio()
-            if similarity > 0.7:
-                plagiarism_results.append((file_names[i], file_names[j], similarity))
-    return plagiarism_results
+def print_progress(done, total, pdf_path, error):
+    if error:
+        print(f"Error processing {pdf_path}: {error}")
+    print(f"Processed {done}/{total} - {os.path.basename(pdf_path)}")
+
+def detect_plagiarism(texts, file_names, threshold=SIMILARITY_THRESHOLD, method="lsh", signatures=None):
+    return [(file_names[i], file_names[j], similarity)
+            for i, j, similarity in find_similar_pairs(texts, threshold, method, signatures)]
 
-def scan_for_plagiarism(zip_path):
+def scan_for_plagiarism(zip_path, threshold=SIMILARITY_THRESHOLD, corpus_path=CORPUS_DB, workers=DEFAULT_WORKERS,
+                        timeout=FILE_TIMEOUT):
     extract_to = 'test'
     extract_zip(zip_path, extract_to)
     
@@ -51,10 +43,24 @@ def scan_for_plagiarism(zip_path):
         print("No PDF files found.")
         return
 
-    reader = easyocr.Reader(['en'])
+    batch = f"{os.path.basename(zip_path)} {time.strftime('%Y-%m-%d %H:%M')}"
+    with FingerprintStore(corpus_path) as store:
+        pdf_paths = [os.path.join(extract_to, pdf) for pdf in pdf_files]
+        digests = [content_hash(pdf_path) for pdf_path in pdf_paths]
+        # Files already in the corpus reuse their stored text; only new ones are extracted
+        texts = [store.get_text(digest) for digest in digests]
+        new = [i for i, text in enumerate(texts) if text is None]
+        extracted, errors = extract_texts([pdf_paths[i] for i in new], workers, timeout, print_progress)
+        for i, text in zip(new, extracted):
+            texts[i] = text
+        if errors:
+            print(f"{len(errors)} of {len(pdf_files)} files could not be fully processed and were not added to the "
+                  f"corpus: {', '.join(os.path.basename(p) for p in errors)}")
+        # Failed files are still compared with what text they have, but are not stored in the corpus
+        failed = {digests[pdf_paths.index(pdf_path)] for pdf_path in errors}
+        corpus_results, signatures = check_against_corpus(store, pdf_files, digests, texts, batch, threshold, failed)
 
-    texts = [extract_text_from_pdf(os.path.join(extract_to, pdf), reader) for pdf in pdf_files]
-    results = detect_plagiarism(texts, pdf_files)
+    results = detect_plagiarism(texts, pdf_files, threshold, signatures=signatures)
 
     if results:
         print("Detected Plagiarized Files:")
@@ -63,5 +69,18 @@ def scan_for_plagiarism(zip_path):
     else:
         print("No plagiarism detected.")
 
+    if corpus_results:
+        print("Matches Against Previous Submissions:")
+        for file1, file2, sim in corpus_results:
+            print(f"{file1} and {file2} - Similarity: {sim*100:.2f}%")
+
     shutil.rmtree(extract_to)
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detect plagiarism between the PDFs of a ZIP file")
+    parser.add_argument("zip_path")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Extraction processes; 1 runs serially")
+    parser.add_argument("--timeout", type=float, default=FILE_TIMEOUT, help="Seconds allowed per PDF; 0 disables")
+    args = parser.parse_args()
+    scan_for_plagiarism(args.zip_path, args.threshold, workers=args.workers, timeout=args.timeout)
@@ -0,0 +1,58 @@
+import re
+
+# --- Constants ---
+MAX_CHUNK_TOKENS = 1024  # facebook/bart-large-cnn's input window, special tokens included
+CHUNK_OVERLAP_TOKENS = 32
+# Chunk and summary-length settings shared by the summarizer, the Summary app and /analyze, so a summary made by
+# either app is cached under one key
+SUMMARY_BUFFER = 50  # tokens allowed on top of a chunk's share, see summarizer.summary_lengths
+MAP_REDUCE_MAX_PAGES = 1000  # map-reduce output stays bounded, so it can read far more of the document
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+UNSUMMARIZABLE = re.compile(r"[^a-zA-Z0-9\s.,?!'\"()\[\]{}:;+-]")
+
+
+def clean_text(text):
+    # What the summarizer is given: letters, digits and common punctuation, whitespace collapsed
+    return re.sub(r"\s+", " ", UNSUMMARIZABLE.sub("", text)).strip()
+
+
+def split_sentences(text):
+    return [s for s in SENTENCE_END.split(text) if s.strip()]
+
+
+def sentence_token_ids(tokenizer, sentence, budget):
+    # Leading space so ids match how the sentence tokenizes in the middle of a chunk (byte-level BPE);
+    # a sentence longer than the whole window is cut into window-sized pieces
+    ids = tokenizer(" " + sentence.strip(), add_special_tokens=False)['input_ids']
+    return [ids[i:i + budget] for i in range(0, len(ids), budget)]
+
+
+def with_special_tokens(tokenizer, ids):
+    if hasattr(tokenizer, 'build_inputs_with_special_tokens'):
+        return tokenizer.build_inputs_with_special_tokens(ids)
+    return [tokenizer.bos_token_id] + ids + [tokenizer.eos_token_id]
+
+
+def iter_token_chunks(texts, tokenizer, max_tokens=MAX_CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    # Packs whole sentences from a stream of page texts into chunks that fill the model window, and yields each
+    # chunk as model-ready token ids as soon as it is full. Consecutive chunks share up to overlap_tokens of
+    # trailing sentences. Only the current chunk is held in memory, so pages can come from a generator.
+    budget = max_tokens - tokenizer.num_special_tokens_to_add()
+    current, current_len = [], 0
+    for text in texts:
+        for sentence in split_sentences(text):
+            for ids in sentence_token_ids(tokenizer, sentence, budget):
+                if current and current_len + len(ids) > budget:
+                    yield with_special_tokens(tokenizer, [t for piece in current for t in piece])
+                    # Carry trailing sentences into the next chunk while they fit in the overlap
+                    carried, carried_len = [], 0
+                    for piece in reversed(current):
+                        if carried_len + len(piece) > overlap_tokens or carried_len + len(piece) + len(ids) > budget:
+                            break
+                        carried.insert(0, piece)
+                        carried_len += len(piece)
+                    current, current_len = carried, carried_len
+                current.append(ids)
+                current_len += len(ids)
+    if current:
+        yield with_special_tokens(tokenizer, [t for piece in current for t in piece])
@@ -0,0 +1,172 @@
+import os
+import logging
+import hashlib
+import threading
+from collections import OrderedDict
+
+import torch
+from transformers import LogitsProcessor, LogitsProcessorList
+
+from common.models import SUMMARY_MODEL, registry
+from summary.chunker import MAX_CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, SUMMARY_BUFFER, iter_token_chunks
+
+# --- Constants ---
+BATCH_SIZE = int(os.environ.get('SUMMARY_BATCH_SIZE', 8))
+MIN_INPUT_TOKENS = 30
+MAX_SUMMARY_TOKENS = 512
+WINDOW_BATCHES = 4  # batches of chunks gathered before length-sorting, bounds memory when streaming
+# Map and intermediate reduce levels always use this ratio, so their cached results are shared by every
+# final ratio; only the last reduce step depends on the requested ratio
+MAP_RATIO = 0.4
+SUMMARY_CACHE_ENTRIES = int(os.environ.get('SUMMARY_CACHE_ENTRIES', 4096))
+
+
+# In-process LRU of chunk summaries keyed by model, length settings and the chunk's token ids
+class SummaryCache:
+    def __init__(self, max_entries=SUMMARY_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(ids, summary_ratio, buffer):
+        return hashlib.sha256(f"{SUMMARY_MODEL}|{summary_ratio}|{buffer}|{','.join(map(str, ids))}".encode()).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        return None
+
+    def put(self, key, summary):
+        with self._lock:
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+summary_cache = SummaryCache()
+
+
+def summary_lengths(input_len, summary_ratio, buffer=SUMMARY_BUFFER):
+    max_len = min(MAX_SUMMARY_TOKENS, max(60, int(input_len * summary_ratio) + buffer))
+    min_len = max(20, int(max_len * 0.3))
+    return min_len, max_len
+
+
+# generate() takes one min/max length per call; this applies each sample's own limits inside a batch,
+# the same way MinLengthLogitsProcessor and max_length do for a single sample
+class PerSampleLengthProcessor(LogitsProcessor):
+    def __init__(self, min_lengths, max_lengths, eos_token_id, num_beams):
+        self.min_lengths = torch.tensor(min_lengths).repeat_interleave(num_beams)
+        self.max_lengths = torch.tensor(max_lengths).repeat_interleave(num_beams)
+        self.eos_token_id = eos_token_id
+
+    def __call__(self, input_ids, scores):
+        cur_len = input_ids.shape[-1]
+        too_short = (cur_len < self.min_lengths).to(scores.device)
+        scores[too_short, self.eos_token_id] = -float("inf")
+        must_end = (cur_len >= self.max_lengths - 1).to(scores.device)
+        scores[must_end] = -float("inf")
+        scores[must_end, self.eos_token_id] = 0
+        return scores
+
+
+def length_batches(items, batch_size):
+    # Longest first, so each padded batch holds inputs of similar length and little compute goes to padding
+    ordered = sorted(items, key=lambda item: len(item[1]), reverse=True)
+    return [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
+
+
+def generate_batch(batch, tokenizer, model, summary_ratio, buffer):
+    limits = [summary_lengths(len(ids), summary_ratio, buffer) for _, ids in batch]
+    min_lengths = [low for low, _ in limits]
+    max_lengths = [high for _, high in limits]
+    inputs = tokenizer.pad({'input_ids': [ids for _, ids in batch]}, return_tensors='pt').to(model.device)
+    num_beams = model.generation_config.num_beams or 1
+    processor = PerSampleLengthProcessor(min_lengths, max_lengths, model.config.eos_token_id, num_beams)
+    with torch.inference_mode():
+        output = model.generate(**inputs, num_beams=num_beams, min_length=min(min_lengths),
+                                max_length=max(max_lengths), logits_processor=LogitsProcessorList([processor]))
+    return tokenizer.batch_decode(output, skip_special_tokens=True, clean_up_tokenization_spaces=True)
+
+
+def summarize_token_chunks(encoded, summary_ratio, buffer=SUMMARY_BUFFER, batch_size=BATCH_SIZE, on_error=None,
+                           stats=None):
+    # Returns one summary per chunk of token ids, in order; chunks too short to summarize map to ""
+    with registry.use("summarizer") as (tokenizer, model):
+        summaries = [""] * len(encoded)
+        items, keys = [], {}
+        for i, ids in enumerate(encoded):
+            if len(ids) < MIN_INPUT_TOKENS:
+                continue
+            keys[i] = summary_cache.key(ids, summary_ratio, buffer)
+            cached = summary_cache.get(keys[i])
+            if cached is not None:
+                summaries[i] = cached
+            else:
+                items.append((i, ids))
+        for batch in length_batches(items, batch_size):
+            try:
+                for (i, _), summary in zip(batch, generate_batch(batch, tokenizer, model, summary_ratio, buffer)):
+                    summaries[i] = summary
+                    summary_cache.put(keys[i], summary)
+            except Exception as e:
+                (on_error or logging.warning)(f"Summarization failed: {e}")
+            if stats is not None:
+                stats['input_tokens'] = stats.get('input_tokens', 0) + sum(len(ids) for _, ids in batch)
+                stats['batches'] = stats.get('batches', 0) + 1
+        return summaries
+
+
+def summarize_chunks(chunks, summary_ratio, buffer=SUMMARY_BUFFER, batch_size=BATCH_SIZE, on_error=None, stats=None):
+    with registry.use("summarizer") as (tokenizer, _):
+        if not chunks:
+            return []
+        encoded = tokenizer(list(chunks), truncation=True)['input_ids']
+        return summarize_token_chunks(encoded, summary_ratio, buffer, batch_size, on_error, stats)
+
+
+def summarize_stream(texts, summary_ratio, buffer=SUMMARY_BUFFER, batch_size=BATCH_SIZE, max_tokens=MAX_CHUNK_TOKENS,
+                     overlap_tokens=CHUNK_OVERLAP_TOKENS, on_error=None, stats=None):
+    # Yields chunk summaries in document order while page texts are still being read. Chunks are tokenized once
+    # by the chunker and summarized a window of batches at a time.
+    with registry.use("summarizer") as (tokenizer, _):
+        window = []
+        # The first window is a single batch so the first summaries show up early
+        window_size = batch_size
+        for ids in iter_token_chunks(texts, tokenizer, max_tokens, overlap_tokens):
+            window.append(ids)
+            if len(window) >= window_size:
+                yield from summarize_token_chunks(window, summary_ratio, buffer, batch_size, on_error, stats)
+                window = []
+                window_size = batch_size * WINDOW_BATCHES
+        if window:
+            yield from summarize_token_chunks(window, summary_ratio, buffer, batch_size, on_error, stats)
+
+
+def summarize_map_reduce(texts, summary_ratio, buffer=SUMMARY_BUFFER, batch_size=BATCH_SIZE,
+                         max_tokens=MAX_CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS, on_error=None, stats=None):
+    # Map: summarize every chunk of the document. Reduce: chunk the summaries and summarize them again until they
+    # fit one model window, then summarize that once more at the requested ratio. Output length is bounded by the
+    # model window instead of growing with the document.
+    with registry.use("summarizer") as (tokenizer, _):
+        level = [s for s in summarize_stream(texts, MAP_RATIO, buffer, batch_size, max_tokens, overlap_tokens,
+                                             on_error, stats) if s]
+        if not level:
+            return ""
+        chunks = list(iter_token_chunks(level, tokenizer, max_tokens, 0))
+        while len(chunks) > 1:
+            reduced = [s for s in summarize_token_chunks(chunks, MAP_RATIO, buffer, batch_size, on_error, stats) if s]
+            if not reduced or len(reduced) >= len(level):
+                # Summaries stopped shrinking (e.g. reduce calls failed); finish with what there is
+                break
+            level = reduced
+            chunks = list(iter_token_chunks(level, tokenizer, max_tokens, 0))
+            if stats is not None:
+                stats['reduce_levels'] = stats.get('reduce_levels', 0) + 1
+        final = [s for s in summarize_token_chunks(chunks, summary_ratio, buffer, batch_size, on_error, stats) if s]
+        # A last window too short to summarize is already a summary
+        return "\n".join(final or level).strip()
@@ -1,128 +1,55 @@
 import streamlit as st
-import numpy as np
 import base64
-import torch
-import easyocr
-from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.document_loaders import PyPDFLoader
-from pdf2image import convert_from_path
-from PIL import Image
+import sys
 import os
-import re
-import shutil
-import tempfile
-import atexit
-from docx import Document
-import textwrap
+import time
+
+# Repository root goes first so `summary` resolves to this package rather than to this script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.models import SUMMARY_LENGTHS, SUMMARY_MODEL
+from common.cache import cache_key, file_digest, result_cache
+from common.document import document_key, document_kind, iter_document_pages
+from common.workspace import Workspace
+from summary.chunker import CHUNK_OVERLAP_TOKENS, MAP_REDUCE_MAX_PAGES, MAX_CHUNK_TOKENS, SUMMARY_BUFFER, clean_text
+from summary.summarizer import summarize_map_reduce, summarize_stream
 
 # ✅ Streamlit page config
 st.set_page_config(page_title="Summary Generator", layout="wide")
 
 # --- Constants ---
 BACKEND_URL = "https://legendary-xylophone-x5x4jqv59w5q2wrg-5000.app.github.dev/"
-TEMP_UPLOAD_FOLDER = "temp_uploads_summary"
-os.makedirs(TEMP_UPLOAD_FOLDER, exist_ok=True)
-CHUNK_SIZE = 1024
-CHUNK_OVERLAP = 128
-SHORT_SUMMARY_RATIO = 0.4
-LONG_SUMMARY_RATIO = 0.6
-SUMMARY_BUFFER = 50
 WORDS_PER_LINE = 20
 MAX_PAGES = 50 # 🔒 Backend-only trick: limit pages to 3
-
-# --- Load models ---
-@st.cache_resource
-def load_models():
-    tokenizer = AutoTokenizer.from_pretrained("facebook/bart-large-cnn")
-    model = AutoModelForSeq2SeqLM.from_pretrained("facebook/bart-large-cnn", device_map="auto", torch_dtype=torch.float32)
-    return tokenizer, model
-
-tokenizer, model = load_models()
-ocr_reader = easyocr.Reader(['en'], gpu=False)
-
-# --- Page selection logic (only in backend) ---
-def get_first_n_pages(pages, n=MAX_PAGES):
-    return pages[:min(n, len(pages))]
-
-# --- Text-based PDF processing ---
-def file_preprocessing(file_path):
-    try:
-        loader = PyPDFLoader(file_path)
-        all_pages = loader.load_and_split()
-        selected_pages = get_first_n_pages(all_pages)
-        splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-        chunks = splitter.split_documents(selected_pages)
-        cleaned_chunks = []
-        for doc in chunks:
-            content = doc.page_content
-            content = re.sub(r"[^a-zA-Z0-9\s.,?!'\"()\[\]{}:;+-]", "", content)
-            content = re.sub(r"\s+", " ", content).strip()
-            if content:
-                cleaned_chunks.append(content)
-        return cleaned_chunks
-    except Exception as e:
-        st.error(f"Error during text-based PDF processing: {e}")
-        return []
-
-# --- OCR-based image/pdf text extraction ---
-def extract_text_from_image_or_pdf(file_path, file_type):
-    texts = []
-    try:
-        if file_type == "pdf":
-            images = convert_from_path(file_path)
-        else:
-            images = [Image.open(file_path)]
-        selected_images = images[:MAX_PAGES]
-        for img in selected_images:
-            result = ocr_reader.readtext(np.array(img), detail=0, paragraph=True)
-            joined = " ".join(result)
-            joined = re.sub(r"[^a-zA-Z0-9\s.,?!'\"()\[\]{}:;+-]", "", joined)
-            joined = re.sub(r"\s+", " ", joined).strip()
-            if joined:
-                texts.append(joined)
-    except Exception as e:
-        st.error(f"OCR failed: {e}")
-    return texts
-
-# --- DOCX word file extraction ---
-def extract_text_from_docx(file_path):
+SUMMARY_MODES = {"Whole document (map-reduce)": "map_reduce", "Section by section": "per_chunk"}
+LENGTH_CHOICES = {"Short": SUMMARY_LENGTHS['short'], "Long": SUMMARY_LENGTHS['long']}
+
+# --- Text extraction ---
+# Cleaned page texts of the shared document, up to max_pages, yielded as each page is read so summarizing starts
+# with the first ones. The document is extracted (and OCR'd where a page has no text layer) once per file content,
+# so a file already seen by any module is not read again; a new file is read no further than max_pages.
+def document_texts(file_path, max_pages=MAX_PAGES, on_error=st.error):
     try:
-        doc = Document(file_path)
-        text = " ".join([p.text for p in doc.paragraphs if p.text.strip()])
-        text = re.sub(r"[^a-zA-Z0-9\s.,?!'\"()\[\]{}:;+-]", "", text)
-        text = re.sub(r"\s+", " ", text).strip()
-        return [text] if text else []
+        for _, text in iter_document_pages(file_path, max_pages=max_pages):
+            text = clean_text(text)
+            if text:
+                yield text
     except Exception as e:
-        st.error(f"Word file processing failed: {e}")
-        return []
+        on_error(f"Text extraction failed: {e}")
 
 # --- Summarization pipeline ---
-def summarize_texts(texts, summary_ratio):
-    summarizer = pipeline("summarization", model=model, tokenizer=tokenizer, truncation=True)
-    final_summary = ""
-
-    for text in texts:
-        try:
-            wrapped_chunks = textwrap.wrap(text, width=1000, break_long_words=False)
-
-            for chunk in wrapped_chunks:
-                input_ids = tokenizer.encode(chunk, truncation=True)
-                input_len = len(input_ids)
-
-                if input_len < 30:
-                    continue
-
-                max_len = min(512, max(60, int(input_len * summary_ratio) + SUMMARY_BUFFER))
-                min_len = max(20, int(max_len * 0.3))
-
-                result = summarizer(chunk, max_length=max_len, min_length=min_len)
-                final_summary += result[0]['summary_text'] + "\n"
-
-        except Exception as e:
-            st.warning(f"Summarization failed: {e}")
-
-    return final_summary.strip()
+def summarize_texts(texts, summary_ratio, mode="per_chunk", on_partial=None):
+    # on_partial(summary_so_far) is called as each section's summary is ready (per-chunk mode only)
+    if mode == "map_reduce":
+        return summarize_map_reduce(texts, summary_ratio, SUMMARY_BUFFER, max_tokens=MAX_CHUNK_TOKENS,
+                                    overlap_tokens=CHUNK_OVERLAP_TOKENS, on_error=st.warning)
+    done = []
+    for summary in summarize_stream(texts, summary_ratio, SUMMARY_BUFFER, max_tokens=MAX_CHUNK_TOKENS,
+                                    overlap_tokens=CHUNK_OVERLAP_TOKENS, on_error=st.warning):
+        if summary:
+            done.append(summary)
+            if on_partial:
+                on_partial("\n".join(done).strip())
+    return "\n".join(done).strip()
 
 # --- Display PDF inline ---
 def displayPDF(file_path):
@@ -130,18 +57,84 @@ def displayPDF(file_path):
         base64_pdf = base64.b64encode(f.read()).decode('utf-8')
     return f'<iframe src="data:application/pdf;base64,{base64_pdf}" width="100%" height="600"></iframe>'
 
-# --- Save uploaded file ---
-def save_uploaded_file(uploaded_file):
-    file_path = os.path.join(TEMP_UPLOAD_FOLDER, uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.read())
-    return file_path
-
 # --- Format summary text ---
 def format_summary_for_download(summary):
     words = summary.split()
     return "\n".join(" ".join(words[i:i + WORDS_PER_LINE]) for i in range(0, len(words), WORDS_PER_LINE))
 
+# --- Progressive summary display ---
+# Renders the summary into one placeholder, first section by section while it is generated, then in full,
+# and notes how long the first section took to appear
+class SummaryView:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_result = None
+        self.header = st.empty()
+        self.body = st.empty()
+        self.caption = st.empty()
+
+    def show(self, summary, final=False):
+        if self.first_result is None:
+            self.first_result = time.perf_counter() - self.started
+        self.header.subheader("📝 Summary:" if final else "📝 Summary (in progress):")
+        self.body.markdown(
+            f"<div style='padding: 20px; background-color: rgba(61, 213, 109, 0.2); border-radius: 8px; white-space: pre-wrap;'>{summary}</div>",
+            unsafe_allow_html=True
+        )
+        self.caption.caption(f"First result after {self.first_result:.1f}s")
+
+# --- Preview and summarize one uploaded file ---
+def show_document(file_path):
+    file_ext = file_path.lower().split('.')[-1]
+
+    col1, col2 = st.columns([0.4, 0.6])
+    with col1:
+        st.subheader("📁 Preview")
+        if file_ext == "pdf":
+            st.markdown(displayPDF(file_path), unsafe_allow_html=True)
+        elif file_ext in ["jpg", "jpeg", "png"]:
+            st.image(file_path, use_column_width=True)
+        else:
+            st.info("Preview not available for Word files but you can still summarize the document")
+
+    with col2:
+        st.subheader("⚙️ Summary Settings")
+        mode = SUMMARY_MODES[st.radio("Summary mode", list(SUMMARY_MODES), horizontal=True)]
+        summary_ratio = LENGTH_CHOICES[st.radio("Summary length", list(LENGTH_CHOICES), horizontal=True)]
+        max_pages = MAP_REDUCE_MAX_PAGES if mode == "map_reduce" else MAX_PAGES
+        if st.button("Generate Summary", type="primary"):
+            partial = SummaryView()
+            with st.spinner("🔍 Processing and summarizing document..."):
+                # Same file, mode and length as an earlier run: reuse that summary without OCR or generation
+                digest = file_digest(file_path)
+                key = cache_key(digest, 'summary', SUMMARY_MODEL, document=document_key(digest), mode=mode,
+                                ratio=summary_ratio, max_pages=max_pages, chunk_size=MAX_CHUNK_TOKENS,
+                                chunk_overlap=CHUNK_OVERLAP_TOKENS)
+                summary = result_cache.get(key)
+
+                if summary is None:
+                    if document_kind(file_path) is None:
+                        st.error("Unsupported file type.")
+                        return
+                    # Pages are summarized as they are read; a summary of a document that failed to read is not kept
+                    failed = []
+
+                    def extraction_failed(error):
+                        failed.append(error)
+                        st.error(error)
+                    texts = document_texts(file_path, max_pages, on_error=extraction_failed)
+                    summary = summarize_texts(texts, summary_ratio, mode, on_partial=partial.show)
+                    if summary and not failed:
+                        result_cache.set(key, summary)
+
+                if summary:
+                    partial.show(summary, final=True)
+
+                    formatted = format_summary_for_download(summary)
+                    st.download_button("Download Summary as TXT", data=formatted.encode("utf-8"), file_name="summary.txt", mime="text/plain")
+                else:
+                    st.error("❌ No text could be extracted.")
+
 # --- Main UI ---
 def main():
     st.markdown(
@@ -160,58 +153,9 @@ def main():
     uploaded_file = st.file_uploader("Upload PDF, Image or Word file", type=["pdf", "png", "jpg", "jpeg", "docx", "doc"])
 
     if uploaded_file is not None:
-        file_path = save_uploaded_file(uploaded_file)
-        file_ext = uploaded_file.name.lower().split('.')[-1]
-
-        col1, col2 = st.columns([0.4, 0.6])
-        with col1:
-            st.subheader("📁 Preview")
-            if file_ext == "pdf":
-                st.markdown(displayPDF(file_path), unsafe_allow_html=True)
-            elif file_ext in ["jpg", "jpeg", "png"]:
-                st.image(file_path, use_column_width=True)
-            else:
-                st.info("Preview not available for Word files but you can still summarize the document")
-
-        with col2:
-            st.subheader("⚙️ Summary Settings")
-            if st.button("Generate Summary", type="primary"):
-                with st.spinner("🔍 Processing and summarizing document..."):
-                    if file_ext in ["jpg", "jpeg", "png"]:
-                        processed_texts = extract_text_from_image_or_pdf(file_path, "image")
-                    elif file_ext == "pdf":
-                        processed_texts = file_preprocessing(file_path)
-                        if not processed_texts:
-                            processed_texts = extract_text_from_image_or_pdf(file_path, "pdf")
-                    elif file_ext in ["doc", "docx"]:
-                        processed_texts = extract_text_from_docx(file_path)
-                    else:
-                        st.error("Unsupported file type.")
-                        return
-
-                    if processed_texts:
-                        summary = summarize_texts(processed_texts, SHORT_SUMMARY_RATIO)
-
-                        st.subheader("📝 Summary:")
-                        st.markdown(
-                            f"<div style='padding: 20px; background-color: rgba(61, 213, 109, 0.2); border-radius: 8px; white-space: pre-wrap;'>{summary}</div>",
-                            unsafe_allow_html=True
-                        )
-
-                        formatted = format_summary_for_download(summary)
-                        st.download_button("Download Summary as TXT", data=formatted.encode("utf-8"), file_name="summary.txt", mime="text/plain")
-                    else:
-                        st.error("❌ No text could be extracted.")
-
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
-# --- Clean up temp folder on app exit ---
-def cleanup_temp_folder():
-    if os.path.exists(TEMP_UPLOAD_FOLDER):
-        shutil.rmtree(TEMP_UPLOAD_FOLDER)
-
-atexit.register(cleanup_temp_folder)
+        # Each session's upload lives in its own directory, removed as soon as this run finishes
+        with Workspace('summary-') as workspace:
+            show_document(workspace.save(uploaded_file))
 
 if __name__ == "__main__":
     main()
@@ -1,23 +1,21 @@
-import os
 from flask import Blueprint, request, jsonify, render_template
-import easyocr
-from googletrans import Translator
-from langchain.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import pdf2image
-from werkzeug.utils import secure_filename
-import shutil
 import asyncio
+import threading
+from collections import deque
+from common.document import document_key, document_kind, document_text, iter_document_pages, load_document, ocr_reader
+from common.cache import cache_key, file_digest, result_cache
+from common.workspace import Workspace
+from common.jobs import JobFailed
+from jobs.app import submit_job, wants_job
+from common.streaming import stream_events, wants_stream
+from translation.engine import MAX_CONCURRENCY, backend_name, translate_document
+from translation.memory import translation_memory
 
 # ------------------ Blueprint Setup ------------------
 translation_bp = Blueprint('translation_bp', __name__,
                             static_folder='static',
                             template_folder='templates')
 
-# ------------------ Upload Folder ------------------
-UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads', 'translation')
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
 # ------------------ Supported Languages ------------------
 SUPPORTED_LANGUAGES = {
     'en': 'English',
@@ -26,44 +24,13 @@ SUPPORTED_LANGUAGES = {
 }
 
 # ------------------ Utility Functions ------------------
-def save_uploaded_file(uploaded_file):
-    if os.path.exists(UPLOAD_FOLDER):
-        shutil.rmtree(UPLOAD_FOLDER)
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-    filename = secure_filename(uploaded_file.filename)
-    file_path = os.path.join(UPLOAD_FOLDER, filename)
-    uploaded_file.save(file_path)
-    return file_path
-
-def extract_text_from_image(image_path, lang_code='en'):
-    try:
-        # Use all supported languages together for best OCR coverage
-        reader = easyocr.Reader(['en', 'hi', 'mr'])
-        result = reader.readtext(image_path, detail=0)
-        return " ".join(result)
-    except Exception as e:
-        return f"Error extracting text from image: {e}"
+def is_translatable(file_path):
+    return document_kind(file_path) in ('pdf', 'image')
 
-def extract_text_from_pdf_images(pdf_path, lang_code='en'):
-    try:
-        # Use all supported languages for OCR from scanned PDF images
-        reader = easyocr.Reader(['en', 'hi', 'mr'])
-        images = pdf2image.convert_from_path(pdf_path)
-        extracted_text = ""
-        for i, image in enumerate(images):
-            temp_image_path = os.path.join(UPLOAD_FOLDER, f"temp_page_{i}.jpg")
-            image.save(temp_image_path, "JPEG")
-            extracted_text += extract_text_from_image(temp_image_path) + "\n"
-            os.remove(temp_image_path)
-        return extracted_text
-    except Exception as e:
-        return f"Error extracting text from PDF images: {e}"
-
-
-def deduplicate_text(text):
+def deduplicate_text(text, seen=None):
+    # Drops blank and repeated lines; pass the same `seen` set to deduplicate a document page by page
     lines = text.splitlines()
-    seen = set()
+    seen = set() if seen is None else seen
     result = []
     for line in lines:
         line_clean = line.strip()
@@ -73,35 +40,108 @@ def deduplicate_text(text):
     return "\n".join(result)
 
 async def translate_text_async(text, src_lang, dest_lang):
-    translator = Translator()
+    # Sentence-packed batches translated concurrently under the shared rate limit, reassembled in order;
+    # sentences already in the translation memory are not sent
     try:
-        translation = await translator.translate(text, src=src_lang, dest=dest_lang)
-        translated_text = translation.text
-        return translated_text
+        return await translate_document(text, src_lang, dest_lang, memory=translation_memory)
     except Exception as e:
         return f"Error during translation: {e}"
 
 def translate_text(text, src_lang, dest_lang):
     return asyncio.run(translate_text_async(text, src_lang, dest_lang))
 
-def extract_text_from_document(file_path, lang_code='en'):
-    if file_path.lower().endswith(('.png', '.jpg', '.jpeg')):
-        text = extract_text_from_image(file_path, lang_code)
-    elif file_path.lower().endswith('.pdf'):
-        try:
-            loader = PyPDFLoader(file_path)
-            pages = loader.load_and_split()
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=50)
-            texts = text_splitter.split_documents(pages)
-            text = "\n".join([text.page_content for text in texts])
-            if not text.strip():
-                text = extract_text_from_pdf_images(file_path, lang_code)
-        except Exception as e:
-            return f"Error extracting text from PDF: {e}"
-    else:
-        return None
-
-    return deduplicate_text(text)
+# ------------------ Warm-up ------------------
+def warm_up():
+    # Heavy imports are deferred to first use; this pulls them in ahead of traffic
+    import googletrans
+    ocr_reader()
+
+def translation_key(digest, source_language, target_language):
+    # Keyed by the extracted document too, so a change in extraction is not answered from old results
+    return cache_key(digest, 'translation', backend_name(), document=document_key(digest), src=source_language,
+                     dest=target_language)
+
+async def translate_file(file_path, source_language, target_language, on_progress=None):
+    # Returns (response body, HTTP status)
+    report = on_progress or (lambda progress, message: None)
+    digest = file_digest(file_path)
+    # The shared document is cached apart from the translation, so a new target language skips the OCR
+    report(0.0, "Extracting text")
+    if not is_translatable(file_path):
+        return {'error': 'Unsupported file format for text extraction.'}, 400
+    try:
+        extracted_text = deduplicate_text(document_text(load_document(file_path, digest=digest)))
+    except Exception as e:
+        return {'error': f"Error extracting text from document: {e}"}, 500
+    if not extracted_text.strip():
+        return {'translatedText': ''}, 200
+
+    report(0.5, "Translating")
+    translate_key = translation_key(digest, source_language, target_language)
+    translated_text = result_cache.get(translate_key)
+    if translated_text is None:
+        translated_text = await translate_text_async(extracted_text, source_language, target_language)
+        if translated_text.startswith("Error during translation"):
+            return {'error': translated_text}, 502
+        result_cache.set(translate_key, translated_text)
+    return {'translatedText': translated_text}, 200
+
+async def cancel_tasks():
+    # Cancels every other task of the running loop and waits until they have stopped
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+def translation_page_events(file_path, source_language, target_language):
+    # Yields ('page', ...) with each page's text and translation as soon as it is ready, then ('done', ...) with the
+    # whole translation. Lines are deduplicated across the whole document and translated line by line, so the
+    # result is the upload endpoint's and is stored under its cache key. Each page starts translating as soon as it
+    # is read, on one event loop in a thread of its own, so pages are translated concurrently under one semaphore
+    # and the shared rate limit while later pages are still being read; results are yielded in page order.
+    key = translation_key(file_digest(file_path), source_language, target_language)
+    cached = result_cache.get(key)
+    if cached is not None:
+        yield 'done', {'translatedText': cached, 'cached': True}
+        return
+    if not is_translatable(file_path):
+        yield 'error', {'error': 'Unsupported file format for text extraction.'}
+        return
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="translation-pages", daemon=True)
+    thread.start()
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    translations, seen, pending = [], set(), deque()
+
+    def finished(wait):
+        # Yields the page events of the translations at the head of the queue that are done, or all of them
+        while pending and (wait or pending[0][1] is None or pending[0][1].done()):
+            page_no, future = pending.popleft()
+            translated = future.result() if future else ""
+            translations.append(translated)
+            yield 'page', {'page': page_no, 'translatedText': translated}
+
+    try:
+        for page_no, text in iter_document_pages(file_path):
+            text = deduplicate_text(text, seen)
+            future = None
+            if text.strip():
+                future = asyncio.run_coroutine_threadsafe(
+                    translate_document(text, source_language, target_language, memory=translation_memory,
+                                       semaphore=semaphore), loop)
+            pending.append((page_no, future))
+            yield from finished(False)
+        yield from finished(True)
+    finally:
+        # A client that went away cancels the translations still running
+        asyncio.run_coroutine_threadsafe(cancel_tasks(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+    translated_text = "\n".join(t for t in translations if t)
+    if translated_text:
+        result_cache.set(key, translated_text)
+    yield 'done', {'translatedText': translated_text}
 
 # ------------------ Routes ------------------
 @translation_bp.route('/')
@@ -123,23 +163,30 @@ async def translate():
     if not target_language or target_language not in SUPPORTED_LANGUAGES:
         return jsonify({'error': 'Please select the target language'}), 400
 
+    # Each request gets its own directory, so concurrent uploads never touch each other's files
+    workspace = Workspace('translation-')
     try:
-        file_path = save_uploaded_file(file)
-        extracted_text = extract_text_from_document(file_path, source_language)
-
-        if extracted_text is None:
-            shutil.rmtree(UPLOAD_FOLDER)
-            return jsonify({'error': 'Unsupported file format for text extraction.'}), 400
-        elif "Error extracting text" in extracted_text:
-            shutil.rmtree(UPLOAD_FOLDER)
-            return jsonify({'error': extracted_text}), 500
-        elif not extracted_text.strip():
-            shutil.rmtree(UPLOAD_FOLDER)
-            return jsonify({'translatedText': ''}), 200
+        file_path = workspace.save(file)
+    except Exception as e:
+        workspace.cleanup()
+        return jsonify({'error': str(e)}), 500
 
-        translated_text = await translate_text_async(extracted_text, source_language, target_language)
-        shutil.rmtree(UPLOAD_FOLDER)
-        return jsonify({'translatedText': translated_text}), 200
+    if wants_stream():
+        return stream_events('translation', translation_page_events(file_path, source_language, target_language),
+                             cleanup=workspace.cleanup)
 
+    if wants_job():
+        def work(job):
+            body, status = asyncio.run(translate_file(file_path, source_language, target_language, job.update))
+            if status >= 400:
+                raise JobFailed(body['error'])
+            return body
+        return submit_job('translation', work, cleanup=workspace.cleanup)
+
+    try:
+        body, status = await translate_file(file_path, source_language, target_language)
+        return jsonify(body), status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    finally:
+        workspace.cleanup()
@@ -0,0 +1,198 @@
+import os
+import re
+import time
+import random
+import unicodedata
+import asyncio
+import logging
+import threading
+
+# --- Constants ---
+# Google's web endpoint rejects or truncates requests much above 5000 characters
+MAX_BATCH_CHARS = int(os.environ.get('TRANSLATION_BATCH_CHARS', 4500))
+MAX_CONCURRENCY = int(os.environ.get('TRANSLATION_CONCURRENCY', 4))
+# Process-wide request rate shared by every document being translated
+RATE_PER_SECOND = float(os.environ.get('TRANSLATION_RATE', 5))
+RATE_BURST = int(os.environ.get('TRANSLATION_BURST', 5))
+MAX_RETRIES = int(os.environ.get('TRANSLATION_RETRIES', 3))
+BACKOFF_SECONDS = 0.5
+TRANSLATION_BACKEND = os.environ.get('TRANSLATION_BACKEND', 'google')
+SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+
+
+# --- Batching ---
+def normalize_segment(segment):
+    return " ".join(unicodedata.normalize('NFC', segment).split())
+
+
+def split_long(sentence, max_chars):
+    # Cuts a sentence longer than a batch at whitespace; only hard-cuts a single word longer than max_chars
+    pieces = []
+    while len(sentence) > max_chars:
+        cut = sentence.rfind(' ', 0, max_chars)
+        cut = cut if cut > 0 else max_chars
+        pieces.append(sentence[:cut])
+        sentence = sentence[cut:].lstrip()
+    return pieces + [sentence]
+
+
+def split_units(text, max_chars=MAX_BATCH_CHARS):
+    # (line_no, sentence) for every sentence of every non-blank line; sentences longer than a batch are cut further
+    units = []
+    for line_no, line in enumerate(text.splitlines()):
+        for sentence in SENTENCE_END.split(line.strip()):
+            units.extend((line_no, piece) for piece in split_long(sentence, max_chars) if piece.strip())
+    return units
+
+
+def pack_batches(items, max_chars=MAX_BATCH_CHARS):
+    # Packs (key, segment) items into batches of at most max_chars, sent as one segment per line
+    batches, current, size = [], [], 0
+    for key, segment in items:
+        if current and size + len(segment) + 1 > max_chars:
+            batches.append(current)
+            current, size = [], 0
+        current.append((key, segment))
+        size += len(segment) + 1
+    if current:
+        batches.append(current)
+    return batches
+
+
+# --- Rate limiting ---
+# Token bucket shared across threads and event loops (each async Flask request runs its own loop).
+# reserve() books the next free slot and returns how long to wait for it, so callers sleep outside the lock.
+class TokenBucket:
+    def __init__(self, rate=RATE_PER_SECOND, burst=RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+rate_limiter = TokenBucket()
+
+
+# --- Backends ---
+# A backend translates one batch of text: `await backend.translate(text, src, dest)`. A new instance is made for
+# every document, since HTTP clients are bound to the event loop that created them.
+class GoogleBackend:
+    name = 'googletrans'
+
+    def __init__(self):
+        from googletrans import Translator
+        self.translator = Translator()
+
+    async def translate(self, text, src, dest):
+        result = await self.translator.translate(text, src=src, dest=dest)
+        return result.text
+
+
+class EchoBackend:
+    # Offline stand-in for tests and benchmarks: returns the text unchanged after an optional simulated latency
+    name = 'echo'
+
+    def __init__(self, latency=float(os.environ.get('TRANSLATION_ECHO_LATENCY', 0))):
+        self.latency = latency
+
+    async def translate(self, text, src, dest):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return text
+
+
+BACKENDS = {
+    'google': GoogleBackend,
+    'echo': EchoBackend,
+}
+
+
+def register_backend(name, factory):
+    BACKENDS[name] = factory
+
+
+def backend_name(name=None):
+    # Identifies the translations a backend produces, for cache keys
+    factory = BACKENDS[name or TRANSLATION_BACKEND]
+    return getattr(factory, 'name', name or TRANSLATION_BACKEND)
+
+
+# --- Translation ---
+async def translate_batch(backend, batch, src, dest, semaphore, limiter, retries, stats):
+    # Returns {key: translation}. A batch whose lines come back merged or split cannot be matched to its segments,
+    # so its halves are translated again, down to single segments if need be.
+    text = "\n".join(segment for _, segment in batch)
+    async with semaphore:
+        for attempt in range(retries + 1):
+            await limiter.acquire()
+            try:
+                translated = await backend.translate(text, src, dest)
+                break
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                delay = BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5)
+                logging.warning(f"Translation batch failed ({e}); retrying in {delay:.1f}s")
+                if stats is not None:
+                    stats['retries'] = stats.get('retries', 0) + 1
+                await asyncio.sleep(delay)
+    parts = translated.split("\n")
+    if len(parts) == len(batch):
+        return {key: part.strip() for (key, _), part in zip(batch, parts)}
+    if len(batch) == 1:
+        # A single segment: whatever came back is its translation
+        return {batch[0][0]: " ".join(part.strip() for part in parts if part.strip())}
+    if stats is not None:
+        stats['split_batches'] = stats.get('split_batches', 0) + 1
+    middle = len(batch) // 2
+    halves = await asyncio.gather(*(translate_batch(backend, half, src, dest, semaphore, limiter, retries, stats)
+                                    for half in (batch[:middle], batch[middle:])))
+    return {key: part for half in halves for key, part in half.items()}
+
+
+async def translate_document(text, src, dest, backend=None, max_chars=MAX_BATCH_CHARS, concurrency=MAX_CONCURRENCY,
+                             limiter=None, retries=MAX_RETRIES, memory=None, stats=None, semaphore=None):
+    # Translates the text sentence by sentence in size-bounded batches, at most `concurrency` in flight and all of
+    # them under the shared rate limit, and reassembles the result line by line in the original order. Sentences
+    # found in the translation memory, or repeated within the text, are not sent again. Texts translated together
+    # (the pages of one document) can share one semaphore, so `concurrency` bounds them all.
+    if isinstance(backend, str) or backend is None:
+        backend = BACKENDS[backend or TRANSLATION_BACKEND]()
+    name = getattr(backend, 'name', type(backend).__name__)
+    units = split_units(text, max_chars)
+    segments = list(dict.fromkeys(normalize_segment(unit) for _, unit in units))
+    translations = memory.get_many(segments, src, dest, name) if memory is not None else {}
+    batches = pack_batches([(s, s) for s in segments if s not in translations], max_chars)
+    semaphore = semaphore or asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(*(translate_batch(backend, batch, src, dest, semaphore, limiter or rate_limiter,
+                                                     retries, stats) for batch in batches))
+    learned = {key: part for translated in results for key, part in translated.items()}
+    translations.update(learned)
+    if memory is not None and learned:
+        memory.put_many(learned, src, dest, name)
+    if stats is not None:
+        stats['batches'] = stats.get('batches', 0) + len(batches)
+        stats['segments'] = stats.get('segments', 0) + len(segments)
+        stats['sent'] = stats.get('sent', 0) + sum(len(batch) for batch in batches)
+    lines = {}
+    for line_no, unit in units:
+        part = translations.get(normalize_segment(unit), "")
+        if part:
+            lines[line_no] = f"{lines[line_no]} {part}" if line_no in lines else part
+    return "\n".join(lines.get(line_no, "") for line_no in range(len(text.splitlines())))
@@ -0,0 +1,95 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+# --- Constants ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEMORY_DB = os.environ.get('TRANSLATION_MEMORY_DB', os.path.join(ROOT_DIR, '.cache', 'translation_memory.sqlite3'))
+MEMORY_MAX_SEGMENTS = int(os.environ.get('TRANSLATION_MEMORY_MAX_SEGMENTS', 200000))
+PRUNE_EVERY = 1000  # stored segments between size checks
+LOOKUP_CHUNK = 500  # keys per SELECT, below SQLite's bound-parameter limit
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_used_at ON segments (used_at);
+"""
+
+
+def segment_key(segment, src, dest, backend):
+    return hashlib.sha256(f"{backend}|{src}|{dest}|{segment}".encode('utf-8')).hexdigest()
+
+
+# Persistent sentence-level translation memory: normalized source segment + language pair + backend -> translation.
+# Shared by every request; once it holds more than max_segments the least recently used ones are dropped.
+class TranslationMemory:
+    def __init__(self, path=MEMORY_DB, max_segments=MEMORY_MAX_SEGMENTS):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_segments = max_segments
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.metrics = {'lookups': 0, 'hits': 0, 'stores': 0, 'evictions': 0}
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+
+    def get_many(self, segments, src, dest, backend):
+        keys = {segment_key(segment, src, dest, backend): segment for segment in segments}
+        found = {}
+        with self._lock:
+            key_list = list(keys)
+            for i in range(0, len(key_list), LOOKUP_CHUNK):
+                chunk = key_list[i:i + LOOKUP_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.conn.execute(f"SELECT key, translation FROM segments WHERE key IN ({placeholders})", chunk)
+                found.update((keys[key], translation) for key, translation in rows)
+            if found:
+                hit_keys = [(time.time(), segment_key(segment, src, dest, backend)) for segment in found]
+                with self.conn:
+                    self.conn.executemany("UPDATE segments SET hits = hits + 1, used_at = ? WHERE key = ?", hit_keys)
+            self.metrics['lookups'] += len(keys)
+            self.metrics['hits'] += len(found)
+        return found
+
+    def put_many(self, translations, src, dest, backend):
+        now = time.time()
+        rows = [(segment_key(segment, src, dest, backend), segment, translation, now)
+                for segment, translation in translations.items() if translation]
+        with self._lock:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO segments (key, source, translation, used_at) "
+                                      "VALUES (?, ?, ?, ?)", rows)
+            self.metrics['stores'] += len(rows)
+            self._writes += len(rows)
+            if self._writes >= PRUNE_EVERY:
+                self._writes = 0
+                self._prune()
+
+    def _prune(self):
+        excess = self.conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0] - self.max_segments
+        if excess > 0:
+            with self.conn:
+                self.conn.execute("DELETE FROM segments WHERE key IN "
+                                  "(SELECT key FROM segments ORDER BY used_at LIMIT ?)", (excess,))
+            self.metrics['evictions'] += excess
+
+    def stats(self):
+        lookups = self.metrics['lookups']
+        return dict(self.metrics, hit_rate=round(self.metrics['hits'] / lookups, 3) if lookups else None)
+
+
+translation_memory = TranslationMemory()
@@ -53,39 +53,49 @@ document.getElementById('translateButton').addEventListener('click', function ()
     document.getElementById('processing').classList.remove('hidden');
     document.getElementById('result').classList.add('hidden');
 
-    fetch('/translation/translate', {
+    // Pages are translated one by one and streamed back as Server-Sent Events, so text appears as it is ready
+    fetch('/translation/translate?stream=1', {
         method: 'POST',
         body: formData
     })
-    .then(response => response.json())
-    .then(data => {
-        document.getElementById('processing').classList.add('hidden');
-        document.getElementById('result').classList.remove('hidden');
-        if (data.error) {
-            alert(`Translation Error: ${data.error}`);
-            document.getElementById('translatedText').textContent = "Translation failed.";
-        } else if (data.translatedText !== undefined) {
-            document.getElementById('translatedText').textContent = data.translatedText;
-            document.getElementById('downloadButton').onclick = function () {
-                const formattedText = formatTextForDownload(data.translatedText, 15);
-                const blob = new Blob([formattedText], { type: 'text/plain' });
-                const url = window.URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = url;
-                a.download = 'translated_output.txt';
-                a.click();
-                window.URL.revokeObjectURL(url);
-            };
-        } else {
-            alert("No translated text received.");
-            document.getElementById('translatedText').textContent = "No translation available.";
+    .then(async response => {
+        if (!response.ok) {
+            const data = await response.json();
+            throw new Error(data.error || response.statusText);
         }
+        const pages = [];
+        const output = document.getElementById('translatedText');
+        await readEvents(response, (event, data) => {
+            if (event === 'page') {
+                pages.push(data.translatedText);
+                document.getElementById('processing').classList.add('hidden');
+                document.getElementById('result').classList.remove('hidden');
+                output.textContent = pages.filter(Boolean).join('\n');
+            } else if (event === 'done') {
+                document.getElementById('processing').classList.add('hidden');
+                document.getElementById('result').classList.remove('hidden');
+                output.textContent = data.translatedText || "No translation available.";
+                document.getElementById('downloadButton').onclick = function () {
+                    const formattedText = formatTextForDownload(data.translatedText, 15);
+                    const blob = new Blob([formattedText], { type: 'text/plain' });
+                    const url = window.URL.createObjectURL(blob);
+                    const a = document.createElement('a');
+                    a.href = url;
+                    a.download = 'translated_output.txt';
+                    a.click();
+                    window.URL.revokeObjectURL(url);
+                };
+            } else if (event === 'error') {
+                throw new Error(data.error);
+            }
+        });
     })
     .catch(error => {
         document.getElementById('processing').classList.add('hidden');
-        alert('Error during translation request. Please try again.');
+        document.getElementById('result').classList.remove('hidden');
+        alert(`Translation Error: ${error.message}`);
         console.error('Error:', error);
-        document.getElementById('translatedText').textContent = "Translation request failed.";
+        document.getElementById('translatedText').textContent = "Translation failed.";
     });
 });
 